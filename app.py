@@ -1,17 +1,35 @@
 import streamlit as st
+import contextlib
 import datetime
-import wave
 from audio_recorder_streamlit import audio_recorder
 import io
-import zipfile
 import os
+import time
+import uuid
 import pandas as pd
 import streamlit.components.v1 as components
 import numpy as np
-from scipy.io import wavfile
-import azure.cognitiveservices.speech as speechsdk
-import tempfile
-import matplotlib.pyplot as plt
+from voicerecorder.audio import audio_ext, decode_wav
+from voicerecorder.batch import analyze_project
+from voicerecorder.cache import MetricsCache
+from voicerecorder.encoder import TakeEncoder
+from voicerecorder.export import ProjectArchive
+from voicerecorder.index import STATUSES
+from voicerecorder.instrument import Profiler
+from voicerecorder.live import BLOCK_FRAMES, LEVEL_METER_DIR, STREAM_INTERVAL_MS, levels_from_value, take_from_value
+from voicerecorder.metrics import WINDOW_SECONDS, analyze_decoded
+from voicerecorder.postprocess import TARGET_LEVEL_DB, TRIM_PADDING_SECONDS, process_take, savings
+from voicerecorder.project import (AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT, DEFAULT_LANGUAGE, PROJECT_FILES, REMOVED_FILES,
+                                  SCRIPTS_FILE, SETTINGS_FILE, parse_removed, parse_settings, project_entries)
+from voicerecorder.pronunciation import (ASSESSED, AzureRecognizer, LocalRecognizer, PronunciationAssessor,
+                                         RecognizerPool, assessed, empty_scores)
+from voicerecorder.scripts import ScriptCollection, parse_script_lines
+from voicerecorder.shared import LEASE_SECONDS, LeaseError, SharedProject
+from voicerecorder.sidecar import add_scores, pronunciation_scores, sidecar_analysis, sidecar_name, take_analysis
+from voicerecorder.storage import ProjectStore
+from voicerecorder.table import ScriptsTable
+from voicerecorder.takes import accept_take, load_takes, remove_script, take_files
+from voicerecorder.waveform import ENVELOPE_WIDTH, min_max_envelope, waveform_svg
 
 # Custom CSS for layout and colors
 st.markdown("""
@@ -62,76 +80,180 @@ st.title("Voice Script Recorder")
 with st.sidebar:
     st.subheader("Azure Speech Settings (Optional)")
     speech_key = st.text_input("Azure Speech Subscription Key", type="password")
+    st.toggle("Live level metering", key="live_metering",
+              help="Record with a browser-side meter that shows peak and overall level while you speak")
 
 SPEECH_REGION = "southeastasia"
+METRICS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PRONUNCIATION_WORKERS = 4
+RECOGNIZER_POOL_SIZE = 2
+PRONUNCIATION_POLL_SECONDS = 1.0
+# Status of scripts still to be recorded
+PENDING_STATUS = 'Not started'
+# Label, unit, range and colored sections of the level gauges, shared by the
+# metrics panel and the live meter
+LEVEL_GAUGES = {
+    'peak_db': ("Peak Vol", "db", -24, 0, [(-24, -12, 'red'), (-12, -6, 'orange'), (-6, -3, 'green'), (-3, 0, 'red')]),
+    'rms_db': ("Overall Vol", "db", -40, 0, [(-40, -30, 'red'), (-30, -18, 'orange'), (-18, 0, 'green')]),
+    'snr_db': ("SNR", "db", 0, 60, [(0, 20, 'red'), (20, 35, 'orange'), (35, 60, 'green')]),
+}
+# Row height of st.data_editor in pixels, used to scroll the grid to the selected row
+TABLE_ROW_HEIGHT = 35
+# Analyse Project threads per session, capped so one session cannot take every core of the server
+MAX_ANALYSIS_WORKERS = 4
+ANALYSIS_WORKERS = min(int(os.environ.get("VOICERECORDER_ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1,
+                       MAX_ANALYSIS_WORKERS)
+SESSION_MEMORY_BUDGET = int(os.environ.get("VOICERECORDER_SESSION_MEMORY_MB", "64")) * 1024 * 1024
+# Prometheus text file rewritten after every rerun (e.g. for node_exporter's textfile collector)
+METRICS_FILE = os.environ.get("VOICERECORDER_METRICS_FILE")
+AUDIO_FORMAT_LABELS = {'wav': "WAV (uncompressed)", 'flac': "FLAC (lossless, compressed)"}
+# Directory of shared server-side projects (one project directory each) that
+# several narrators record into at once; Join Shared Project is offered when set
+SHARED_DIR = os.environ.get("VOICERECORDER_SHARED_DIR")
+# A narrator's lease is renewed this often while their page is open, so it only
+# runs out (and the script goes back to the queue) once they have left
+LEASE_RENEW_SECONDS = LEASE_SECONDS / 4
 
 
-# Function to compute audio quality metrics
-def compute_audio_metrics(audio_bytes, script_text="", speech_key=None, service_region=None):
-    metrics = {}
-    bio = io.BytesIO(audio_bytes)
-    rate, data = wavfile.read(bio)
-    if data.ndim > 1:
-        data = data[:, 0]  # Ensure mono
-    data_norm = data.astype(np.float32) / np.iinfo(data.dtype).max  # Normalize to -1 to 1
-
-    # Peak and RMS volume levels
-    peak_db = 20 * np.log10(np.max(np.abs(data_norm))) if np.max(np.abs(data_norm)) > 0 else -np.inf
-    rms_db = 20 * np.log10(np.sqrt(np.mean(data_norm ** 2))) if np.mean(data_norm ** 2) > 0 else -np.inf
-    metrics['peak_db'] = peak_db
-    metrics['rms_db'] = rms_db
-
-    # SNR estimation (rough: min RMS window as noise)
-    window_size = int(0.1 * rate)  # 0.1s windows
-    if window_size > 0:
-        rms_windows = [np.sqrt(np.mean(data_norm[start:start + window_size] ** 2)) for start in
-                       range(0, len(data_norm), window_size)]
-        noise_rms = min(rms_windows) if rms_windows else 0
-        signal_rms = np.sqrt(np.mean(data_norm ** 2))
-        snr_db = 20 * np.log10(signal_rms / noise_rms) if noise_rms > 0 else np.inf
-        metrics['snr_db'] = snr_db
-    else:
-        metrics['snr_db'] = np.nan
+# Process-wide timing spans and gauges; each rerun's spans are also kept for the developer panel
+@st.cache_resource
+def get_profiler():
+    return Profiler()
 
-    # General quality: Check for clipping (distortions)
-    metrics['clipping'] = np.any(np.abs(data_norm) >= 1.0)
 
-    # Pronunciation score (using Azure if credentials provided)
-    metrics['pronunciation_score'] = None
-    metrics['fluency_score'] = None
-    metrics['prosody_score'] = None
-    if speech_key and service_region and script_text:
-        try:
-            # Save temp file for Azure
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_bytes)
-                temp_filename = temp_file.name
-
-            speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
-            audio_config = speechsdk.AudioConfig(filename=temp_filename)
-            speech_recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, language="th-TH",
-                                                           audio_config=audio_config)
-
-            pronunciation_config = speechsdk.PronunciationAssessmentConfig(
-                reference_text=script_text,
-                grading_system=speechsdk.PronunciationAssessmentGradingSystem.HundredMark,
-                granularity=speechsdk.PronunciationAssessmentGranularity.Phoneme,
-                enable_miscue=False
-            )
-            pronunciation_config.enable_prosody_assessment()
-            pronunciation_config.apply_to(speech_recognizer)
-
-            result = speech_recognizer.recognize_once()
-            pronunciation_result = speechsdk.PronunciationAssessmentResult(result)
-            metrics['pronunciation_score'] = pronunciation_result.accuracy_score  # Sentence-level accuracy (0-100)
-            metrics['fluency_score'] = pronunciation_result.fluency_score
-            metrics['prosody_score'] = pronunciation_result.prosody_score
-
-            os.unlink(temp_filename)
-        except Exception as e:
-            metrics['pronunciation_error'] = str(e)
-
-    return metrics, rate, data
+profiler = get_profiler()
+profiler.begin_run()
+
+
+# Process-wide metrics cache shared by all sessions (content-addressed, so safe to share)
+@st.cache_resource
+def get_metrics_cache():
+    return MetricsCache(max_bytes=METRICS_CACHE_MAX_BYTES, disk_dir=os.environ.get("VOICERECORDER_CACHE_DIR"))
+
+
+metrics_cache = get_metrics_cache()
+
+
+# Process-wide worker pool for pronunciation assessment
+@st.cache_resource
+def get_pronunciation_assessor():
+    return PronunciationAssessor(max_workers=PRONUNCIATION_WORKERS)
+
+
+pronunciation_assessor = get_pronunciation_assessor()
+
+
+# Process-wide background FLAC encoder for takes of FLAC projects
+@st.cache_resource
+def get_take_encoder():
+    return TakeEncoder()
+
+
+take_encoder = get_take_encoder()
+
+
+# One SharedProject per shared project directory, shared by every session recording into it
+@st.cache_resource
+def get_shared_project(directory):
+    return SharedProject(directory, encoder=take_encoder)
+
+
+# Warmed-up Azure recognizers, one pool per subscription key, region and language
+@st.cache_resource
+def get_recognizer_pool(speech_key, service_region, language):
+    return RecognizerPool(speech_key, service_region, language=language, size=RECOGNIZER_POOL_SIZE, continuous=True)
+
+
+# Recognizer for pronunciation scores: Azure when a key is given, or the offline
+# stand-in when VOICERECORDER_RECOGNIZER=local
+def get_recognizer(speech_key, service_region, language):
+    if os.environ.get("VOICERECORDER_RECOGNIZER") == "local":
+        return LocalRecognizer(continuous=True)
+    if speech_key and service_region:
+        return AzureRecognizer(speech_key, service_region, continuous=True,
+                               pool=get_recognizer_pool(speech_key, service_region, language))
+    return None
+
+
+# Function to compute audio quality metrics. Results are memoized on the WAV bytes
+# plus script text, so identical audio is never re-analysed or re-sent to Azure.
+# Local metrics are computed inline from the take's decode_wav() result;
+# pronunciation scores are submitted to the background pool and merged into the
+# cache entry when they arrive.
+def compute_audio_metrics(audio_bytes, script_text="", speech_key=None, service_region=None,
+                          language=DEFAULT_LANGUAGE, key=None, measured=None, decoded=None):
+    key = key or MetricsCache.key(audio_bytes, script_text, language)
+    cached = metrics_cache.get(key)
+    if cached is None:
+        if measured is None:
+            with profiler.span('metrics'):
+                header, samples = decoded or decode_wav(audio_bytes)
+                metrics, rate, data = analyze_decoded(header, samples)
+                # Only the min/max envelope of the samples is kept for the waveform panel
+                envelope = min_max_envelope(data, full_scale=header['full_scale'])
+        else:
+            # Already measured in the browser by the live meter
+            metrics, rate, envelope = measured
+            metrics = dict(metrics)
+        metrics.update(empty_scores())
+        cached = (metrics, rate, envelope)
+        metrics_cache.put(key, cached)
+
+    metrics, rate, data = cached
+    recognizer = get_recognizer(speech_key, service_region, language) if script_text else None
+    # Submit unless the take was assessed before, even if that gave no scores
+    if recognizer and not assessed(metrics):
+        submitted = time.perf_counter()
+
+        # Runs on the assessor's worker thread, so it is timed outside any rerun
+        def store_scores(scores):
+            profiler.observe('pronunciation', time.perf_counter() - submitted)
+            updated = dict(metrics)
+            updated.update(scores)
+            updated[ASSESSED] = True
+            metrics_cache.put(key, (updated, rate, data), persist='pronunciation_error' not in scores)
+
+        pronunciation_assessor.submit(key, recognizer, audio_bytes, script_text, on_done=store_scores)
+    return cached
+
+
+level_meter = components.declare_component("level_meter", path=LEVEL_METER_DIR)
+
+
+# Live recorder: levels are metered block by block in the browser, and the
+# running summaries it streams only rerun this fragment. A finished take is
+# stored in session state and triggers a full rerun to analyse and show it.
+@st.fragment
+def live_recorder(script_index):
+    value = level_meter(gauges=LEVEL_GAUGES, window_seconds=WINDOW_SECONDS, block_frames=BLOCK_FRAMES,
+                        stream_interval_ms=STREAM_INTERVAL_MS, envelope_width=ENVELOPE_WIDTH,
+                        take_id=f"take_{script_index}", key=f"live_recorder_{script_index}", default=None)
+    if not value:
+        return
+    if isinstance(value, dict):
+        st.session_state.live_levels = levels_from_value(value)
+        if st.session_state.live_levels['clipping']:
+            st.warning("Clipping detected (possible distortions)")
+        return
+    take = take_from_value(value)
+    if (st.session_state.live_take or {}).get('take') != take['take']:
+        take['script'] = script_index
+        st.session_state.live_take = take
+        st.rerun()
+
+
+# Drop the take being recorded once it is stored or its script removed. A live
+# take left in place would be shown as a new recording when its script is
+# selected again.
+def clear_take():
+    st.session_state.temp_audio = None
+    st.session_state.audio_updated = False
+    st.session_state.live_take = None
+
+
+def level_gauge(name, value):
+    label, unit, min_val, max_val, sections = LEVEL_GAUGES[name]
+    return html_gauge(label, value, unit, min_val, max_val, sections)
 
 
 # Function to create HTML gauge
@@ -158,148 +280,253 @@ def html_gauge(label, value, unit, min_val, max_val, sections):
     return html
 
 
+# Move the selection to another script (the table repaints both rows)
+def select_script(new_index):
+    scripts = st.session_state.scripts
+    st.session_state.table_model.mark(scripts.selected, new_index)
+    scripts.selected = new_index
+    st.session_state.scroll_to_selected = True
+
+
+# Step to the next (or previous) script. With pending=True only scripts still
+# to be recorded are visited (an O(log n) index lookup); once none are left it
+# falls back to the adjacent script.
+def advance(step=1, pending=False):
+    scripts = st.session_state.scripts
+    status = PENDING_STATUS if pending else None
+    target = scripts.neighbour(scripts.selected, step, status)
+    select_script(target if target is not None else scripts.neighbour(scripts.selected, step))
+
+
+# Memoized analysis of a stored take, else the one saved in its sidecar (read
+# without decoding the audio), else None
+def stored_analysis(s, key, files):
+    analysis = metrics_cache.get(key)
+    if analysis is None and s.latest_date and sidecar_name(s.num, s.latest_date) in files:
+        analysis = sidecar_analysis(files.path(sidecar_name(s.num, s.latest_date)), key)
+        if analysis is not None:
+            # Already on disk with the project, so not mirrored to the cache directory
+            metrics_cache.put(key, analysis, persist=False)
+    return analysis
+
+
+# Analysis saved with an accepted take: the memoized one for its audio, else
+# computed now, with any pronunciation scores of the recording it came from
+# (raw_key, which differs from key when the take was post-processed)
+def accepted_analysis(s, audio, key, raw_key, files):
+    analysis = metrics_cache.get(key) if st.session_state.audio_updated else stored_analysis(s, key, files)
+    if analysis is None:
+        raw = metrics_cache.get(raw_key)
+        with profiler.span('metrics'):
+            analysis, _ = take_analysis(audio, pronunciation_scores(raw[0]) if raw else None)
+        metrics_cache.put(key, analysis)
+    return analysis
+
+
+# Pronunciation scores still being assessed when a take was accepted are added
+# to its sidecar (and the memoized analysis) when they arrive. The sidecar is
+# rewritten inside writing() (SharedProject.writing for a shared project's
+# store, so it is not rewritten while an export reads it).
+def save_late_scores(files, name, key, raw_key, writing=contextlib.nullcontext):
+    def save(scores):
+        if 'pronunciation_error' in scores:
+            return
+        with writing():
+            updated = add_scores(files.path(name), key, scores) if name in files else None
+            if updated is not None:
+                files[name] = updated
+        if updated is not None:
+            cached = metrics_cache.get(key)
+            if cached is not None:
+                metrics_cache.put(key, ({**cached[0], **scores}, cached[1], cached[2]))
+
+    if not pronunciation_assessor.when_done(raw_key, save):
+        # Finished before the callback could be added: the scores are memoized
+        raw = metrics_cache.get(raw_key)
+        if raw is not None and raw[0].get('pronunciation_score') is not None:
+            save(pronunciation_scores(raw[0]))
+
+
+# Post-processing of a new take with the session's settings (process_take)
+def postprocess_take(audio):
+    with profiler.span('postprocess'):
+        return process_take(audio, trim=st.session_state.trim_silence,
+                            target_db=st.session_state.target_level if st.session_state.normalize_level else None,
+                            padding_seconds=st.session_state.trim_padding)
+
+
+# Files of a take of script s from the recording in session state (take_files),
+# post-processed if that is on and analysed through the metrics cache
+def take_payloads(s, files):
+    return take_files(s, st.session_state.temp_audio, st.session_state.record_time, st.session_state.language,
+                      new=st.session_state.audio_updated,
+                      process=postprocess_take if st.session_state.postprocess else None,
+                      analyze=lambda audio, key, raw_key: accepted_analysis(s, audio, key, raw_key, files))
+
+
 # Accept and remove functions
 def accept(s):
     if st.session_state.temp_audio:
-        s['status'] = 'Completed'
-        s['record_time'] = st.session_state.record_time
-        date = datetime.date.today().strftime('%Y%m%d') if st.session_state.audio_updated else s.get('latest_date',
-                                                                                                     datetime.date.today().strftime(
-                                                                                                         '%Y%m%d'))
-        s['latest_date'] = date
-        num = f"{s['num']:04d}"
-        base_name = f"script{num}_{date}"
-        # Delete all existing files for this num
-        keys_to_delete = [k for k in st.session_state.files if k.startswith(f"script{num}_")]
-        for k in keys_to_delete:
-            del st.session_state.files[k]
-        # Save new files
-        txt_bytes = s['text'].encode()
-        st.session_state.files[base_name + '.txt'] = txt_bytes
-        st.session_state.files[base_name + '.wav'] = st.session_state.temp_audio
-        if s['num'] in st.session_state.removed_nums:
-            st.session_state.removed_nums.remove(s['num'])
-        st.session_state.temp_audio = None
-        st.session_state.audio_updated = False
-        next_index = st.session_state.current_index + 1
-        if next_index >= len(st.session_state.scripts):
-            next_index = 0
-        for script in st.session_state.scripts:
-            script['selected'] = False
-        if next_index >= 0:
-            st.session_state.scripts[next_index]['selected'] = True
-        st.session_state.current_index = next_index
-        st.session_state.table_key = f"scripts_table_{datetime.datetime.now().isoformat()}"
-        st.session_state.scroll_to_selected = True
+        scripts = st.session_state.scripts
+        files = st.session_state.files
+        payloads, analysis, key, raw_key = take_payloads(s, files)
+        accept_take(scripts, scripts.selected, files, payloads, st.session_state.removed_nums,
+                    encoder=take_encoder if st.session_state.audio_format == 'flac' else None)
+        if not assessed(analysis[0]):
+            save_late_scores(files, sidecar_name(s.num, s.latest_date), key, raw_key)
+        clear_take()
+        st.session_state.table_model.mark(scripts.selected)
+        advance(pending=st.session_state.skip_to_pending)
         st.rerun()
 
 
 def remove(s):
-    s['status'] = 'Removed'
-    s['record_time'] = 0.0
-    if s['num'] not in st.session_state.removed_nums:
-        st.session_state.removed_nums.append(s['num'])
-    st.session_state.temp_audio = None
-    # Delete associated files
-    num_str = f"{s['num']:04d}"
-    keys_to_delete = [k for k in st.session_state.files if k.startswith(f"script{num_str}_")]
-    for k in keys_to_delete:
-        del st.session_state.files[k]
-    if 'latest_date' in s:
-        del s['latest_date']
-    next_index = st.session_state.current_index + 1
-    if next_index >= len(st.session_state.scripts):
-        next_index = 0
-    for script in st.session_state.scripts:
-        script['selected'] = False
-    if next_index >= 0:
-        st.session_state.scripts[next_index]['selected'] = True
-    st.session_state.current_index = next_index
-    st.session_state.table_key = f"scripts_table_{datetime.datetime.now().isoformat()}"
-    st.session_state.scroll_to_selected = True
+    scripts = st.session_state.scripts
+    remove_script(scripts, scripts.selected, st.session_state.files, st.session_state.removed_nums)
+    clear_take()
+    st.session_state.table_model.mark(scripts.selected)
+    advance(pending=st.session_state.skip_to_pending)
     st.rerun()
 
 
-# Function to update statuses based on uploaded files and removed
-def update_statuses_and_texts(uploaded_files):
-    paired = {}
-    for file in uploaded_files or []:
-        try:
-            if file.name.endswith('.txt') or file.name.endswith('.wav'):
-                parts = file.name.split('_')
-                if len(parts) == 2 and parts[0].startswith('script') and len(parts[0]) == 10:
-                    num_str = parts[0][6:]
-                    date_part = parts[1].split('.')[0]
-                    if num_str.isdigit() and date_part.isdigit() and len(date_part) == 8:
-                        num = int(num_str)
-                        if num not in paired:
-                            paired[num] = []
-                        bytes_data = file.read()
-                        st.session_state.files[file.name] = bytes_data
-                        if file.name.endswith('.txt'):
-                            text = bytes_data.decode().strip()
-                            paired[num].append((date_part, 'txt', text))
-                        elif file.name.endswith('.wav'):
-                            with wave.open(io.BytesIO(bytes_data), 'rb') as w:
-                                frames = w.getnframes()
-                                rate = w.getframerate()
-                                duration = frames / float(rate) if rate else 0.0
-                            paired[num].append((date_part, 'wav', duration))
-        except Exception as e:
-            st.warning(f"Error processing file {file.name}: {str(e)}")
+# Shared projects (SharedProject): a session that joins one keeps no scripts
+# or files of its own, only its lease on one script (a copy, edited until the
+# take is accepted) and the take being recorded
+def shared_projects():
+    if not SHARED_DIR or not os.path.isdir(SHARED_DIR):
+        return []
+    return sorted(entry.name for entry in os.scandir(SHARED_DIR)
+                  if entry.is_dir() and os.path.exists(os.path.join(entry.path, SCRIPTS_FILE)))
 
-    for s in st.session_state.scripts:
-        num = s['num']
-        if num in st.session_state.removed_nums:
-            s['status'] = 'Removed'
-            s['record_time'] = 0.0
-        elif num in paired:
-            dates = {}
-            for entry in paired[num]:
-                date, typ, val = entry
-                if date not in dates:
-                    dates[date] = {}
-                dates[date][typ] = val
-            complete_dates = [date for date in dates if 'txt' in dates[date] and 'wav' in dates[date]]
-            if complete_dates:
-                complete_dates.sort(reverse=True)  # latest first
-                latest_date = complete_dates[0]
-                s['text'] = dates[latest_date]['txt']
-                s['record_time'] = dates[latest_date]['wav']
-                s['status'] = 'Completed'
-                s['latest_date'] = latest_date
-            else:
-                s['status'] = 'Not started'
-                s['record_time'] = 0.0
-                if 'latest_date' in s:
-                    del s['latest_date']
+
+def current_shared_project():
+    directory = st.session_state.shared_project
+    return get_shared_project(directory) if directory else None
+
+
+# Lease this session the next script in the shared project's queue (or script
+# `num`), with its current take if it has one. With skip, the script held so
+# far goes to the back of the queue.
+def claim_script(project, num=None, skip=False):
+    if skip:
+        project.release(st.session_state.session_id, skip=True)
+    s = project.claim(st.session_state.session_id, st.session_state.narrator, num)
+    if s is None and num is not None:
+        st.session_state.shared_notice = f"Script {num} does not exist or is being recorded by another narrator."
+        return
+    st.session_state.shared_script = s
+    clear_take()
+    audio_filename = project.store.registry.audio(s.num, s.latest_date) if s and s.status == 'Completed' else None
+    st.session_state.temp_audio = project.store.get(audio_filename) if audio_filename else None
+    st.session_state.record_time = s.record_time if audio_filename else 0.0
+
+
+def join_shared_project(directory, narrator):
+    leave_shared_project()
+    with profiler.span('shared_open'):
+        project = get_shared_project(directory)
+    st.session_state.shared_project = directory
+    st.session_state.narrator = narrator
+    # Whatever project the session had is dropped, files included
+    st.session_state.scripts = ScriptCollection()
+    st.session_state.removed_nums = []
+    st.session_state.files.close()
+    st.session_state.files = ProjectStore(memory_budget=SESSION_MEMORY_BUDGET)
+    st.session_state.project_archive = ProjectArchive(
+        os.path.join(st.session_state.files.root, ".export", "project.zip"))
+    st.session_state.table_model.invalidate()
+    st.session_state.project_report = None
+    st.session_state.output_dir = f"Shared Project: {os.path.basename(directory)}"
+    st.session_state.language = project.language
+    st.session_state.audio_format = project.audio_format
+    claim_script(project)
+
+
+def leave_shared_project():
+    project = current_shared_project()
+    if project:
+        project.release(st.session_state.session_id)
+        st.session_state.shared_project = None
+        st.session_state.shared_script = None
+        clear_take()
+        st.session_state.output_dir = ""
+
+
+# Accept and remove in a shared project: the take is stored (or the script
+# removed) only if this session still holds the lease, then the next script
+# in the queue is claimed
+def shared_accept(project, s):
+    if st.session_state.temp_audio:
+        payloads, analysis, key, raw_key = take_payloads(s, project.store)
+        try:
+            project.accept(st.session_state.session_id, s, payloads)
+        except LeaseError:
+            st.session_state.shared_notice = (f"Your lease on script {s.num} ran out and it went to another "
+                                              f"narrator, so this take was not saved.")
         else:
-            s['status'] = 'Not started'
-            s['record_time'] = 0.0
-            if 'latest_date' in s:
-                del s['latest_date']
+            if not assessed(analysis[0]):
+                save_late_scores(project.store, sidecar_name(s.num, s.latest_date), key, raw_key,
+                                 writing=project.writing)
+        claim_script(project)
+        st.rerun()
 
-    # Cleanup: keep only latest files for completed scripts
+
+def shared_remove(project, s):
+    try:
+        project.remove(st.session_state.session_id, s.num)
+    except LeaseError:
+        st.session_state.shared_notice = (f"Your lease on script {s.num} ran out and it went to another narrator, "
+                                          f"so it was not removed.")
+    claim_script(project)
+    st.rerun()
+
+
+# This session's lease and who else is recording. While the page is open the
+# fragment reruns every LEASE_RENEW_SECONDS to renew the lease; if it was lost
+# anyway (e.g. the server was busy past LEASE_SECONDS), the next script is claimed.
+@st.fragment(run_every=LEASE_RENEW_SECONDS)
+def lease_panel(project):
+    s = st.session_state.shared_script
+    if s is not None and not project.renew(st.session_state.session_id, s.num):
+        st.session_state.shared_notice = (f"Your lease on script {s.num} ran out and it went back to the queue; "
+                                          f"a take not yet accepted was not saved.")
+        claim_script(project)
+        st.rerun()
+    counts = project.counts()
+    st.caption(f"{counts[PENDING_STATUS]} of {counts['total']} scripts remaining ({counts['Completed']} completed, "
+               f"{counts['Removed']} removed), {counts['queued']} waiting in the queue")
+    narrators = project.narrators()
+    if narrators:
+        st.caption("Recording now: " + ", ".join(f"{name} (script {num})" for name, num, _ in narrators))
+
+
+# Queue every accepted WAV take for FLAC compression if the project stores FLAC
+# (on load and when the audio format is switched to FLAC)
+def compress_takes():
+    if st.session_state.audio_format != 'flac':
+        return
+    files = st.session_state.files
     for s in st.session_state.scripts:
-        num_str = f"{s['num']:04d}"
-        if s['status'] == 'Completed' and 'latest_date' in s:
-            keep_txt = f"script{num_str}_{s['latest_date']}.txt"
-            keep_wav = f"script{num_str}_{s['latest_date']}.wav"
-            keys_to_delete = [k for k in st.session_state.files if
-                              k.startswith(f"script{num_str}_") and k not in [keep_txt, keep_wav]]
-            for k in keys_to_delete:
-                del st.session_state.files[k]
-        else:
-            keys_to_delete = [k for k in st.session_state.files if k.startswith(f"script{num_str}_")]
-            for k in keys_to_delete:
-                del st.session_state.files[k]
+        name = files.registry.audio(s.num, s.latest_date) if s.status == 'Completed' and s.latest_date else None
+        if name and name.endswith('.wav'):
+            take_encoder.submit(files, name)
+
+
+# Function to update statuses based on uploaded files and removed
+def update_statuses_and_texts(uploaded_files):
+    progress_bar = st.progress(0.0, text="Loading project files...")
+    errors = load_takes(st.session_state.scripts, st.session_state.removed_nums, st.session_state.files,
+                        uploaded_files or [], encoder=take_encoder,
+                        progress=lambda done, total: progress_bar.progress(
+                            done / total, text=f"Loading {total} project files..."))
+    progress_bar.empty()
+    for name, e in errors:
+        st.warning(f"Error processing file {name}: {str(e)}")
 
 
 # Session state
 if 'scripts' not in st.session_state:
-    st.session_state.scripts = []
-if 'current_index' not in st.session_state:
-    st.session_state.current_index = -1
+    st.session_state.scripts = ScriptCollection()
 if 'temp_audio' not in st.session_state:
     st.session_state.temp_audio = None
 if 'removed_nums' not in st.session_state:
@@ -309,7 +536,10 @@ if 'record_time' not in st.session_state:
 if 'output_dir' not in st.session_state:
     st.session_state.output_dir = ""
 if 'files' not in st.session_state:
-    st.session_state.files = {}
+    st.session_state.files = ProjectStore(memory_budget=SESSION_MEMORY_BUDGET)
+if 'project_archive' not in st.session_state:
+    st.session_state.project_archive = ProjectArchive(
+        os.path.join(st.session_state.files.root, ".export", "project.zip"))
 if 'last_selected' not in st.session_state:
     st.session_state.last_selected = -1
 if 'audio_updated' not in st.session_state:
@@ -318,17 +548,46 @@ if 'add_process' not in st.session_state:
     st.session_state.add_process = None
 if 'load_mode' not in st.session_state:
     st.session_state.load_mode = None
-if 'table_key' not in st.session_state:
-    st.session_state.table_key = "scripts_table"
-if 'scroll_to_top' not in st.session_state:
-    st.session_state.scroll_to_top = False
 if 'scroll_to_selected' not in st.session_state:
     st.session_state.scroll_to_selected = False
 if 'previous_current_index' not in st.session_state:
     st.session_state.previous_current_index = -1
+if 'table_model' not in st.session_state:
+    st.session_state.table_model = ScriptsTable()
+if 'table_page' not in st.session_state:
+    st.session_state.table_page = 1
+if 'language' not in st.session_state:
+    st.session_state.language = DEFAULT_LANGUAGE
+if 'audio_format' not in st.session_state:
+    st.session_state.audio_format = DEFAULT_AUDIO_FORMAT
+if 'skip_to_pending' not in st.session_state:
+    st.session_state.skip_to_pending = True
+if 'live_take' not in st.session_state:
+    st.session_state.live_take = None
+if 'live_levels' not in st.session_state:
+    st.session_state.live_levels = None
+if 'project_report' not in st.session_state:
+    st.session_state.project_report = None
+if 'postprocess' not in st.session_state:
+    st.session_state.postprocess = False
+    st.session_state.trim_silence = True
+    st.session_state.normalize_level = True
+    st.session_state.trim_padding = TRIM_PADDING_SECONDS
+    st.session_state.target_level = TARGET_LEVEL_DB
+if 'shared_project' not in st.session_state:
+    # Directory of the shared project this session records into, or None
+    st.session_state.shared_project = None
+    st.session_state.narrator = ""
+    st.session_state.shared_script = None
+    st.session_state.shared_notice = None
+if 'session_id' not in st.session_state:
+    # Labels this session's gauges in the exported metrics
+    st.session_state.session_id = uuid.uuid4().hex[:8]
+    st.session_state.last_run = None
+    st.session_state.show_profiling = False
 
 # Top row: Mic (skip), Load buttons
-col_mic, col_load_new, col_continue = st.columns([2, 1, 1])
+col_mic, col_load_new, col_continue, col_shared = st.columns([2, 1, 1, 1])
 with col_mic:
     st.write("Select Microphone: Browser Default")
 with col_load_new:
@@ -337,364 +596,596 @@ with col_load_new:
 with col_continue:
     if st.button("Continue Project"):
         st.session_state.load_mode = "existing"
+with col_shared:
+    if SHARED_DIR and st.button("Join Shared Project"):
+        st.session_state.load_mode = "shared"
 
 # Load logic
 if 'load_mode' in st.session_state:
     if st.session_state.load_mode == "new":
         scripts_uploader = st.file_uploader("Select scripts.txt File to Upload", type="txt", key="new_scripts")
         if scripts_uploader:
-            lines = scripts_uploader.read().decode().splitlines()
-            st.session_state.scripts = []
-            for line in lines:
-                line = line.strip()
-                if line and line[0].isdigit() and '.' in line:
-                    num_str, text = line.split('.', 1)
-                    num = int(num_str)
-                    text = text.strip()
-                    st.session_state.scripts.append(
-                        {'num': num, 'text': text, 'status': 'Not started', 'record_time': 0.0, 'selected': False})
+            leave_shared_project()
+            with profiler.span('parse_scripts'):
+                lines = scripts_uploader.read().decode().splitlines()
+                st.session_state.scripts = ScriptCollection.from_lines(lines)
             st.session_state.removed_nums = []
+            st.session_state.table_model.invalidate()
             st.session_state.output_dir = "New Project"
+            st.session_state.language = DEFAULT_LANGUAGE
+            st.session_state.audio_format = DEFAULT_AUDIO_FORMAT
             if st.session_state.scripts:
-                st.session_state.scripts[0]['selected'] = True
-                st.session_state.current_index = 0
+                st.session_state.scripts.selected = 0
             del st.session_state.load_mode
             st.rerun()
     elif st.session_state.load_mode == "existing":
         st.info(
-            "Upload all files from your existing project directory (including scripts.txt, removed.txt or scripts.removed, and all .txt/.wav files). The app will verify scripts.txt is included.")
-        existing_files = st.file_uploader("Upload all files from the directory", type=["txt", "wav"],
-                                          accept_multiple_files=True, key="exist_files")
-        has_scripts = any(f.name == "scripts.txt" for f in existing_files)
+            "Upload all files from your existing project directory (including scripts.txt, removed.txt or scripts.removed, project.json, and all .txt/.wav/.flac/.analysis files). The app will verify scripts.txt is included.")
+        existing_files = st.file_uploader("Upload all files from the directory",
+                                          type=["txt", "wav", "flac", "analysis", "json"], accept_multiple_files=True,
+                                          key="exist_files")
+        has_scripts = any(f.name == SCRIPTS_FILE for f in existing_files)
         if existing_files:
             if not has_scripts:
                 st.error("No scripts.txt found in uploaded files. Please include it and retry.")
             else:
-                scripts_file = next(f for f in existing_files if f.name == "scripts.txt")
-                lines = scripts_file.read().decode().splitlines()
-                st.session_state.scripts = []
-                for line in lines:
-                    line = line.strip()
-                    if line and line[0].isdigit() and '.' in line:
-                        num_str, text = line.split('.', 1)
-                        num = int(num_str)
-                        text = text.strip()
-                        st.session_state.scripts.append(
-                            {'num': num, 'text': text, 'status': 'Not started', 'record_time': 0.0, 'selected': False})
-                removed_file = next((f for f in existing_files if f.name in ["scripts.removed", "removed.txt"]), None)
+                leave_shared_project()
+                scripts_file = next(f for f in existing_files if f.name == SCRIPTS_FILE)
+                with profiler.span('parse_scripts'):
+                    lines = scripts_file.read().decode().splitlines()
+                    st.session_state.scripts = ScriptCollection.from_lines(lines)
+                removed_file = next((f for f in existing_files if f.name in REMOVED_FILES), None)
                 if removed_file:
-                    removed_lines = removed_file.read().decode().splitlines()
-                    st.session_state.removed_nums = [int(line.strip()) for line in removed_lines if
-                                                     line.strip().isdigit()]
+                    st.session_state.removed_nums = parse_removed(removed_file.read().decode().splitlines())
                 else:
                     st.session_state.removed_nums = []
-                other_files = [f for f in existing_files if
-                               f.name not in ["scripts.txt", "scripts.removed", "removed.txt"]]
-                update_statuses_and_texts(other_files)
+                settings_file = next((f for f in existing_files if f.name == SETTINGS_FILE), None)
+                settings = parse_settings(settings_file.read()) if settings_file else {}
+                st.session_state.language = settings.get('language', DEFAULT_LANGUAGE)
+                st.session_state.audio_format = settings.get('audio_format', DEFAULT_AUDIO_FORMAT)
+                other_files = [f for f in existing_files if f.name not in PROJECT_FILES]
+                with profiler.span('update_statuses'):
+                    update_statuses_and_texts(other_files)
+                compress_takes()
+                st.session_state.table_model.invalidate()
                 st.session_state.output_dir = "Uploaded Project"
                 if st.session_state.scripts:
-                    st.session_state.scripts[0]['selected'] = True
-                    st.session_state.current_index = 0
+                    st.session_state.scripts.selected = 0
                 del st.session_state.load_mode
                 st.rerun()
+    elif st.session_state.load_mode == "shared":
+        projects = shared_projects()
+        if not projects:
+            st.info(f"No shared projects yet. A shared project is a project directory (with at least a scripts.txt) "
+                    f"in {SHARED_DIR} on the server.")
+        else:
+            shared_name = st.selectbox("Shared project", projects, key="shared_name")
+            narrator = st.text_input("Narrator name", key="narrator_name",
+                                     help="Shown to the other narrators next to the script you are recording")
+            if st.button("Join", disabled=not narrator.strip()):
+                join_shared_project(os.path.join(SHARED_DIR, shared_name), narrator.strip())
+                del st.session_state.load_mode
+                st.rerun()
+
+# The shared project this session records into, if any. Its scripts are managed
+# on the server, so they are not added or downloaded from a session.
+project = current_shared_project()
 
 # Subdir label, Add, Update
 col_subdir, col_add, col_update = st.columns([2, 1, 1])
 with col_subdir:
     st.write(f"Output Subdirectory: {st.session_state.output_dir}")
 with col_add:
-    if st.button("Add Scripts"):
+    if st.button("Add Scripts", disabled=project is not None):
         st.session_state.add_process = 'download'
     if st.session_state.add_process == 'download':
-        scripts_content = "\n".join(f"{s['num']}. {s['text']}" for s in st.session_state.scripts)
-        st.download_button("Download updated scripts.txt", scripts_content.encode(), file_name="scripts.txt",
-                           key="add_download")
+        st.download_button("Download updated scripts.txt", st.session_state.scripts.to_text().encode(),
+                           file_name="scripts.txt", key="add_download")
         if st.button("Proceed to upload additional scripts"):
             st.session_state.add_process = 'upload'
     if st.session_state.add_process == 'upload':
         add_uploader = st.file_uploader("Select Additional Scripts File", type="txt", key="add_scripts")
         if add_uploader:
             lines = add_uploader.read().decode().splitlines()
-            new_texts = []
-            for line in lines:
-                line = line.strip()
-                if line and line[0].isdigit() and '.' in line:
-                    _, text = line.split('.', 1)
-                    text = text.strip()
-                    new_texts.append(text)
-            existing_texts = set(s['text'].strip() for s in st.session_state.scripts)
-            new_entries = [text for text in new_texts if text not in existing_texts]
-            if new_entries:
-                max_num = max(s['num'] for s in st.session_state.scripts) if st.session_state.scripts else 0
-                for text in new_entries:
-                    max_num += 1
-                    st.session_state.scripts.append(
-                        {'num': max_num, 'text': text, 'status': 'Not started', 'record_time': 0.0, 'selected': False})
+            new_texts = [text for _, text in parse_script_lines(lines)]
+            # De-duplicated against the collection's text set; numbered after its highest number
+            if st.session_state.scripts.add_texts(new_texts):
+                st.session_state.table_model.invalidate()
             st.session_state.add_process = None
             st.rerun()
 with col_update:
-    if st.button("Update Scripts"):
-        scripts_content = "\n".join(f"{s['num']}. {s['text']}" for s in st.session_state.scripts)
-        st.download_button("Download updated scripts.txt", scripts_content.encode(), file_name="scripts.txt",
-                           key="update_download")
+    if st.button("Update Scripts", disabled=project is not None):
+        st.download_button("Download updated scripts.txt", st.session_state.scripts.to_text().encode(),
+                           file_name="scripts.txt", key="update_download")
 
 # Scripts list
 if st.session_state.scripts:
     st.subheader("Scripts")
 
-    for s in st.session_state.scripts:
-        if 'selected' not in s:
-            s['selected'] = False
+    # Persistent table model over one page of scripts: per-rerun work is bounded
+    # by the page size, and filters and jumps use the precomputed index
+    table = st.session_state.table_model
+    scripts = st.session_state.scripts
+    index = scripts.index
+    remaining = index.count(PENDING_STATUS)
+    st.caption(f"{remaining} of {len(scripts)} scripts remaining ({index.count('Completed')} completed, "
+               f"{index.count('Removed')} removed)")
+    col_filter, col_jump, col_go, col_page = st.columns([2, 2, 1, 1])
+    with col_filter:
+        status_filter = st.selectbox(
+            "Show", ["All", *STATUSES], key="table_filter",
+            format_func=lambda status: f"{status} ({index.count(None if status == 'All' else status)})")
+    with col_jump:
+        jump_num = st.number_input("Jump to Num", min_value=0, step=1, value=None, key="jump_num")
+    with col_go:
+        st.write("")
+        if st.button("Go") and jump_num is not None:
+            jump_index = index.position(int(jump_num))
+            if jump_index is None:
+                st.warning(f"No script number {int(jump_num)}")
+            else:
+                select_script(jump_index)
+    rows = index.rows(None if status_filter == "All" else status_filter)
 
+    # The page follows the current script when it moves or the filter changes
+    anchor = (status_filter, scripts.selected)
+    if table.anchor != anchor:
+        table.anchor = anchor
+        current_page = table.page_of(rows, scripts.selected)
+        if current_page is not None:
+            st.session_state.table_page = current_page + 1
+    page_rows, pages = table.page(rows, st.session_state.table_page - 1)
+    st.session_state.table_page = min(st.session_state.table_page, pages)
+    with col_page:
+        st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="table_page")
 
-    def style_rows(row):
-        if row['Select']:
-            return ['background-color: #FFCCCC'] * len(row)
-        elif row['Status'] == 'Completed':
-            return ['background-color: lightgreen'] * len(row)
-        elif row['Status'] == 'Removed':
-            return ['background-color: lightgrey'] * len(row)
-        else:
-            return [''] * len(row)
-
-
-    data = [{'Select': s['selected'], 'Num': s['num'], 'Status': s['status'],
-             'Preview': s['text'][:50] + ('...' if len(s['text']) > 50 else '')} for s in st.session_state.scripts]
-    df = pd.DataFrame(data)
-    styled_df = df.style.apply(style_rows, axis=1)
-    column_config = {
-        'Select': st.column_config.CheckboxColumn('Select', width="small", default=False),
-        'Num': st.column_config.NumberColumn(),
-        'Status': st.column_config.TextColumn(),
-        'Preview': st.column_config.TextColumn(),
-    }
-    edited_df = st.data_editor(styled_df, column_config=column_config, disabled=["Num", "Status", "Preview"],
-                               hide_index=True, num_rows="fixed", key=st.session_state.table_key)
+    with profiler.span('table'):
+        styled_df = table.styled(scripts, page_rows)
+        column_config = {
+            'Select': st.column_config.CheckboxColumn('Select', width="small", default=False),
+            'Num': st.column_config.NumberColumn(),
+            'Status': st.column_config.TextColumn(),
+            'Preview': st.column_config.TextColumn(),
+        }
+        edited_df = st.data_editor(styled_df, column_config=column_config, disabled=["Num", "Status", "Preview"],
+                                   hide_index=True, num_rows="fixed", key=table.key)
+    table.track_edits(st.session_state.get(table.key))
 
+    # Vectorized selection diff against the page; a newly checked row becomes the
+    # current script and unchecking the current one clears the selection
     changed = False
     newly_selected = []
-    for i in range(len(st.session_state.scripts)):
-        new_select = edited_df['Select'][i]
-        if new_select != st.session_state.scripts[i]['selected']:
-            if new_select:
-                newly_selected.append(i)
-            st.session_state.scripts[i]['selected'] = new_select
-            changed = True
-    if len(newly_selected) > 0:
+    for i, new_select in table.selection_changes(edited_df):
+        if new_select:
+            newly_selected.append(i)
+        elif i == scripts.selected:
+            scripts.selected = -1
+        changed = True
+    if newly_selected:
         new_i = newly_selected[-1]
-        for j in range(len(st.session_state.scripts)):
-            if j != new_i:
-                if st.session_state.scripts[j]['selected']:
-                    st.session_state.scripts[j]['selected'] = False
-                    changed = True
+        for j in [scripts.selected, *newly_selected[:-1]]:
+            if 0 <= j != new_i:
+                table.set_selected(j, False)
+                table.mark(j)
+        scripts.selected = new_i
 
-    checked_indices = [i for i in range(len(st.session_state.scripts)) if st.session_state.scripts[i]['selected']]
-    st.session_state.current_index = checked_indices[0] if checked_indices else -1
-
-    if st.session_state.current_index != st.session_state.previous_current_index:
+    if scripts.selected != st.session_state.previous_current_index:
         st.session_state.scroll_to_selected = True
-        st.session_state.previous_current_index = st.session_state.current_index
+        st.session_state.previous_current_index = scripts.selected
 
     if changed:
         st.rerun()
 
-    if st.session_state.scroll_to_top:
-        components.html(
-            """
-            <script>
-                const doc = window.document;
-                const viewport = doc.querySelector('.ag-body-viewport');
-                if (viewport) {
-                    viewport.scrollTop = 0;
-                }
-            </script>
-            """,
-            height=0,
-        )
-        st.session_state.scroll_to_top = False
-
-    if st.session_state.scroll_to_selected and st.session_state.current_index >= 0:
+    # One-shot scroll of the (still mounted) grid to the selected row: waits for
+    # the grid with a MutationObserver instead of polling
+    selected_row = table.row_of(scripts.selected)
+    if st.session_state.scroll_to_selected and selected_row is not None:
         components.html(
             f"""
             <script>
+            const doc = window.parent.document;
+            const index = {selected_row};
             function scrollToRow() {{
-                const doc = window.document;
-                const row = doc.querySelector('.ag-row[row-index="{st.session_state.current_index}"]');
-                if (row) {{
-                    row.scrollIntoView({{behavior: 'smooth', block: 'center'}});
-                    return true;
+                const scroller = doc.querySelector('[data-testid="stDataFrame"] .dvn-scroller');
+                if (!scroller) {{
+                    return false;
                 }}
-                return false;
+                const rowHeight = {TABLE_ROW_HEIGHT};
+                scroller.scrollTop = Math.max(0, (index + 1.5) * rowHeight - scroller.clientHeight / 2);
+                return true;
+            }}
+            if (!scrollToRow()) {{
+                const observer = new MutationObserver(() => {{
+                    if (scrollToRow()) {{
+                        observer.disconnect();
+                    }}
+                }});
+                observer.observe(doc.body, {{childList: true, subtree: true}});
+                setTimeout(() => observer.disconnect(), 5000);
             }}
-            let attempts = 0;
-            const interval = setInterval(() => {{
-                attempts++;
-                if (scrollToRow() || attempts > 50) {{
-                    clearInterval(interval);
-                }}
-            }}, 100);
             </script>
             """,
             height=0,
         )
         st.session_state.scroll_to_selected = False
 
-# Edit script
-s = st.session_state.scripts[st.session_state.current_index] if st.session_state.current_index >= 0 else None
-if s:
-    if st.session_state.last_selected != st.session_state.current_index:
+# Shared project: progress, this narrator's lease and claiming a script by number
+if project:
+    st.subheader("Shared Project")
+    lease_panel(project)
+    if st.session_state.shared_notice:
+        st.warning(st.session_state.shared_notice)
+        st.session_state.shared_notice = None
+    col_narrator, col_claim, col_go, col_leave = st.columns([2, 2, 1, 1])
+    with col_narrator:
+        st.write(f"Narrator: {st.session_state.narrator}")
+    with col_claim:
+        claim_num = st.number_input("Record script number", min_value=1, step=1, value=None, key="claim_num",
+                                    help="Take a script out of turn, e.g. to re-record an accepted take")
+    with col_go:
+        st.write("")
+        if st.button("Claim", disabled=claim_num is None):
+            claim_script(project, int(claim_num))
+            st.rerun()
+    with col_leave:
+        st.write("")
+        if st.button("Leave"):
+            leave_shared_project()
+            st.rerun()
+
+# Edit script (in a shared project, the script this session holds the lease on)
+current_index = st.session_state.scripts.selected
+s = st.session_state.scripts.current
+if project:
+    s = st.session_state.shared_script
+    current_index = f"shared_{s.num}" if s else -1
+    if s:
+        col_num, col_status, col_skip = st.columns([2, 2, 2])
+        with col_num:
+            st.write(f"Script Num: {s.num}")
+        with col_status:
+            st.write(f"Status: {s.status}")
+        with col_skip:
+            if st.button("Skip", help="Put this script back at the end of the queue and take the next one"):
+                claim_script(project, skip=True)
+                st.rerun()
+    else:
+        st.info("No scripts are waiting in the queue.")
+        if st.button("Check queue"):
+            claim_script(project)
+            st.rerun()
+elif s:
+    if st.session_state.last_selected != current_index:
         old_index = st.session_state.last_selected
-        if old_index >= 0:
+        if 0 <= old_index < len(st.session_state.scripts):
             old_key = f"edit_text_{old_index}"
             if old_key in st.session_state:
                 old_edited = st.session_state[old_key]
-                old_s = st.session_state.scripts[old_index]
-                if old_edited != old_s['text']:
-                    old_s['text'] = old_edited
-        st.session_state.last_selected = st.session_state.current_index
-        if s['status'] == 'Completed' and 'latest_date' in s:
-            wav_filename = f"script{s['num']:04d}_{s['latest_date']}.wav"
-            st.session_state.temp_audio = st.session_state.files.get(wav_filename)
-            st.session_state.record_time = s['record_time']
+                if old_edited != st.session_state.scripts[old_index].text:
+                    st.session_state.scripts.set_text(old_index, old_edited)
+                    st.session_state.table_model.mark(old_index)
+        st.session_state.last_selected = current_index
+        if s.status == 'Completed' and s.latest_date:
+            audio_filename = st.session_state.files.registry.audio(s.num, s.latest_date)
+            st.session_state.temp_audio = st.session_state.files.get(audio_filename) if audio_filename else None
+            st.session_state.record_time = s.record_time
             st.session_state.audio_updated = False
         else:
             st.session_state.temp_audio = None
             st.session_state.record_time = 0.0
             st.session_state.audio_updated = False
+    st.toggle("Skip to next pending", key="skip_to_pending",
+              help="Accept and Remove move to the nearest script that is not started yet")
     col_num, col_status, col_prev, col_next = st.columns([2, 2, 1, 1])
     with col_num:
-        st.write(f"Script Num: {s['num']}")
+        st.write(f"Script Num: {s.num}")
     with col_status:
-        st.write(f"Status: {s['status']}")
+        st.write(f"Status: {s.status}")
     with col_prev:
         if st.button("Prev"):
-            new_index = st.session_state.current_index - 1 if st.session_state.current_index > 0 else len(
-                st.session_state.scripts) - 1
-            for script in st.session_state.scripts:
-                script['selected'] = False
-            st.session_state.scripts[new_index]['selected'] = True
-            st.session_state.current_index = new_index
-            st.session_state.scroll_to_selected = True
-            st.session_state.table_key = f"scripts_table_{datetime.datetime.now().isoformat()}"
+            advance(-1)
             st.rerun()
     with col_next:
         if st.button("Next"):
-            new_index = (st.session_state.current_index + 1) % len(st.session_state.scripts)
-            for script in st.session_state.scripts:
-                script['selected'] = False
-            st.session_state.scripts[new_index]['selected'] = True
-            st.session_state.current_index = new_index
-            st.session_state.scroll_to_selected = True
-            st.session_state.table_key = f"scripts_table_{datetime.datetime.now().isoformat()}"
+            advance()
             st.rerun()
 else:
     st.session_state.temp_audio = None
     st.session_state.record_time = 0.0
     st.session_state.audio_updated = False
 st.write("Edit Script:")
-edit_key = f"edit_text_{st.session_state.current_index}" if st.session_state.current_index >= 0 else "edit_text_none"
-edited_text = st.text_area("Edit Script:", value=s['text'] if s else "", height=150, key=edit_key, disabled=s is None,
+edit_key = f"edit_text_{current_index}" if s else "edit_text_none"
+edited_text = st.text_area("Edit Script:", value=s.text if s else "", height=150, key=edit_key, disabled=s is None,
                            label_visibility="collapsed")
-if s and edited_text != s['text']:
-    s['text'] = edited_text
+if s and edited_text != s.text:
+    if project:
+        # The session's copy of the script; the shared project takes the text on accept
+        s.text = edited_text
+    else:
+        st.session_state.scripts.set_text(current_index, edited_text)
+        st.session_state.table_model.mark(current_index)
 
 # Record time
 st.write(f"Record time: {st.session_state.record_time:.1f} seconds")
 
+# Live metering records in its own full-width row
+audio_bytes = None
+live_take = None
+if st.session_state.live_metering and s:
+    live_recorder(current_index)
+    if st.session_state.live_take and st.session_state.live_take['script'] == current_index:
+        live_take = st.session_state.live_take
+        audio_bytes = live_take['audio']
+
 # Buttons row
 col_record, col_play, col_accept, col_remove = st.columns(4)
-audio_bytes = None
 with col_record:
-    st.markdown('<div class="record-button">', unsafe_allow_html=True)
-    audio_bytes = audio_recorder(text="", recording_color="#FF0000", neutral_color="#00FF00",
-                                 key=f"recorder_{st.session_state.current_index}")
-    st.markdown('</div>', unsafe_allow_html=True)
+    if not st.session_state.live_metering:
+        st.markdown('<div class="record-button">', unsafe_allow_html=True)
+        audio_bytes = audio_recorder(text="", recording_color="#FF0000", neutral_color="#00FF00",
+                                     key=f"recorder_{current_index}")
+        st.markdown('</div>', unsafe_allow_html=True)
 
 with col_play:
     st.markdown('<div class="play-button">', unsafe_allow_html=True)
     if st.button("►", disabled=s is None):
         if st.session_state.temp_audio:
-            st.audio(st.session_state.temp_audio, format="audio/wav")
+            # FLAC takes are sent as they are and decoded by the browser
+            st.audio(bytes(st.session_state.temp_audio), format=f"audio/{audio_ext(st.session_state.temp_audio)}")
     st.markdown('</div>', unsafe_allow_html=True)
 with col_accept:
     if st.button("Accept", disabled=s is None):
-        accept(s)
+        if project:
+            shared_accept(project, s)
+        else:
+            accept(s)
 with col_remove:
     if st.button("Remove", disabled=s is None):
-        remove(s)
+        if project:
+            shared_remove(project, s)
+        else:
+            remove(s)
 
+analysis = None
+analysis_key = None
 if audio_bytes and s:
     st.session_state.temp_audio = audio_bytes
     st.session_state.audio_updated = True
-    with wave.open(io.BytesIO(audio_bytes), 'rb') as w:
-        frames = w.getnframes()
-        rate = w.getframerate()
-        st.session_state.record_time = frames / rate if rate else 0.0
+    # Decoded once (a zero-copy view for most formats) and shared by the record
+    # time, the metrics and the waveform
+    with profiler.span('decode'):
+        decoded = decode_wav(audio_bytes)
+    st.session_state.record_time = decoded[0]['duration']
 
-    # Compute and display metrics
-    metrics, rate, waveform = compute_audio_metrics(st.session_state.temp_audio, script_text=s['text'],
-                                                    speech_key=speech_key if speech_key else None,
-                                                    service_region=SPEECH_REGION)
+    # Compute metrics (pronunciation runs in the background). Live takes arrive
+    # with their levels and envelope already measured in the browser.
+    measured = (live_take['metrics'], live_take['rate'], live_take['envelope']) if live_take else None
+    analysis_key = MetricsCache.key(audio_bytes, s.text, st.session_state.language)
+    analysis = compute_audio_metrics(st.session_state.temp_audio, script_text=s.text,
+                                     speech_key=speech_key if speech_key else None,
+                                     service_region=SPEECH_REGION, language=st.session_state.language,
+                                     key=analysis_key, measured=measured, decoded=decoded)
+elif s and st.session_state.temp_audio:
+    # Re-selected take: show the memoized or sidecar analysis if there is one, without re-analysing
+    analysis_key = MetricsCache.key(st.session_state.temp_audio, s.text, st.session_state.language)
+    analysis = stored_analysis(s, analysis_key, project.store if project else st.session_state.files)
 
-    st.subheader("Audio Quality Metrics")
 
-    # First row: Peak Volume, Overall Volume, SNR, Pronunciation
-    col1, col2, col3, col4 = st.columns(4)
+# Pronunciation gauges. While an assessment is in flight this runs as a polling
+# fragment, so only this panel refreshes; once the scores are cached it triggers
+# a full rerun to render them.
+def pronunciation_panel(key, metrics, pending):
+    if pending and not pronunciation_assessor.pending(key):
+        st.rerun()
+    col1, col2, col3 = st.columns(3)
     with col1:
-        html = html_gauge("Peak Vol", metrics.get('peak_db', -np.inf), "db", -24, 0,
-                          [(-24, -12, 'red'), (-12, -6, 'orange'), (-6, -3, 'green'), (-3, 0, 'red')])
+        html = html_gauge("Pronunciation", metrics.get('pronunciation_score', None), "", 0, 100,
+                          [(0, 50, 'red'), (50, 70, 'orange'), (70, 100, 'green')])
         st.markdown(html, unsafe_allow_html=True)
     with col2:
-        html = html_gauge("Overall Vol", metrics.get('rms_db', -np.inf), "db", -40, 0,
-                          [(-40, -30, 'red'), (-30, -18, 'orange'), (-18, 0, 'green')])
+        html = html_gauge("Fluency", metrics.get('fluency_score', None), "", 0, 100,
+                          [(0, 50, 'red'), (50, 70, 'orange'), (70, 100, 'green')])
         st.markdown(html, unsafe_allow_html=True)
     with col3:
-        html = html_gauge("SNR", metrics.get('snr_db', np.nan), "db", 0, 60,
-                          [(0, 20, 'red'), (20, 35, 'orange'), (35, 60, 'green')])
-        st.markdown(html, unsafe_allow_html=True)
-    with col4:
-        html = html_gauge("Pronunciation", metrics.get('pronunciation_score', None), "", 0, 100,
+        html = html_gauge("Prosody", metrics.get('prosody_score', None), "", 0, 100,
                           [(0, 50, 'red'), (50, 70, 'orange'), (70, 100, 'green')])
         st.markdown(html, unsafe_allow_html=True)
+    if pending:
+        st.caption("Pronunciation assessment in progress...")
+    elif metrics.get('pronunciation_recognition_ms') is not None:
+        st.caption(f"Assessment latency: setup {metrics['pronunciation_setup_ms']:.0f} ms, "
+                   f"recognition {metrics['pronunciation_recognition_ms']:.0f} ms")
+    if metrics.get('pronunciation_segments'):
+        with st.expander(f"Pronunciation segments ({len(metrics['pronunciation_segments'])})"):
+            st.caption(f"Word score: {metrics['word_score'] or 0:.1f}, "
+                       f"phoneme score: {metrics['phoneme_score'] or 0:.1f}, "
+                       f"completeness: {metrics['completeness_score'] or 0:.1f}")
+            st.dataframe(pd.DataFrame(metrics['pronunciation_segments']), hide_index=True)
+    elif 'pronunciation_error' in metrics:
+        st.warning(f"Pronunciation assessment error: {metrics['pronunciation_error']}")
+    elif assessed(metrics) and metrics.get('pronunciation_score') is None:
+        st.info("Pronunciation assessment not available for this language or no scores returned.")
 
-    # Second row: Fluency, Prosody, Waveform (spanning two columns)
-    col1, col2, col3 = st.columns([1, 1, 2])
+
+# Display metrics
+if analysis:
+    metrics, rate, waveform = analysis
+    st.subheader("Audio Quality Metrics")
+
+    # First row: Peak Volume, Overall Volume, SNR
+    col1, col2, col3 = st.columns(3)
     with col1:
-        html = html_gauge("Fluency", metrics.get('fluency_score', None), "", 0, 100,
-                          [(0, 50, 'red'), (50, 70, 'orange'), (70, 100, 'green')])
+        html = level_gauge('peak_db', metrics.get('peak_db', -np.inf))
         st.markdown(html, unsafe_allow_html=True)
     with col2:
-        html = html_gauge("Prosody", metrics.get('prosody_score', None), "", 0, 100,
-                          [(0, 50, 'red'), (50, 70, 'orange'), (70, 100, 'green')])
+        html = level_gauge('rms_db', metrics.get('rms_db', -np.inf))
         st.markdown(html, unsafe_allow_html=True)
     with col3:
-        fig, ax = plt.subplots(figsize=(4, 1))
-        ax.plot(np.linspace(0, len(waveform) / rate, num=len(waveform)), waveform)
-        ax.axis('off')
-        st.pyplot(fig)
+        html = level_gauge('snr_db', metrics.get('snr_db', np.nan))
+        st.markdown(html, unsafe_allow_html=True)
+
+    # Second row: Pronunciation, Fluency, Prosody (filled in when the assessment completes).
+    # An assessed take is never polled for, whatever the assessor reports.
+    pending = not assessed(metrics) and pronunciation_assessor.pending(analysis_key)
+    st.fragment(pronunciation_panel, run_every=PRONUNCIATION_POLL_SECONDS if pending else None)(
+        analysis_key, metrics, pending)
+
+    # Waveform (pre-reduced min/max envelope, so render cost does not depend on take length)
+    with profiler.span('waveform'):
+        st.markdown(waveform_svg(waveform), unsafe_allow_html=True)
 
     if metrics.get('clipping'):
         st.warning("Clipping detected (possible distortions)")
-    if 'pronunciation_error' in metrics:
-        st.warning(f"Pronunciation assessment error: {metrics['pronunciation_error']}")
-    elif metrics.get('pronunciation_score') is None and speech_key:
-        st.info("Pronunciation assessment not available for this language or no scores returned.")
+
+# Quality report over every accepted take, analysed on a thread pool (worker
+# processes would re-run this script). A shared project keeps one report for
+# all its narrators.
+if st.session_state.scripts or project:
+    if st.button("Analyse Project"):
+        if project:
+            paths = [path for _, _, path in project.takes()]
+        else:
+            completed = [s for s in st.session_state.scripts if s.status == 'Completed' and s.latest_date]
+            files = st.session_state.files
+            paths = [files.path(files.registry.audio(s.num, s.latest_date)) for s in completed]
+        progress_bar = st.progress(0.0, text=f"Analysing {len(paths)} takes...")
+        with profiler.span('analyze_project'):
+            report = analyze_project(paths, workers=ANALYSIS_WORKERS, threads=True,
+                                     progress=lambda done, total: progress_bar.progress(done / total))
+        if project:
+            project.report = report
+        else:
+            st.session_state.project_report = report
+        progress_bar.empty()
+    report = project.report if project else st.session_state.project_report
+    if report is not None:
+        outliers = report[report['outlier']]
+        st.caption(f"Quality report: {len(report)} takes analysed, {len(outliers)} outliers, "
+                   f"{int(report['clipping'].fillna(False).sum())} clipping, {int(report['error'].notna().sum())} errors")
+        if len(outliers):
+            st.dataframe(outliers[['num', 'duration', 'peak_db', 'rms_db', 'snr_db', 'reasons']], hide_index=True)
+        col_csv, col_parquet = st.columns(2)
+        with col_csv:
+            st.download_button("Download Report (CSV)", report.to_csv(index=False).encode(),
+                               file_name="quality_report.csv")
+        with col_parquet:
+            parquet = io.BytesIO()
+            report.to_parquet(parquet, index=False)
+            st.download_button("Download Report (Parquet)", parquet.getvalue(), file_name="quality_report.parquet")
 
 # Download Project button at the bottom
-if st.session_state.scripts:
+if st.session_state.scripts or project:
     if st.button("Download Project"):
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-            # Add scripts.txt
-            scripts_content = "\n".join(f"{s['num']}. {s['text']}" for s in st.session_state.scripts)
-            zip_file.writestr("scripts.txt", scripts_content.encode())
-            # Add removed.txt (renamed from scripts.removed)
-            removed_content = "\n".join(str(num) for num in st.session_state.removed_nums)
-            zip_file.writestr("removed.txt", removed_content.encode())
-            # Add all .txt and .wav from session files
-            for filename, data in st.session_state.files.items():
-                if filename.endswith('.txt') or filename.endswith('.wav'):
-                    zip_file.writestr(filename, data)
-        zip_buffer.seek(0)
+        # scripts.txt, removed.txt, project.json and every take, streamed from
+        # the project store's files on disk rather than session memory
+        files = project.store if project else st.session_state.files
+        if take_encoder.pending(files):
+            with st.spinner(f"Compressing {take_encoder.pending(files)} takes..."):
+                take_encoder.wait(files)
+        with profiler.span('export'):
+            if project:
+                # One archive per shared project; narrators' accepts wait while it is written
+                archive = project.archive
+                archive_path = project.export()
+            else:
+                entries = project_entries(st.session_state.scripts, st.session_state.removed_nums,
+                                          st.session_state.language, {name: files.path(name) for name in files},
+                                          st.session_state.audio_format)
+                # Only entries changed since the last export are written
+                archive = st.session_state.project_archive
+                archive_path = archive.update(entries)
+        st.caption(f"Archive updated: {archive.last_written} entries written "
+                   f"({archive.last_bytes / 1e6:.1f} MB), {os.path.getsize(archive_path) / 1e6:.1f} MB total")
         today = datetime.date.today().strftime('%Y%m%d')
-        st.download_button("Download Project Zip", zip_buffer, file_name=f"project_{today}.zip")
\ No newline at end of file
+        # A shared project's archive may be updated by another narrator's export meanwhile
+        with project.export_lock if project else contextlib.nullcontext():
+            with open(archive_path, 'rb') as archive_file:
+                st.download_button("Download Project Zip", archive_file, file_name=f"project_{today}.zip")
+
+# Project settings and cache counters
+with st.sidebar:
+    # A shared project's settings are its project.json on the server
+    st.text_input("Recognition Language", key="language", disabled=project is not None,
+                  help="Locale used for pronunciation assessment, saved with the project as project.json")
+    st.selectbox("Audio format", AUDIO_FORMATS, key="audio_format", format_func=AUDIO_FORMAT_LABELS.get,
+                 on_change=compress_takes, disabled=project is not None,
+                 help="Format accepted takes are stored and exported in, saved with the project. FLAC takes are "
+                      "compressed in the background after accept; switching back to WAV leaves them as they are.")
+    cache_stats = metrics_cache.stats()
+    st.caption(f"Metrics cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits "
+               f"({cache_stats['disk_hits']} from disk), {cache_stats['misses']} misses, "
+               f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 1e6:.1f} MB")
+    with st.expander("Post-processing"):
+        st.toggle("Process takes on accept", key="postprocess",
+                  help="Trim leading and trailing silence and normalize loudness when a new take is accepted")
+        st.checkbox("Trim silence", key="trim_silence", disabled=not st.session_state.postprocess)
+        st.number_input("Padding (s)", min_value=0.0, max_value=2.0, step=0.05, key="trim_padding",
+                        disabled=not st.session_state.postprocess)
+        st.checkbox("Normalize loudness", key="normalize_level", disabled=not st.session_state.postprocess)
+        st.number_input("Target level (dBFS RMS)", min_value=-40.0, max_value=-6.0, step=1.0, key="target_level",
+                        disabled=not st.session_state.postprocess)
+        processed = [{'duration_before': s.raw_time, 'duration_after': s.record_time}
+                     for s in st.session_state.scripts if s.raw_time is not None and s.status == 'Completed']
+        if processed:
+            saved = savings(processed)
+            st.caption(f"{saved['takes']} takes processed: {saved['before'] / 60:.1f} -> {saved['after'] / 60:.1f} min, "
+                       f"saved {saved['saved']:.0f} s ({saved['saved_ratio']:.0%})")
+    store = st.session_state.files
+    st.caption(f"Project store: {len(store)} files, {store.disk_bytes() / 1e6:.1f} MB on disk, "
+               f"{store.memory_bytes() / 1e6:.1f} / {store.memory_budget / 1e6:.0f} MB in memory")
+    if project:
+        shared_stats = project.stats()
+        st.caption(f"Shared project: {len(project.store)} files, {project.store.disk_bytes() / 1e6:.1f} MB on disk, "
+                   f"{len(project.narrators())} narrators recording; since the server started "
+                   f"{shared_stats['accepts']} takes accepted, {shared_stats['removes']} scripts removed, "
+                   f"{shared_stats['expired']} leases expired")
+    if st.session_state.audio_format == 'flac':
+        encoder_stats = take_encoder.stats()
+        pending_takes = take_encoder.pending(project.store if project else store)
+        st.caption(f"FLAC: {pending_takes} takes of this project pending; "
+                   f"{encoder_stats['encoded']} compressed in all sessions, "
+                   f"{encoder_stats['bytes_before'] / 1e6:.1f} -> {encoder_stats['bytes_after'] / 1e6:.1f} MB")
+    if speech_key:
+        pool_stats = get_recognizer_pool(speech_key, SPEECH_REGION, st.session_state.language).stats()
+        st.caption(f"Azure recognizers: {pool_stats['warm_hits']} warm / {pool_stats['cold_builds']} cold, "
+                   f"avg setup {pool_stats['avg_setup_ms']:.0f} ms, "
+                   f"avg recognition {pool_stats['avg_recognition_ms']:.0f} ms")
+
+# End of the rerun: its spans plus this session's memory. The developer panel
+# below shows this rerun, so its own rendering is not included.
+profiler.set_gauge('metrics_cache_bytes', cache_stats['bytes'])
+st.session_state.last_run = profiler.end_run(
+    session=st.session_state.session_id, session_files=len(store), session_memory_bytes=store.memory_bytes(),
+    session_disk_bytes=store.disk_bytes(), session_audio_bytes=len(st.session_state.temp_audio or b""))
+if METRICS_FILE:
+    profiler.write_prometheus(METRICS_FILE)
+
+# Developer panel: per-rerun breakdown and process-wide span statistics
+with st.sidebar:
+    with st.expander("Developer"):
+        st.toggle("Show profiling", key="show_profiling")
+        run = st.session_state.last_run
+        if st.session_state.show_profiling and run is not None:
+            st.caption(f"Last rerun: {run.total * 1000:.1f} ms, session store {run.gauges['session_files']} files, "
+                       f"{run.gauges['session_memory_bytes'] / 1e6:.1f} MB in memory, "
+                       f"{run.gauges['session_disk_bytes'] / 1e6:.1f} MB on disk")
+            st.dataframe(pd.DataFrame([{'Span': name, 'ms': seconds * 1000, 'Calls': calls,
+                                        'Share': seconds / run.total if run.total else 0.0}
+                                       for name, seconds, calls in run.breakdown()],
+                                      columns=['Span', 'ms', 'Calls', 'Share']),
+                         column_config={'ms': st.column_config.NumberColumn(format="%.1f"),
+                                        'Share': st.column_config.ProgressColumn(min_value=0.0, max_value=1.0)},
+                         hide_index=True)
+            span_stats = profiler.stats()
+            st.caption("All sessions since start")
+            st.dataframe(pd.DataFrame([{'Span': name, 'Count': stats['count'],
+                                        'Mean ms': stats['sum'] / stats['count'] * 1000,
+                                        'Max ms': stats['max'] * 1000}
+                                       for name, stats in sorted(span_stats.items())]),
+                         column_config={'Mean ms': st.column_config.NumberColumn(format="%.1f"),
+                                        'Max ms': st.column_config.NumberColumn(format="%.1f")},
+                         hide_index=True)
+            st.download_button("Download metrics (JSON)", profiler.to_json(run), file_name="metrics.json",
+                               mime="application/json")
+            st.download_button("Download metrics (Prometheus)", profiler.to_prometheus(), file_name="metrics.prom",
+                               mime="text/plain")
@@ -0,0 +1,65 @@
+# Throughput of batch project analysis (voicerecorder.batch) in files per
+# second, overall and per worker, across worker counts and chunk sizes. Workers
+# are processes, as for the CLI, or with --threads threads, as in the app.
+# Takes are synthetic WAVs written to a temporary directory. Run from the
+# repository root:
+#
+#     python -m benchmarks.bench_batch [--files 400] [--seconds 5] [--workers 1 2 4] [--chunk-size 1 8] [--threads]
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+from voicerecorder.batch import analyze_project, chunk_size_for, default_workers, project_wavs
+from voicerecorder.registry import script_filename
+
+
+def make_project(directory, files, seconds, rate):
+    rng = np.random.default_rng(0)
+    for num in range(1, files + 1):
+        samples = (rng.standard_normal(int(seconds * rate)) * 3000).astype(np.int16)
+        wavfile.write(os.path.join(directory, script_filename(num, "20260101", 'wav')), rate, samples)
+        with open(os.path.join(directory, script_filename(num, "20260101", 'txt')), 'w') as f:
+            f.write(f"text {num}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark batch project analysis throughput")
+    parser.add_argument('--files', type=int, default=400)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="Worker counts to try (default: 1 up to the CPU count, doubling)")
+    parser.add_argument('--chunk-size', type=int, nargs='+', default=[0],
+                        help="Files per task to try; 0 uses the automatic size")
+    parser.add_argument('--threads', action='store_true', help="Analyse on a thread pool, as the app does")
+    args = parser.parse_args(argv)
+
+    workers_list = args.workers
+    if workers_list is None:
+        workers_list = [1]
+        while workers_list[-1] * 2 <= default_workers():
+            workers_list.append(workers_list[-1] * 2)
+    with tempfile.TemporaryDirectory() as directory:
+        make_project(directory, args.files, args.seconds, args.rate)
+        paths = [path for _, _, path in project_wavs(directory)]
+        audio_mb = sum(os.path.getsize(path) for path in paths) / 1e6
+        print(f"{len(paths)} takes of {args.seconds:.0f} s at {args.rate} Hz ({audio_mb:.0f} MB), "
+              f"{os.cpu_count()} CPUs, worker {'threads' if args.threads else 'processes'}")
+        print(f"{'workers':>8} {'chunk':>6} {'seconds':>8} {'files/s':>8} {'files/s/core':>13}")
+        for workers in workers_list:
+            for chunk_size in args.chunk_size:
+                chunk_size = chunk_size or chunk_size_for(len(paths), workers)
+                start = time.perf_counter()
+                report = analyze_project(paths, workers=workers, chunk_size=chunk_size, threads=args.threads)
+                elapsed = time.perf_counter() - start
+                assert report['error'].isna().all()
+                rate = len(paths) / elapsed
+                print(f"{workers:>8} {chunk_size:>6} {elapsed:>8.2f} {rate:>8.1f} {rate / workers:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Post-take work on a new recording: the previous pipeline (wave.open for the
+# record time, scipy's wavfile.read, a mono slice and a float32 copy) versus a
+# single decode_wav() shared by the record time, metrics and waveform. Reports
+# best wall time and peak traced allocations per take, for 16-bit, 24-bit and
+# float WAVs. Run from the repository root:
+#
+#     python -m benchmarks.bench_decode [--seconds 30 120] [--rate 48000]
+import argparse
+import io
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+import soundfile as sf
+from scipy.io import wavfile
+
+from voicerecorder.audio import decode_wav
+from voicerecorder.metrics import analyze_decoded, analyze_samples
+from voicerecorder.waveform import min_max_envelope
+
+SUBTYPES = ('PCM_16', 'PCM_24', 'FLOAT')
+
+
+def make_wav(seconds, rate, subtype):
+    rng = np.random.default_rng(0)
+    samples = np.clip(rng.standard_normal(int(seconds * rate)) * 0.1, -1, 1)
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, rate, subtype=subtype, format='WAV')
+    return buffer.getvalue()
+
+
+def legacy_pipeline(audio_bytes):
+    with wave.open(io.BytesIO(audio_bytes), 'rb') as w:
+        record_time = w.getnframes() / w.getframerate()
+    rate, data = wavfile.read(io.BytesIO(audio_bytes))
+    if data.ndim > 1:
+        data = data[:, 0]
+    samples = data.astype(np.float32)
+    samples *= np.float32(1.0 / np.iinfo(data.dtype).max)
+    metrics = analyze_samples(samples, rate)
+    return record_time, metrics, min_max_envelope(data)
+
+
+def decoded_pipeline(audio_bytes):
+    header, samples = decode_wav(audio_bytes)
+    metrics, rate, data = analyze_decoded(header, samples)
+    return header['duration'], metrics, min_max_envelope(data, full_scale=header['full_scale'])
+
+
+def measure(fn, audio_bytes, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(audio_bytes)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(audio_bytes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the single-decode take pipeline")
+    parser.add_argument('--seconds', type=float, nargs='+', default=[30, 120])
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'format':>7} {'take (s)':>9} {'legacy ms':>10} {'legacy MB':>10} {'decoded ms':>11} {'decoded MB':>11}")
+    for subtype in SUBTYPES:
+        for seconds in args.seconds:
+            audio_bytes = make_wav(seconds, args.rate, subtype)
+            try:
+                legacy_ms, legacy_peak = measure(legacy_pipeline, audio_bytes, args.repeat)
+                legacy = f"{legacy_ms * 1e3:>10.1f} {legacy_peak / 1e6:>10.1f}"
+            except Exception as e:
+                legacy = f"{'fails: ' + type(e).__name__:>21}"
+            decoded_ms, decoded_peak = measure(decoded_pipeline, audio_bytes, args.repeat)
+            print(f"{subtype:>7} {seconds:>9.0f} {legacy} {decoded_ms * 1e3:>11.1f} {decoded_peak / 1e6:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# Export throughput (MB/s) and peak RSS of "Download Project": the original
+# in-memory BytesIO/writestr build versus the incremental on-disk ProjectArchive,
+# for a full export and for a re-export after a few takes changed. Each variant
+# runs in its own process so peak RSS is not shared. Run from the repository root:
+#
+#     python -m benchmarks.bench_export [--scripts 1000] [--seconds 5] [--rate 16000]
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+from scipy.io import wavfile
+
+from voicerecorder.export import ProjectArchive
+
+
+def make_project(root, scripts, seconds, rate):
+    rng = np.random.default_rng(0)
+    bio = io.BytesIO()
+    wavfile.write(bio, rate, (rng.standard_normal(int(seconds * rate)) * 3000).astype(np.int16))
+    audio = bio.getvalue()
+    for num in range(1, scripts + 1):
+        with open(os.path.join(root, f"script{num:04d}_20240101.wav"), 'wb') as f:
+            f.write(audio)
+        with open(os.path.join(root, f"script{num:04d}_20240101.txt"), 'wb') as f:
+            f.write(f"script {num}".encode())
+
+
+def project_entries(root):
+    entries = {"scripts.txt": b"1. text", "removed.txt": b""}
+    for name in sorted(os.listdir(root)):
+        if name.endswith('.txt') or name.endswith('.wav'):
+            entries[name] = os.path.join(root, name)
+    return entries
+
+
+# The original export: read every payload into memory and build the ZIP in a BytesIO
+def legacy_export(root):
+    files = {name: open(path, 'rb').read() if isinstance(path, str) else path
+             for name, path in project_entries(root).items()}
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
+        for filename, data in files.items():
+            zip_file.writestr(filename, data)
+    zip_buffer.seek(0)
+    return len(zip_buffer.getvalue())
+
+
+def touch_takes(root, count):
+    names = sorted(n for n in os.listdir(root) if n.endswith('.wav'))[:count]
+    for name in names:
+        path = os.path.join(root, name)
+        with open(path, 'r+b') as f:
+            f.seek(-2, 2)
+            f.write(os.urandom(2))
+
+
+def run_variant(variant, root, changed):
+    archive_path = os.path.join(root, ".export", "project.zip")
+    if variant == 'legacy-full':
+        start = time.perf_counter()
+        size = legacy_export(root)
+    elif variant == 'archive-full':
+        start = time.perf_counter()
+        ProjectArchive(archive_path).update(project_entries(root))
+        size = os.path.getsize(archive_path)
+    elif variant == 'legacy-reexport':
+        legacy_export(root)
+        touch_takes(root, changed)
+        start = time.perf_counter()
+        size = legacy_export(root)
+    else:
+        archive = ProjectArchive(archive_path)
+        archive.update(project_entries(root))
+        touch_takes(root, changed)
+        start = time.perf_counter()
+        archive.update(project_entries(root))
+        size = os.path.getsize(archive_path)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': elapsed, 'bytes': size, 'peak_rss_mb': peak_kb / 1024}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Download Project export")
+    parser.add_argument('--scripts', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--rate', type=int, default=16000)
+    parser.add_argument('--changed', type=int, default=10, help="takes modified before the re-export")
+    parser.add_argument('--variant', help=argparse.SUPPRESS)
+    parser.add_argument('--root', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        run_variant(args.variant, args.root, args.changed)
+        return
+
+    print(f"{'variant':>16} {'time s':>8} {'MB/s':>8} {'archive MB':>11} {'peak RSS MB':>12}")
+    for variant in ('legacy-full', 'archive-full', 'legacy-reexport', 'archive-reexport'):
+        with tempfile.TemporaryDirectory() as root:
+            make_project(root, args.scripts, args.seconds, args.rate)
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_export', '--variant', variant,
+                                  '--root', root, '--changed', str(args.changed)],
+                                 check=True, capture_output=True, text=True).stdout
+        result = json.loads(out)
+        mb = result['bytes'] / 1e6
+        print(f"{variant:>16} {result['seconds']:>8.2f} {mb / result['seconds']:>8.0f} {mb:>11.1f} "
+              f"{result['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# FLAC storage mode: size and speed of compressing takes (encode_flac) against
+# keeping them as WAV, on synthetic speech-like takes (benchmarks.synthetic)
+# or on real recordings given with --files. For each sample format and
+# compression level it reports the FLAC/WAV size ratio, encode time per take
+# and its speed as a multiple of real time, and the decode time per take of
+# FLAC (decode_flac, a real decode) and WAV (decode_wav, a zero-copy view for
+# 16-bit). Header reads and cache keys, which loading and re-selecting a take
+# need, are timed once for each format. Run from the repository root:
+#
+#     python -m benchmarks.bench_flac [--takes 20] [--levels 0 0.5 1] [--files take1.wav take2.wav ...]
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+import soundfile as sf
+
+from benchmarks.synthetic import RATES, SECONDS, synthetic_take
+from voicerecorder.audio import BufferFile, decode_flac, decode_wav, encode_flac, read_audio_header
+from voicerecorder.cache import MetricsCache
+
+
+# The same takes rewritten at another PCM subtype (e.g. 24-bit), with noise
+# below the 16-bit step so the extra bits are not empty (FLAC would store
+# empty low bits for free and flatter the ratio)
+def convert(wavs, subtype, rng):
+    converted = []
+    for audio in wavs:
+        samples, rate = sf.read(io.BytesIO(audio), dtype='float64')
+        samples += rng.uniform(-0.5, 0.5, len(samples)) / 32768
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, rate, subtype=subtype, format='WAV')
+        converted.append(buffer.getvalue())
+    return converted
+
+
+# Median seconds per item of fn over items, best of `repeat` passes
+def per_item(fn, items, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        times = []
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            times.append(time.perf_counter() - start)
+        best = min(best, statistics.median(times))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FLAC compression of takes")
+    parser.add_argument('--takes', type=int, default=20, help="synthetic takes per format")
+    parser.add_argument('--seconds', type=float, nargs=2, default=SECONDS, metavar=('MIN', 'MAX'))
+    parser.add_argument('--rates', type=int, nargs='+', default=RATES)
+    parser.add_argument('--subtypes', nargs='+', default=['PCM_16', 'PCM_24'])
+    parser.add_argument('--levels', type=float, nargs='+', default=[0.0, 0.625, 1.0],
+                        help="soundfile compression levels (0.625 is libFLAC's default, level 5)")
+    parser.add_argument('--files', nargs='+', help="benchmark these WAV files instead of synthetic takes")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.files:
+        wavs = []
+        for path in args.files:
+            with open(path, 'rb') as f:
+                wavs.append(f.read())
+        formats = {'files': wavs}
+    else:
+        rng = np.random.default_rng(args.seed)
+        takes = [synthetic_take(rng.uniform(*args.seconds), args.rates[i % len(args.rates)], rng)
+                 for i in range(args.takes)]
+        formats = {subtype: takes if subtype == 'PCM_16' else convert(takes, subtype, rng)
+                   for subtype in args.subtypes}
+
+    print(f"{'format':>7} {'level':>6} {'WAV MB':>8} {'FLAC MB':>8} {'ratio':>6} {'enc ms':>7} {'enc xRT':>8} "
+          f"{'dec FLAC ms':>12} {'dec WAV ms':>11}")
+    for name, wavs in formats.items():
+        seconds = sum(read_audio_header(BufferFile(audio))['duration'] for audio in wavs)
+        wav_bytes = sum(len(audio) for audio in wavs)
+        decode_wav_ms = per_item(decode_wav, wavs, args.repeat) * 1e3
+        for level in args.levels:
+            flacs = [encode_flac(audio, level) for audio in wavs]
+            if any(flac is None for flac in flacs):
+                print(f"{name:>7} {level:>6.3f} {'not a format FLAC holds exactly':>40}")
+                break
+            encode = per_item(lambda audio: encode_flac(audio, level), wavs, args.repeat)
+            decode_flac_ms = per_item(decode_flac, flacs, args.repeat) * 1e3
+            flac_bytes = sum(len(flac) for flac in flacs)
+            print(f"{name:>7} {level:>6.3f} {wav_bytes / 1e6:>8.2f} {flac_bytes / 1e6:>8.2f} "
+                  f"{flac_bytes / wav_bytes:>6.2f} {encode * 1e3:>7.2f} {seconds / len(wavs) / encode:>8.0f} "
+                  f"{decode_flac_ms:>12.2f} {decode_wav_ms:>11.2f}")
+
+    # Loading a project reads only headers; the cache key of a FLAC take comes from its tag, not its bytes
+    wavs = next(iter(formats.values()))
+    flacs = [encode_flac(audio) for audio in wavs]
+
+    def header(audio):
+        return read_audio_header(BufferFile(audio))
+
+    print(f"\nPer take: header {per_item(header, wavs, args.repeat) * 1e6:.0f} us WAV / "
+          f"{per_item(header, flacs, args.repeat) * 1e6:.0f} us FLAC, "
+          f"cache key {per_item(MetricsCache.key, wavs, args.repeat) * 1e6:.0f} us WAV / "
+          f"{per_item(MetricsCache.key, flacs, args.repeat) * 1e6:.0f} us FLAC")
+
+
+if __name__ == '__main__':
+    main()
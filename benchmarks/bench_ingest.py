@@ -0,0 +1,115 @@
+# Time and peak memory of "Continue Project" ingestion: the original read-everything
+# loop versus name-based planning + header-only parsing on a thread pool.
+# Run from the repository root:
+#
+#     python -m benchmarks.bench_ingest [--files 5000] [--seconds 1] [--rate 16000]
+import argparse
+import io
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+from voicerecorder.ingest import ingest_files, plan_ingest
+from voicerecorder.storage import ProjectStore
+
+
+# Stand-in for Streamlit's UploadedFile (an in-memory BytesIO with a name)
+class Upload(io.BytesIO):
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def wav_bytes(seconds, rate):
+    bio = io.BytesIO()
+    with wave.open(bio, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.zeros(int(seconds * rate), dtype=np.int16).tobytes())
+    return bio.getvalue()
+
+
+# A project where one script in four also has an older take, so ~20% of the
+# files are superseded and dropped on load
+def synthetic_uploads(files, seconds, rate):
+    audio = wav_bytes(seconds, rate)
+    uploads = []
+    num = 0
+    while len(uploads) < files:
+        num += 1
+        dates = ['20240101', '20240301'] if num % 4 == 0 else ['20240301']
+        for date in dates:
+            uploads.append(Upload(f"script{num:04d}_{date}.txt", f"script {num}".encode()))
+            uploads.append(Upload(f"script{num:04d}_{date}.wav", audio))
+    return uploads[:files], num
+
+
+# The loop app.py ran before the ingestion pipeline: read every file, keep all bytes
+def legacy_ingest(uploads):
+    files = {}
+    paired = {}
+    for file in uploads:
+        file.seek(0)
+        parts = file.name.split('_')
+        num = int(parts[0][6:])
+        date_part = parts[1].split('.')[0]
+        bytes_data = file.read()
+        files[file.name] = bytes_data
+        if file.name.endswith('.txt'):
+            paired.setdefault(num, []).append((date_part, 'txt', bytes_data.decode().strip()))
+        else:
+            with wave.open(io.BytesIO(bytes_data), 'rb') as w:
+                paired.setdefault(num, []).append((date_part, 'wav', w.getnframes() / float(w.getframerate())))
+    return files
+
+
+def pipeline_ingest(uploads, script_nums):
+    store = ProjectStore(memory_budget=0)
+    keep = plan_ingest([u.name for u in uploads], script_nums, set())
+    ingest_files(store, [u for u in uploads if u.name in keep])
+    return store
+
+
+# Bytes the session keeps holding once the uploads are released
+def retained_bytes(result):
+    if isinstance(result, ProjectStore):
+        return result.memory_bytes()
+    return sum(len(data) for data in result.values())
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    retained = retained_bytes(result)
+    del result
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak, retained
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Continue Project ingestion")
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--seconds', type=float, default=1.0)
+    parser.add_argument('--rate', type=int, default=16000)
+    args = parser.parse_args(argv)
+
+    uploads, scripts = synthetic_uploads(args.files, args.seconds, args.rate)
+    total_mb = sum(len(u.getbuffer()) for u in uploads) / 1e6
+    print(f"{len(uploads)} files ({scripts} scripts, {total_mb:.1f} MB of uploads)")
+    print(f"{'':>10} {'time s':>8} {'files/s':>9} {'peak MB':>9} {'retained MB':>12}")
+    for label, fn, fn_args in (('legacy', legacy_ingest, (uploads,)),
+                               ('pipeline', pipeline_ingest, (uploads, set(range(1, scripts + 1))))):
+        elapsed, peak, retained = measure(fn, *fn_args)
+        print(f"{label:>10} {elapsed:>8.2f} {len(uploads) / elapsed:>9.0f} {peak / 1e6:>9.1f} {retained / 1e6:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
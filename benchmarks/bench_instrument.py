@@ -0,0 +1,68 @@
+# Cost of the app's instrumentation: a span inside a rerun, a span with no
+# rerun open (fragment reruns, worker threads), observe() from several threads
+# at once, and the JSON / Prometheus exports after --spans distinct span names
+# have been recorded. Run from the repository root:
+#
+#     python -m benchmarks.bench_instrument [--calls 200000] [--threads 4]
+import argparse
+import threading
+import time
+
+from voicerecorder.instrument import Profiler
+
+
+def time_spans(profiler, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        with profiler.span('bench'):
+            pass
+    return time.perf_counter() - start
+
+
+def time_threaded_observe(profiler, calls, threads):
+    def work():
+        for _ in range(calls // threads):
+            profiler.observe('bench_threads', 0.001)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark profiler span overhead and metric export")
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--spans', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    profiler = Profiler()
+    print(f"{'case':<28} {'us/call':>8}")
+    # A long rerun keeps every span, so measure a realistic number per run
+    per_run = 100
+    elapsed = 0.0
+    for _ in range(args.calls // per_run):
+        profiler.begin_run()
+        elapsed += time_spans(profiler, per_run)
+        profiler.end_run()
+    print(f"{'span in rerun':<28} {elapsed / args.calls * 1e6:>8.2f}")
+    print(f"{'span outside rerun':<28} {time_spans(profiler, args.calls) / args.calls * 1e6:>8.2f}")
+    elapsed = time_threaded_observe(profiler, args.calls, args.threads)
+    print(f"{f'observe, {args.threads} threads':<28} {elapsed / args.calls * 1e6:>8.2f}")
+
+    for i in range(args.spans):
+        profiler.observe(f"span_{i}", 0.01)
+        profiler.set_gauge('session_memory_bytes', 1 << 20, session=f"s{i}")
+    for label, export in [("to_json", profiler.to_json), ("to_prometheus", profiler.to_prometheus)]:
+        start = time.perf_counter()
+        for _ in range(100):
+            export()
+        print(f"{label:<28} {(time.perf_counter() - start) / 100 * 1e6:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Server work after a take, with and without live metering: decoding the WAV
+# and computing levels plus the waveform envelope on the server, versus
+# unpacking the values the level meter component measured in the browser.
+# Run from the repository root:
+#
+#     python -m benchmarks.bench_live [--seconds 5 30 120] [--rate 48000]
+import argparse
+import io
+import json
+import struct
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+from voicerecorder.live import take_from_value
+from voicerecorder.metrics import analyze_wav
+from voicerecorder.waveform import ENVELOPE_WIDTH, min_max_envelope
+
+
+def make_wav(seconds, rate):
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(int(seconds * rate)) * 3000).astype(np.int16)
+    buffer = io.BytesIO()
+    wavfile.write(buffer, rate, samples)
+    return buffer.getvalue()
+
+
+# The binary value the component sends when a take is finished
+def make_value(audio_bytes, rate):
+    metrics, _, data = analyze_wav(audio_bytes)
+    header = {'take': 'take_0-0', 'rate': rate, 'duration': len(data) / rate,
+              'metrics': {name: str(float(value)) if name != 'clipping' else value for name, value in metrics.items()},
+              'envelope': min_max_envelope(data).tolist()}
+    header = json.dumps(header).encode()
+    return struct.pack('<I', len(header)) + header + audio_bytes
+
+
+def server_analysis(audio_bytes):
+    metrics, rate, data = analyze_wav(audio_bytes)
+    return metrics, rate, min_max_envelope(data, ENVELOPE_WIDTH)
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark post-take server work with and without live metering")
+    parser.add_argument('--seconds', type=float, nargs='+', default=[5, 30, 120])
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'seconds':>8} {'server ms':>10} {'live ms':>8}")
+    for seconds in args.seconds:
+        audio_bytes = make_wav(seconds, args.rate)
+        value = make_value(audio_bytes, args.rate)
+        server = best_of(lambda: server_analysis(audio_bytes), args.repeat)
+        live = best_of(lambda: take_from_value(value), args.repeat)
+        print(f"{seconds:>8.0f} {server * 1e3:>10.1f} {live * 1e3:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Compare the vectorized metrics engine against the original list-comprehension
+# implementation. Run from the repository root:
+#
+#     python -m benchmarks.bench_metrics [--seconds 30 60 120] [--rate 48000]
+import argparse
+import io
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+from voicerecorder.metrics import analyze_wav
+
+
+# The implementation app.py shipped with before the metrics engine
+def legacy_metrics(audio_bytes):
+    metrics = {}
+    rate, data = wavfile.read(io.BytesIO(audio_bytes))
+    if data.ndim > 1:
+        data = data[:, 0]
+    data_norm = data.astype(np.float32) / np.iinfo(data.dtype).max
+    peak_db = 20 * np.log10(np.max(np.abs(data_norm))) if np.max(np.abs(data_norm)) > 0 else -np.inf
+    rms_db = 20 * np.log10(np.sqrt(np.mean(data_norm ** 2))) if np.mean(data_norm ** 2) > 0 else -np.inf
+    metrics['peak_db'] = peak_db
+    metrics['rms_db'] = rms_db
+    window_size = int(0.1 * rate)
+    rms_windows = [np.sqrt(np.mean(data_norm[start:start + window_size] ** 2)) for start in
+                   range(0, len(data_norm), window_size)]
+    noise_rms = min(rms_windows) if rms_windows else 0
+    signal_rms = np.sqrt(np.mean(data_norm ** 2))
+    metrics['snr_db'] = 20 * np.log10(signal_rms / noise_rms) if noise_rms > 0 else np.inf
+    metrics['clipping'] = np.any(np.abs(data_norm) >= 1.0)
+    return metrics, rate, data
+
+
+def synthetic_take(seconds, rate, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    speech = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+    noise = 0.003 * rng.standard_normal(len(t))
+    samples = np.clip((speech + noise) * 32767, -32768, 32767).astype(np.int16)
+    bio = io.BytesIO()
+    wavfile.write(bio, rate, samples)
+    return bio.getvalue()
+
+
+def best_of(fn, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark compute_audio_metrics")
+    parser.add_argument('--seconds', type=float, nargs='+', default=[10, 60, 120])
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'take (s)':>9} {'legacy ms':>10} {'engine ms':>10} {'legacy ms/s':>12} {'engine ms/s':>12} {'speedup':>8}")
+    for seconds in args.seconds:
+        audio = synthetic_take(seconds, args.rate)
+        new, _, _ = analyze_wav(audio)
+        old, _, _ = legacy_metrics(audio)
+        for key in ('peak_db', 'rms_db', 'snr_db'):
+            assert np.isclose(new[key], old[key], rtol=1e-4), (key, new[key], old[key])
+        legacy = best_of(legacy_metrics, audio, args.repeat)
+        engine = best_of(analyze_wav, audio, args.repeat)
+        print(f"{seconds:>9.0f} {legacy * 1e3:>10.1f} {engine * 1e3:>10.1f} "
+              f"{legacy * 1e3 / seconds:>12.3f} {engine * 1e3 / seconds:>12.3f} {legacy / engine:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
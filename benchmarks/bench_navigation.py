@@ -0,0 +1,79 @@
+# Navigation latency of the Scripts view: runs app.py headless (Streamlit's
+# AppTest) on a synthetic project and clicks Next repeatedly, timing each full
+# rerun. Also reports the size of the table payload sent per step and how many
+# steps remounted the grid (a new element id), which used to be every step.
+# Run from the repository root:
+#
+#     python -m benchmarks.bench_navigation [--scripts 100 1000 5000] [--steps 10] [--app app.py]
+import argparse
+import os
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from voicerecorder.scripts import Script, ScriptCollection
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def make_scripts(count):
+    scripts = ScriptCollection(Script(i + 1, f"Synthetic script line number {i + 1} with some extra words to preview",
+                                      ('Not started', 'Completed', 'Removed')[i % 3]) for i in range(count))
+    scripts.selected = 0
+    return scripts
+
+
+def table_element(at):
+    return at.dataframe[0].proto
+
+
+def click(at, label):
+    for button in at.button:
+        if button.label == label:
+            button.click()
+            return
+    raise LookupError(label)
+
+
+def measure(app_path, count, steps):
+    at = AppTest.from_file(app_path, default_timeout=120)
+    at.session_state['scripts'] = make_scripts(count)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception)
+    element_id = table_element(at).id
+    timings = []
+    payload = []
+    remounts = 0
+    for _ in range(steps):
+        click(at, "Next")
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception)
+        proto = table_element(at)
+        payload.append(proto.ByteSize())
+        if proto.id != element_id:
+            remounts += 1
+            element_id = proto.id
+    return statistics.median(timings), max(timings), statistics.mean(payload), remounts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark navigation latency in the Scripts view")
+    parser.add_argument('--scripts', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--app', default=APP_PATH, help="app script to run (e.g. an older revision)")
+    args = parser.parse_args(argv)
+
+    print(f"{'scripts':>8} {'median ms':>10} {'max ms':>8} {'payload KB':>11} {'remounts':>9}")
+    for count in args.scripts:
+        median, worst, payload, remounts = measure(os.path.abspath(args.app), count, args.steps)
+        print(f"{count:>8} {median * 1e3:>10.1f} {worst * 1e3:>8.1f} {payload / 1024:>11.1f} "
+              f"{remounts:>5}/{args.steps}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# Cost and savings of accept-time post-processing (voicerecorder.postprocess)
+# on synthetic takes: speech-like tone bursts with leading and trailing room
+# noise. Run from the repository root:
+#
+#     python -m benchmarks.bench_postprocess [--speech 3 10] [--silence 1.5] [--rate 48000]
+import argparse
+import io
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+from voicerecorder.postprocess import process_take
+
+
+def make_take(speech_seconds, silence_seconds, rate, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(speech_seconds * rate)) / rate
+    speech = 0.2 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    noise = lambda seconds: 0.001 * rng.standard_normal(int(seconds * rate))
+    samples = np.concatenate([noise(silence_seconds), speech + noise(speech_seconds), noise(silence_seconds * 1.5)])
+    buffer = io.BytesIO()
+    wavfile.write(buffer, rate, (samples * 32767).astype(np.int16))
+    return buffer.getvalue()
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark silence trimming and loudness normalization")
+    parser.add_argument('--speech', type=float, nargs='+', default=[3, 10, 60])
+    parser.add_argument('--silence', type=float, default=1.5, help="Leading silence; trailing is 1.5x this")
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'speech (s)':>10} {'before (s)':>10} {'after (s)':>9} {'saved':>6} {'gain dB':>8} "
+          f"{'trim ms':>8} {'trim+norm ms':>13}")
+    for speech in args.speech:
+        audio_bytes = make_take(speech, args.silence, args.rate)
+        trim_ms, _ = best_of(lambda: process_take(audio_bytes, target_db=None), args.repeat)
+        full_ms, (_, info) = best_of(lambda: process_take(audio_bytes), args.repeat)
+        saved = 1 - info['duration_after'] / info['duration_before']
+        print(f"{speech:>10.0f} {info['duration_before']:>10.2f} {info['duration_after']:>9.2f} {saved:>6.0%} "
+              f"{info['gain_db']:>8.1f} {trim_ms * 1e3:>8.1f} {full_ms * 1e3:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
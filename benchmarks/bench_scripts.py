@@ -0,0 +1,117 @@
+# Memory per script and per-operation cost of the script store at project
+# scale: the original list of dicts (with a 'selected' flag on every row and
+# linear passes) versus ScriptCollection. Run from the repository root:
+#
+#     python -m benchmarks.bench_scripts [--scripts 100000]
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from voicerecorder.scripts import Script, ScriptCollection
+
+# Share of the project already recorded; the rest is still to do
+COMPLETED_SHARE = 0.9
+
+
+def script_text(i):
+    return f"Synthetic script line number {i + 1} with some extra words"
+
+
+def script_status(i, count):
+    return 'Completed' if i < COMPLETED_SHARE * count else 'Not started'
+
+
+def make_dicts(count):
+    return [{'num': i + 1, 'text': script_text(i), 'status': script_status(i, count), 'record_time': 0.0,
+             'selected': i == 0} for i in range(count)]
+
+
+def make_records(count):
+    return [Script(i + 1, script_text(i), script_status(i, count)) for i in range(count)]
+
+
+# Bytes per script allocated by fn, minus the script texts every layout holds
+def footprint(fn, count, text_bytes=0):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return (after - before - text_bytes) / count
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def legacy_select(scripts, i):
+    for script in scripts:
+        script['selected'] = False
+    scripts[i]['selected'] = True
+
+
+def legacy_lookup(scripts, num):
+    return next(i for i, s in enumerate(scripts) if s['num'] == num)
+
+
+def legacy_add(scripts, new_texts):
+    existing_texts = set(s['text'].strip() for s in scripts)
+    new_entries = [text for text in new_texts if text not in existing_texts]
+    max_num = max(s['num'] for s in scripts) if scripts else 0
+    return new_entries, max_num
+
+
+def legacy_next_status(scripts, i, status):
+    for step in range(1, len(scripts)):
+        j = (i + step) % len(scripts)
+        if scripts[j]['status'] == status:
+            return j
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark script store memory and operation cost")
+    parser.add_argument('--scripts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    count = args.scripts
+
+    text_bytes = sum(sys.getsizeof(script_text(i)) for i in range(count))
+    records = make_records(count)
+    print(f"{count} scripts, bytes per script excluding text:")
+    print(f"  list of dicts        {footprint(lambda: make_dicts(count), count, text_bytes):>6.0f}")
+    print(f"  Script records       {footprint(lambda: make_records(count), count, text_bytes):>6.0f}")
+    print(f"  collection indexes   {footprint(lambda: ScriptCollection(records), count):>6.0f}")
+    print()
+
+    dicts = make_dicts(count)
+    collection = ScriptCollection(records)
+    collection.selected = 0
+    middle = count // 2
+    new_texts = [f"Added script {i}" for i in range(100)]
+    ops = [
+        ("select", lambda: legacy_select(dicts, middle), lambda: setattr(collection, 'selected', middle)),
+        ("lookup by num", lambda: legacy_lookup(dicts, count - 1), lambda: collection.position(count - 1)),
+        ("add 100 scripts (dedup)", lambda: legacy_add(dicts, new_texts),
+         lambda: [collection.has_text(text) for text in new_texts]),
+        ("next by status", lambda: legacy_next_status(dicts, 0, 'Not started'),
+         lambda: collection.index.next(0, 'Not started')),
+        ("set status", lambda: dicts[middle].update(status='Completed'),
+         lambda: collection.set_status(middle, 'Completed')),
+    ]
+    print(f"{'operation':>24} {'dicts ms':>10} {'collection ms':>14}")
+    for name, legacy, new in ops:
+        print(f"{name:>24} {best_of(legacy, args.repeat) * 1e3:>10.3f} {best_of(new, args.repeat) * 1e3:>14.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+# Shared projects: several narrators recording into one SharedProject at once,
+# as concurrent app sessions do (Streamlit runs each session's reruns on a
+# thread of its own). A synthetic project (benchmarks.synthetic) is generated
+# once; for each narrator count a fresh hard-linked copy is opened and every
+# narrator thread loops claim -> analyse its take and build the take's files
+# as accept() does (metrics, waveform envelope, sidecar) -> accept, removing
+# every --remove-every'th script instead, until --takes scripts are done or
+# the queue is empty. Each narrator records a take of its own, and may spend
+# --think seconds on each to model the time taken to record it (with 0, the
+# narrators only compete for the server, so this measures its capacity). With
+# --stall-every, a narrator now and then waits past its lease (--lease)
+# before accepting, so scripts are reassigned under it and its accept must fail.
+#
+# Per narrator count it reports scripts done per second and the speedup over
+# one narrator, claim and accept latency (median and 95th percentile), lost
+# leases, and a check of the project reopened from disk: every script accepted
+# exactly once, holding the take of the narrator who accepted it, and every
+# removed script listed in removed.txt. Then, for each --memory-scripts
+# project size, the memory a session holds in a shared project (its lease)
+# against what one holds with its own copy of the project (script collection
+# and file index, as a loaded single-session project), traced with
+# tracemalloc. Run from the repository root:
+#
+#     python -m benchmarks.bench_shared [--scripts 2000] [--narrators 1 2 4 8 16] [--takes 200] [--think 0.05]
+import argparse
+import hashlib
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.synthetic import RATES, SECONDS, make_project, synthetic_take
+from voicerecorder.audio import decode_wav
+from voicerecorder.project import ProjectDir
+from voicerecorder.shared import LeaseError, SharedProject
+from voicerecorder.takes import take_files
+
+TAKE_DATE = '20250101'
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# One narrator's session: claims scripts and accepts (or removes) them until
+# the shared budget of scripts runs out. Records (num, holder) of every accept
+# and remove that went through, and the claim and accept latencies.
+def narrator(project, holder, audio, budget, args, results):
+    record_time = decode_wav(audio)[0]['duration']
+    done = 0
+    while next(budget) < args.takes:
+        start = time.perf_counter()
+        s = project.claim(holder, holder)
+        results['claim'].append(time.perf_counter() - start)
+        if s is None:
+            return
+        done += 1
+        if args.think:
+            time.sleep(args.think)
+        if args.stall_every and done % args.stall_every == 0:
+            time.sleep(args.lease * 1.5)
+        start = time.perf_counter()
+        try:
+            if args.remove_every and done % args.remove_every == 0:
+                project.remove(holder, s.num)
+                results['removed'].append((s.num, holder))
+            else:
+                payloads, _, _, _ = take_files(s, audio, record_time, project.language, date=TAKE_DATE)
+                project.accept(holder, s, payloads)
+                results['accepted'].append((s.num, holder))
+        except LeaseError:
+            results['lost'].append((s.num, holder))
+        results['accept'].append(time.perf_counter() - start)
+
+
+# Problems found in the project reopened from disk after a run
+def check(directory, results, digests):
+    project = SharedProject(directory)
+    problems = []
+    accepted = Counter(num for num, _ in results['accepted'])
+    problems += [f"script {num} accepted {count} times" for num, count in accepted.items() if count > 1]
+    for num, holder in results['accepted']:
+        name = project.store.registry.audio(num, TAKE_DATE)
+        if name is None:
+            problems.append(f"script {num}: no take")
+        elif hashlib.sha256(project.store[name]).hexdigest() != digests[holder]:
+            problems.append(f"script {num}: take is not {holder}'s")
+    removed = set(project.removed_nums)
+    problems += [f"script {num} not in removed.txt" for num, _ in results['removed'] if num not in removed]
+    return problems
+
+
+def run(template, narrators, takes, args, workdir):
+    directory = os.path.join(workdir, f"narrators{narrators}")
+    shutil.copytree(template, directory, copy_function=os.link)
+    project = SharedProject(directory, lease_seconds=args.lease)
+    results = {'claim': [], 'accept': [], 'accepted': [], 'removed': [], 'lost': []}
+    budget = itertools.count()
+    holders = [f"narrator{k}" for k in range(narrators)]
+    threads = [threading.Thread(target=narrator, args=(project, holder, takes[k % len(takes)], budget, args, results))
+               for k, holder in enumerate(holders)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    digests = {holder: hashlib.sha256(takes[k % len(takes)]).hexdigest() for k, holder in enumerate(holders)}
+    problems = check(directory, results, digests)
+    shutil.rmtree(directory)
+    done = len(results['accepted']) + len(results['removed'])
+    return done / elapsed, results, problems
+
+
+# Bytes a session holds in a shared project (its lease) and bytes of a
+# single-session copy of the same project (script collection and file index).
+# The take being recorded comes on top in both.
+def session_memory(directory, sessions=20):
+    project = SharedProject(directory)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [project.claim(f"s{k}", f"s{k}") for k in range(sessions)]
+    shared = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    before = tracemalloc.get_traced_memory()[0]
+    loaded = ProjectDir(directory)
+    single = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del held, loaded
+    return shared, single
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a shared project with concurrent narrators")
+    parser.add_argument('--scripts', type=int, default=2000)
+    parser.add_argument('--narrators', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--takes', type=int, default=200, help="scripts accepted or removed per run")
+    parser.add_argument('--think', type=float, default=0.05,
+                        help="seconds each narrator spends recording a take (0: server capacity alone)")
+    parser.add_argument('--remove-every', type=int, default=10, help="remove every Nth claimed script (0: never)")
+    parser.add_argument('--lease', type=float, default=120.0, help="lease seconds")
+    parser.add_argument('--stall-every', type=int, default=0,
+                        help="every Nth script, wait past the lease before accepting (0: never)")
+    parser.add_argument('--seconds', type=float, nargs=2, default=SECONDS, metavar=('MIN', 'MAX'))
+    parser.add_argument('--memory-scripts', type=int, nargs='*', default=[1000, 10000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    takes = [synthetic_take(rng.uniform(*args.seconds), RATES[k % len(RATES)], rng) for k in range(max(args.narrators))]
+    workdir = tempfile.mkdtemp(prefix="bench-shared-")
+    try:
+        template = os.path.join(workdir, "template")
+        # Mostly pending, so the queue does not run dry before --takes scripts are done
+        summary = make_project(template, args.scripts, args.seconds, completed=0.2, seed=args.seed)
+        print(f"{summary['scripts']} scripts ({summary['completed']} completed, {summary['removed']} removed), "
+              f"{args.takes} scripts done per run, think time {args.think:.2f} s\n")
+        print(f"{'narrators':>9} {'scripts/s':>10} {'speedup':>8} {'claim ms':>15} {'accept ms':>15} "
+              f"{'lost':>5}  check")
+        base = None
+        for narrators in args.narrators:
+            rate, results, problems = run(template, narrators, takes, args, workdir)
+            base = base or rate
+            claim_ms = f"{percentile(results['claim'], 0.5) * 1e3:.2f} / {percentile(results['claim'], 0.95) * 1e3:.2f}"
+            accept_ms = (f"{percentile(results['accept'], 0.5) * 1e3:.1f} / "
+                         f"{percentile(results['accept'], 0.95) * 1e3:.1f}")
+            print(f"{narrators:>9} {rate:>10.1f} {rate / base:>7.2f}x {claim_ms:>15} {accept_ms:>15} "
+                  f"{len(results['lost']):>5}  {'ok' if not problems else f'{len(problems)} problems'}")
+            for problem in problems[:10]:
+                print(f"{'':>11}{problem}")
+        shutil.rmtree(template)
+
+        if args.memory_scripts:
+            print(f"\nPer session, besides the take being recorded:")
+            print(f"{'scripts':>9} {'shared KB':>10} {'own copy KB':>12}")
+        for scripts in args.memory_scripts:
+            directory = os.path.join(workdir, f"memory{scripts}")
+            make_project(directory, scripts, args.seconds, seed=args.seed)
+            shared, single = session_memory(directory)
+            print(f"{scripts:>9} {shared / 1024:>10.1f} {single / 1024:>12.1f}")
+            shutil.rmtree(directory)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Cold start time of the ways into the project code, each measured as a fresh
+# interpreter (median wall time of --repeat runs). "app.py imports" is the
+# import block at the top of app.py, which is what reusing anything defined
+# there used to cost; "all submodules" is what `import voicerecorder` cost
+# while the package imported its modules eagerly. Run from the repository root:
+#
+#     python -m benchmarks.bench_startup [--repeat 7]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# The leading import statements of app.py
+def app_imports():
+    lines = []
+    with open(os.path.join(ROOT, "app.py")) as f:
+        for line in f:
+            if line.strip() and not line.startswith(("import ", "from ", " ")):
+                break
+            lines.append(line)
+    return "".join(lines)
+
+
+def submodule_imports():
+    names = sorted(name[:-3] for name in os.listdir(os.path.join(ROOT, "voicerecorder"))
+                   if name.endswith(".py") and name not in ("__init__.py", "__main__.py"))
+    return "\n".join(f"import voicerecorder.{name}" for name in names)
+
+
+def time_command(command, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark interpreter start-up for app and CLI entry points")
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        wav_path = os.path.join(directory, "take.wav")
+        wavfile.write(wav_path, 48000, (np.random.default_rng(0).standard_normal(48000 * 5) * 3000).astype(np.int16))
+        with open(os.path.join(directory, "scripts.txt"), 'w') as f:
+            f.write("1. text\n")
+        cases = [
+            ("python -c pass", ["-c", "pass"]),
+            ("app.py imports", ["-c", app_imports()]),
+            ("all submodules", ["-c", submodule_imports()]),
+            ("import voicerecorder", ["-c", "import voicerecorder"]),
+            ("voicerecorder --help", ["-m", "voicerecorder", "--help"]),
+            ("voicerecorder status", ["-m", "voicerecorder", "status", directory]),
+            ("voicerecorder metrics", ["-m", "voicerecorder", "metrics", wav_path]),
+        ]
+        print(f"{'entry point':<24} {'ms':>7}")
+        for label, command in cases:
+            print(f"{label:<24} {time_command([sys.executable, *command], args.repeat) * 1e3:>7.0f}")
+
+
+if __name__ == '__main__':
+    main()
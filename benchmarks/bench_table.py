@@ -0,0 +1,90 @@
+# Per-rerun cost of the Scripts table against script count: the original
+# list-of-dicts -> DataFrame -> row-wise Styler -> per-row selection loop, versus
+# the persistent ScriptsTable model showing one page around the current script
+# (one navigation step).
+# Styles are computed in both cases, as Streamlit does when it marshals a Styler.
+# Run from the repository root:
+#
+#     python -m benchmarks.bench_table [--scripts 100 1000 3000 10000 20000]
+import argparse
+import time
+
+import pandas as pd
+
+from voicerecorder.scripts import Script, ScriptCollection
+from voicerecorder.table import ScriptsTable
+
+
+def make_scripts(count):
+    return [{'num': i + 1, 'text': f"Synthetic script line number {i + 1} with some extra words to preview",
+             'status': ('Not started', 'Completed', 'Removed')[i % 3], 'record_time': 0.0, 'selected': i == 0}
+            for i in range(count)]
+
+
+def style_rows(row):
+    if row['Select']:
+        return ['background-color: #FFCCCC'] * len(row)
+    elif row['Status'] == 'Completed':
+        return ['background-color: lightgreen'] * len(row)
+    elif row['Status'] == 'Removed':
+        return ['background-color: lightgrey'] * len(row)
+    else:
+        return [''] * len(row)
+
+
+# The rerun work app.py did before the table model
+def legacy_rerun(scripts):
+    data = [{'Select': s['selected'], 'Num': s['num'], 'Status': s['status'],
+             'Preview': s['text'][:50] + ('...' if len(s['text']) > 50 else '')} for s in scripts]
+    df = pd.DataFrame(data)
+    styled_df = df.style.apply(style_rows, axis=1)
+    styled_df._compute()
+    edited_df = df
+    for i in range(len(scripts)):
+        if edited_df['Select'][i] != scripts[i]['selected']:
+            pass
+
+
+def make_collection(scripts):
+    return ScriptCollection(Script(s['num'], s['text'], s['status'], s['record_time']) for s in scripts)
+
+
+def model_rerun(table, scripts, step):
+    # One navigation step: selection moves to the next row
+    current = step % len(scripts)
+    scripts.selected = (current + 1) % len(scripts)
+    table.mark(current, scripts.selected)
+    rows = scripts.index.rows()
+    page_rows, _ = table.page(rows, table.page_of(rows, scripts.selected))
+    styled_df = table.styled(scripts, page_rows)
+    styled_df._compute()
+    table.selection_changes(table.df)
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for step in range(repeat):
+        start = time.perf_counter()
+        fn(step)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Scripts table rerun cost")
+    parser.add_argument('--scripts', type=int, nargs='+', default=[100, 1000, 3000, 10000, 20000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'scripts':>8} {'legacy ms':>10} {'model ms':>9} {'speedup':>8}")
+    for count in args.scripts:
+        scripts = make_scripts(count)
+        legacy = best_of(lambda step: legacy_rerun(scripts), args.repeat)
+        table = ScriptsTable()
+        collection = make_collection(scripts)
+        model = best_of(lambda step: model_rerun(table, collection, step), args.repeat)
+        print(f"{count:>8} {legacy * 1e3:>10.1f} {model * 1e3:>9.1f} {legacy / model:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# Compare the per-sample matplotlib waveform plot with the min/max envelope SVG
+# renderer. Run from the repository root:
+#
+#     python -m benchmarks.bench_waveform [--seconds 10 60 120] [--rate 48000]
+import argparse
+import io
+import time
+
+import numpy as np
+
+from voicerecorder.waveform import min_max_envelope, waveform_svg
+
+
+# The plot app.py drew before the envelope renderer, including PNG encoding as st.pyplot does
+def legacy_plot(waveform, rate):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(4, 1))
+    ax.plot(np.linspace(0, len(waveform) / rate, num=len(waveform)), waveform)
+    ax.axis('off')
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+
+def envelope_render(waveform, rate):
+    waveform_svg(min_max_envelope(waveform))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark waveform rendering")
+    parser.add_argument('--seconds', type=float, nargs='+', default=[10, 60, 120])
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print(f"{'take (s)':>9} {'samples':>10} {'matplotlib ms':>14} {'envelope ms':>12} {'svg KB':>7}")
+    for seconds in args.seconds:
+        waveform = (rng.standard_normal(int(seconds * args.rate)) * 3000).astype(np.int16)
+        timings = []
+        for fn in (legacy_plot, envelope_render):
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn(waveform, args.rate)
+                best = min(best, time.perf_counter() - start)
+            timings.append(best)
+        svg_kb = len(waveform_svg(min_max_envelope(waveform))) / 1024
+        print(f"{seconds:>9.0f} {len(waveform):>10} {timings[0] * 1e3:>14.1f} {timings[1] * 1e3:>12.2f} {svg_kb:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+# Regression suite: times the app's main operations on synthetic projects
+# (benchmarks.synthetic) at several scales and records the results as JSON, so
+# runs on different revisions or machines can be compared. Each case makes the
+# same voicerecorder calls as the app code it is named after:
+#
+#   parse_scripts   reading scripts.txt, removed.txt and project.json
+#   load            update_statuses_and_texts (load_takes: plan, ingest into the store, reconcile)
+#   table_build     first render of the Scripts table page (styled, as Streamlit marshals it)
+#   table_step      one Next click: selection moves, two rows repaint
+#   metrics         compute_audio_metrics on a cold cache (decode, analyse, envelope), per take
+#   accept, remove  accept() and remove() on the store, script index and table, per script: a take
+#                   is analysed and stored with its sidecar (take_files, accept_take), post-processed
+#                   first with --postprocess, and compressed in the background in a FLAC project
+#   export          Download Project into an empty archive
+#   export_update   Download Project again after the accepts and removes
+#
+# "items" is what a case processes (files, scripts, takes, entries); results
+# are keyed by case and scale. Run from the repository root:
+#
+#     python -m benchmarks.suite [--scripts 100 1000 10000] [--postprocess] [--output results.json]
+#                                [--compare baseline.json]
+#
+# Each scale's project is generated once and every case is run --repeat times
+# on a fresh store, recording the median. With --compare, cases more than
+# --threshold (and --min-ms) slower than the baseline are reported and the exit
+# status is 1.
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import RATES, SECONDS, make_project
+from voicerecorder.audio import decode_wav
+from voicerecorder.cache import MetricsCache
+from voicerecorder.encoder import TakeEncoder
+from voicerecorder.export import ProjectArchive
+from voicerecorder.metrics import analyze_decoded
+from voicerecorder.postprocess import process_take
+from voicerecorder.project import (DEFAULT_AUDIO_FORMAT, DEFAULT_LANGUAGE, REMOVED_FILES, SCRIPTS_FILE, SETTINGS_FILE,
+                                   parse_removed, parse_settings, project_entries)
+from voicerecorder.registry import parse_project_filename, script_filename
+from voicerecorder.scripts import ScriptCollection
+from voicerecorder.storage import ProjectStore
+from voicerecorder.table import ScriptsTable
+from voicerecorder.takes import accept_take, load_takes, remove_script, take_files
+from voicerecorder.waveform import min_max_envelope
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# app.py's default per-session memory budget
+SESSION_MEMORY_BUDGET = 64 * 1024 * 1024
+ACCEPT_DATE = '20240401'
+
+
+# Stand-in for Streamlit's UploadedFile that reads from disk, so a 50,000-script
+# project need not fit in memory. The file is opened on first use and closed
+# once read to the end, as ingestion does with every upload.
+class DiskUpload:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        return self._file
+
+    def read(self, size=-1):
+        data = self._open().read(size)
+        if not data or size < 0:
+            self._file.close()
+            self._file = None
+        return data
+
+    def seek(self, offset, whence=0):
+        return self._open().seek(offset, whence)
+
+    def tell(self):
+        return self._open().tell()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def read_project_files(directory):
+    with open(os.path.join(directory, SCRIPTS_FILE), encoding='utf-8') as f:
+        scripts = ScriptCollection.from_lines(f.read().splitlines())
+    with open(os.path.join(directory, REMOVED_FILES[0]), encoding='utf-8') as f:
+        removed_nums = parse_removed(f.read().splitlines())
+    with open(os.path.join(directory, SETTINGS_FILE), 'rb') as f:
+        settings = parse_settings(f.read())
+    return scripts, removed_nums, settings
+
+
+# update_statuses_and_texts on a fresh store
+def load(directory, scripts, removed_nums, store, encoder):
+    uploads = [DiskUpload(os.path.join(directory, name)) for name in os.listdir(directory)
+               if parse_project_filename(name)]
+    errors = load_takes(scripts, removed_nums, store, uploads, encoder=encoder)
+    if errors:
+        raise RuntimeError(errors[0])
+    return len(uploads)
+
+
+def table_build(table, scripts):
+    table.invalidate()
+    rows = scripts.index.rows()
+    page_rows, _ = table.page(rows, table.page_of(rows, scripts.selected) or 0)
+    table.styled(scripts, page_rows)._compute()
+    return len(page_rows)
+
+
+def table_step(table, scripts):
+    current = scripts.selected
+    scripts.selected = scripts.neighbour(current, 1) or 0
+    table.mark(current, scripts.selected)
+    rows = scripts.index.rows()
+    page_rows, _ = table.page(rows, table.page_of(rows, scripts.selected))
+    table.styled(scripts, page_rows)._compute()
+    table.selection_changes(table.df)
+
+
+# compute_audio_metrics' local analysis of each take, on an empty cache
+def metrics(takes, text):
+    cache = MetricsCache()
+    for audio in takes:
+        key = MetricsCache.key(audio, text)
+        header, samples = decode_wav(audio)
+        metrics, rate, data = analyze_decoded(header, samples)
+        cache.put(key, (metrics, rate, min_max_envelope(data, full_scale=header['full_scale'])))
+    return len(takes)
+
+
+# accept() of a new recording for each script index: take analysed and
+# stored, status and table updated, selection moved to the next pending script
+def accept(scripts, store, table, removed_nums, indices, audio, settings, encoder, process):
+    language = settings.get('language', DEFAULT_LANGUAGE)
+    compress = settings.get('audio_format', DEFAULT_AUDIO_FORMAT) == 'flac'
+    record_time = decode_wav(audio)[0]['duration']
+    for i in indices:
+        payloads, _, _, _ = take_files(scripts[i], audio, record_time, language, process=process, date=ACCEPT_DATE)
+        accept_take(scripts, i, store, payloads, removed_nums, encoder=encoder if compress else None)
+        table.mark(i)
+        scripts.selected = scripts.neighbour(i, 1, 'Not started')
+    return len(indices)
+
+
+def remove(scripts, store, table, removed_nums, indices):
+    for i in indices:
+        remove_script(scripts, i, store, removed_nums)
+        table.mark(i)
+        scripts.selected = scripts.neighbour(i, 1, 'Not started')
+    return len(indices)
+
+
+# Download Project, once any takes still being compressed are done
+def export(archive, scripts, removed_nums, store, settings, encoder):
+    encoder.wait(store)
+    entries = project_entries(scripts, removed_nums, settings.get('language', DEFAULT_LANGUAGE),
+                              {name: store.path(name) for name in store},
+                              settings.get('audio_format', DEFAULT_AUDIO_FORMAT))
+    archive.update(entries)
+    return len(entries)
+
+
+# One pass over every case on a fresh store and archive: {case: (seconds, items)}
+def run_cases(project_dir, args, workdir):
+    results = {}
+
+    seconds, (scripts, removed_nums, settings) = timed(read_project_files, project_dir)
+    results['parse_scripts'] = (seconds, len(scripts))
+    store = ProjectStore(root=workdir, memory_budget=SESSION_MEMORY_BUDGET)
+    encoder = TakeEncoder()
+    results['load'] = timed(load, project_dir, scripts, removed_nums, store, encoder)
+    scripts.selected = 0
+
+    table = ScriptsTable()
+    results['table_build'] = timed(table_build, table, scripts)
+    steps = [timed(table_step, table, scripts)[0] for _ in range(args.steps)]
+    results['table_step'] = (statistics.median(steps), 1)
+
+    completed = [s for s in scripts if s.status == 'Completed']
+    takes = [bytes(store[script_filename(s.num, s.latest_date, 'wav')]) for s in completed[:args.takes]]
+    results['metrics'] = timed(metrics, takes, completed[0].text)
+
+    archive = ProjectArchive(os.path.join(tempfile.mkdtemp(dir=workdir), "project.zip"))
+    results['export'] = timed(export, archive, scripts, removed_nums, store, settings, encoder)
+    pending = scripts.index.rows('Not started')[:args.ops]
+    # process_take's defaults are the app's post-processing settings
+    process = process_take if args.postprocess else None
+    results['accept'] = timed(accept, scripts, store, table, removed_nums, pending, takes[0], settings, encoder,
+                              process)
+    done = [i for i in scripts.index.rows('Completed') if i not in set(pending)][:args.ops]
+    results['remove'] = timed(remove, scripts, store, table, removed_nums, done)
+    results['export_update'] = timed(export, archive, scripts, removed_nums, store, settings, encoder)
+    encoder.shutdown()
+    store.close()
+    return results
+
+
+# Median time of each case over args.repeat passes on one generated project
+def run_scale(count, args, workdir):
+    project_dir = os.path.join(workdir, "project")
+    make_project(project_dir, count, args.seconds, args.rates, seed=args.seed)
+    passes = [run_cases(project_dir, args, workdir) for _ in range(args.repeat)]
+    return [{'case': case, 'scripts': count, 'seconds': statistics.median(p[case][0] for p in passes),
+             'items': items} for case, (_, items) in passes[0].items()]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args):
+    import numpy
+    import pandas
+
+    return {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'revision': git_revision(),
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'numpy': numpy.__version__, 'pandas': pandas.__version__,
+            'args': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')}}
+
+
+# Print each result against the baseline's; returns the regressed (case,
+# scripts): slower by more than `threshold` and by at least min_ms
+def compare(results, baseline, threshold, min_ms):
+    previous = {(r['case'], r['scripts']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    print(f"\nBaseline {baseline['environment'].get('revision')} ({baseline['environment'].get('date')})")
+    print(f"{'scripts':>8} {'case':<14} {'base ms':>9} {'now ms':>9} {'change':>8}")
+    for r in results:
+        base = previous.get((r['case'], r['scripts']))
+        if base is None:
+            continue
+        change = r['seconds'] / base - 1 if base else 0.0
+        flag = "  slower" if change > threshold and (r['seconds'] - base) * 1e3 >= min_ms else ""
+        if flag:
+            regressions.append((r['case'], r['scripts']))
+        print(f"{r['scripts']:>8} {r['case']:<14} {base * 1e3:>9.1f} {r['seconds'] * 1e3:>9.1f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app operations on synthetic projects")
+    parser.add_argument('--scripts', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="project sizes (up to 50000)")
+    parser.add_argument('--seconds', type=float, nargs=2, default=SECONDS, metavar=('MIN', 'MAX'),
+                        help="range of take lengths")
+    parser.add_argument('--rates', type=int, nargs='+', default=RATES)
+    parser.add_argument('--takes', type=int, default=20, help="takes analysed by the metrics case")
+    parser.add_argument('--ops', type=int, default=50, help="scripts accepted and removed")
+    parser.add_argument('--postprocess', action='store_true', help="post-process accepted takes (trim, normalize)")
+    parser.add_argument('--steps', type=int, default=20, help="navigation steps timed by table_step")
+    parser.add_argument('--repeat', type=int, default=3, help="passes per scale; the median is recorded")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', help="baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="slowdown reported as a regression")
+    parser.add_argument('--min-ms', type=float, default=1.0, help="smallest slowdown (ms) reported")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'scripts':>8} {'case':<14} {'ms':>9} {'items':>7} {'items/s':>10}")
+    for count in args.scripts:
+        with tempfile.TemporaryDirectory() as workdir:
+            for r in run_scale(count, args, workdir):
+                results.append(r)
+                rate = r['items'] / r['seconds'] if r['seconds'] else float('inf')
+                print(f"{count:>8} {r['case']:<14} {r['seconds'] * 1e3:>9.1f} {r['items']:>7} {rate:>10.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_ms)
+        if regressions:
+            print(f"{len(regressions)} cases slower than baseline by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
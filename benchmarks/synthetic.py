@@ -0,0 +1,140 @@
+# Synthetic projects for benchmarks and manual testing, laid out as the app
+# exports them: scripts.txt, removed.txt, project.json and
+# scriptNNNN_YYYYMMDD.{txt,wav} takes. Scripts are completed, removed or still
+# pending in the given shares; some completed scripts also keep an older
+# superseded take, and some pending ones a stray .txt without its .wav, so a
+# load has files to drop. Takes are speech-like bursts over a noise floor with
+# silence at both ends, at a mix of lengths and sample rates. Only `distinct`
+# different recordings are generated and the takes are hard links to them, so a
+# 50,000-script project costs little disk. The same seed gives the same project.
+#
+#     python -m benchmarks.synthetic DIRECTORY [--scripts 1000] [--seconds 1 6] [--rates 16000 44100 48000]
+import argparse
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+from scipy.io import wavfile
+
+from voicerecorder.project import REMOVED_FILES, SCRIPTS_FILE, SETTINGS_FILE
+from voicerecorder.registry import script_filename
+
+RATES = (16000, 44100, 48000)
+SECONDS = (1.0, 6.0)
+TAKE_DATE = '20240301'
+OLD_TAKE_DATE = '20240101'
+WORDS = ("the", "quick", "recording", "of", "every", "line", "needs", "a", "quiet", "room", "and", "steady",
+         "voice", "before", "we", "move", "on", "to", "next", "script", "please", "read", "slowly", "clearly")
+
+
+def script_text(num, rng):
+    return f"Line {num}: " + " ".join(rng.choice(WORDS, size=int(rng.integers(4, 16))))
+
+
+# WAV bytes of a speech-like take: 16-bit mono, a few harmonic bursts with
+# syllable-rate amplitude modulation over a -60 dBFS noise floor, with 0.3-0.8 s
+# of silence before and after
+def synthetic_take(seconds, rate, rng):
+    frames = int(seconds * rate)
+    t = np.arange(frames, dtype=np.float32) / rate
+    samples = rng.standard_normal(frames).astype(np.float32) * 0.001
+    lead, tail = (int(rng.uniform(0.3, 0.8) * rate) for _ in range(2))
+    if frames > lead + tail:
+        speech = slice(lead, frames - tail)
+        pitch = rng.uniform(90, 250)
+        voice = sum(np.sin(2 * np.pi * pitch * k * t[speech]) / k for k in range(1, 5))
+        syllables = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t[speech]), 0, None)
+        samples[speech] += voice * syllables * rng.uniform(0.1, 0.4)
+    bio = io.BytesIO()
+    wavfile.write(bio, rate, (np.clip(samples, -1, 1) * 32767).astype(np.int16))
+    return bio.getvalue()
+
+
+def link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+# Write a project into `directory` (created if needed). Returns a summary:
+# script, completed, removed, take and file counts and the total bytes.
+def make_project(directory, scripts, seconds=SECONDS, rates=RATES, completed=0.6, removed=0.05, superseded=0.1,
+                 distinct=24, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    pool = []
+    for i in range(distinct):
+        path = os.path.join(directory, f".take{i}.wav")
+        with open(path, 'wb') as f:
+            f.write(synthetic_take(rng.uniform(*seconds), rates[i % len(rates)], rng))
+        pool.append(path)
+
+    def write_take(num, date, text):
+        with open(os.path.join(directory, script_filename(num, date, 'txt')), 'w', encoding='utf-8') as f:
+            f.write(text)
+        link_or_copy(pool[int(rng.integers(len(pool)))], os.path.join(directory, script_filename(num, date, 'wav')))
+
+    lines = []
+    removed_nums = []
+    summary = {'scripts': scripts, 'completed': 0, 'removed': 0, 'takes': 0}
+    for num in range(1, scripts + 1):
+        text = script_text(num, rng)
+        lines.append(f"{num}. {text}")
+        share = rng.random()
+        if share < removed:
+            removed_nums.append(num)
+            summary['removed'] += 1
+            # Half of the removed scripts still have the take recorded before removal
+            if rng.random() < 0.5:
+                write_take(num, OLD_TAKE_DATE, text)
+                summary['takes'] += 1
+        elif share < removed + completed:
+            if rng.random() < superseded:
+                write_take(num, OLD_TAKE_DATE, text)
+                summary['takes'] += 1
+            write_take(num, TAKE_DATE, text)
+            summary['completed'] += 1
+            summary['takes'] += 1
+        elif rng.random() < 0.02:
+            with open(os.path.join(directory, script_filename(num, TAKE_DATE, 'txt')), 'w', encoding='utf-8') as f:
+                f.write(text)
+    for path in pool:
+        os.remove(path)
+
+    with open(os.path.join(directory, SCRIPTS_FILE), 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+    with open(os.path.join(directory, REMOVED_FILES[0]), 'w') as f:
+        f.write("\n".join(str(num) for num in removed_nums))
+    with open(os.path.join(directory, SETTINGS_FILE), 'w') as f:
+        json.dump({'language': 'th-TH'}, f)
+    names = os.listdir(directory)
+    summary['files'] = len(names)
+    summary['bytes'] = sum(os.path.getsize(os.path.join(directory, name)) for name in names)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic voicerecorder project")
+    parser.add_argument('directory')
+    parser.add_argument('--scripts', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, nargs=2, default=SECONDS, metavar=('MIN', 'MAX'))
+    parser.add_argument('--rates', type=int, nargs='+', default=RATES)
+    parser.add_argument('--completed', type=float, default=0.6, help="share of scripts with an accepted take")
+    parser.add_argument('--removed', type=float, default=0.05, help="share of removed scripts")
+    parser.add_argument('--superseded', type=float, default=0.1, help="share of takes with an older take kept")
+    parser.add_argument('--distinct', type=int, default=24, help="number of different recordings")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    summary = make_project(args.directory, args.scripts, args.seconds, args.rates, args.completed, args.removed,
+                           args.superseded, args.distinct, args.seed)
+    print(f"{summary['scripts']} scripts ({summary['completed']} completed, {summary['removed']} removed), "
+          f"{summary['takes']} takes, {summary['files']} files, {summary['bytes'] / 1e6:.1f} MB apparent size "
+          f"in {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import io
+import os
+import threading
+import time
+
+import numpy as np
+from scipy.io import wavfile
+from streamlit.testing.v1 import AppTest
+
+from voicerecorder.metrics import analyze_wav
+from voicerecorder.pronunciation import LocalRecognizer, empty_scores
+from voicerecorder.scripts import Script, ScriptCollection
+from voicerecorder.waveform import min_max_envelope
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+RATE = 16000
+
+
+# A finished live take of script 0, as live_recorder stores it; the noise is
+# random so no earlier run's cache entry matches it
+def live_take():
+    buffer = io.BytesIO()
+    wavfile.write(buffer, RATE, (np.random.default_rng().standard_normal(RATE) * 3000).astype(np.int16))
+    audio = buffer.getvalue()
+    metrics, rate, data = analyze_wav(audio)
+    return {'take': 'take_0-0', 'audio': audio, 'rate': rate, 'duration': 1.0, 'metrics': metrics,
+            'envelope': min_max_envelope(data), 'script': 0}
+
+
+# An assessment that recognizes nothing (no error, no scores) is made once for
+# a take, not again on every rerun that shows it
+def test_empty_assessment_submitted_once(monkeypatch):
+    monkeypatch.setenv("VOICERECORDER_RECOGNIZER", "local")
+    monkeypatch.delenv("VOICERECORDER_CACHE_DIR", raising=False)
+    calls = []
+    done = threading.Event()
+
+    def assess(self, audio_bytes, script_text):
+        calls.append(script_text)
+        done.set()
+        return empty_scores()
+
+    monkeypatch.setattr(LocalRecognizer, 'assess', assess)
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    scripts = ScriptCollection([Script(1, "text 1", 'Not started', 0.0)])
+    scripts.selected = 0
+    at.session_state['scripts'] = scripts
+    at.session_state['live_metering'] = True
+    at.session_state['live_take'] = live_take()
+    at.run()
+    assert not at.exception
+    assert done.wait(10)
+    # Let the assessor store the result before the next rerun
+    time.sleep(0.2)
+
+    for _ in range(5):
+        at.run()
+        assert not at.exception
+    assert calls == ["text 1"]
+    assert any("no scores returned" in info.value for info in at.info)
+    assert not any("in progress" in caption.value for caption in at.caption)
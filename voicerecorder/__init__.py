@@ -0,0 +1,73 @@
+import importlib
+
+# Public names and the modules that define them. Modules are imported on first
+# access, so `import voicerecorder` (and the CLI) only pays for what is used:
+# pandas, scipy and the Azure SDK stay unloaded unless a caller needs them.
+_EXPORTS = {
+    'WavHeaderError': 'audio',
+    'decode_audio': 'audio',
+    'decode_wav': 'audio',
+    'encode_flac': 'audio',
+    'read_audio_header': 'audio',
+    'read_wav_header': 'audio',
+    'analyze_project': 'batch',
+    'flag_outliers': 'batch',
+    'project_wavs': 'batch',
+    'write_report': 'batch',
+    'MetricsCache': 'cache',
+    'TakeEncoder': 'encoder',
+    'ProjectArchive': 'export',
+    'ScriptIndex': 'index',
+    'ingest_files': 'ingest',
+    'plan_ingest': 'ingest',
+    'Profiler': 'instrument',
+    'levels_from_value': 'live',
+    'take_from_value': 'live',
+    'analyze_decoded': 'metrics',
+    'analyze_samples': 'metrics',
+    'analyze_wav': 'metrics',
+    'normalize': 'metrics',
+    'process_take': 'postprocess',
+    'savings': 'postprocess',
+    'ProjectDir': 'project',
+    'project_entries': 'project',
+    'reconcile': 'project',
+    'AzureRecognizer': 'pronunciation',
+    'LocalRecognizer': 'pronunciation',
+    'PronunciationAssessor': 'pronunciation',
+    'RecognizerPool': 'pronunciation',
+    'FileRegistry': 'registry',
+    'parse_project_filename': 'registry',
+    'script_filename': 'registry',
+    'Script': 'scripts',
+    'ScriptCollection': 'scripts',
+    'parse_script_lines': 'scripts',
+    'LeaseError': 'shared',
+    'SharedProject': 'shared',
+    'read_sidecar': 'sidecar',
+    'sidecar_analysis': 'sidecar',
+    'sidecar_name': 'sidecar',
+    'ProjectStore': 'storage',
+    'ScriptsTable': 'table',
+    'accept_take': 'takes',
+    'load_takes': 'takes',
+    'remove_script': 'takes',
+    'take_files': 'takes',
+    'min_max_envelope': 'waveform',
+    'waveform_svg': 'waveform',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,321 @@
+import hashlib
+import io
+import struct
+
+# Upper bound on how far into a file we look for the data chunk
+MAX_HEADER_BYTES = 1024 * 1024
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+# Sample dtypes that can be viewed in place, by (format tag, bits per sample)
+SAMPLE_DTYPES = {
+    (WAVE_FORMAT_PCM, 16): '<i2',
+    (WAVE_FORMAT_PCM, 32): '<i4',
+    (WAVE_FORMAT_IEEE_FLOAT, 32): '<f4',
+    (WAVE_FORMAT_IEEE_FLOAT, 64): '<f8',
+}
+
+
+# FLAC stream marker and the metadata blocks read from a FLAC header
+FLAC_MAGIC = b'fLaC'
+FLAC_STREAMINFO = 0
+FLAC_VORBIS_COMMENT = 4
+# soundfile subtype for each PCM bit depth FLAC holds exactly (not float or 32-bit)
+FLAC_SUBTYPES = {8: 'PCM_S8', 16: 'PCM_16', 24: 'PCM_24'}
+# Vorbis comment in which encode_flac records the SHA-256 of the source WAV
+DIGEST_TAG = 'comment'
+DIGEST_PREFIX = 'sha256:'
+
+
+# Raised for WAV and FLAC headers that cannot be read
+class WavHeaderError(ValueError):
+    pass
+
+
+# Parse only the RIFF header of a WAV file object: walks the chunk list up to the
+# data chunk without reading any samples. Returns a dict with rate, channels,
+# bits, block_align, format tag, data_offset, data_size and duration (seconds).
+# The file position is left unspecified; callers that reuse the object must seek.
+def read_wav_header(f):
+    f.seek(0)
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise WavHeaderError("not a RIFF/WAVE file")
+    info = None
+    offset = 12
+    while offset < MAX_HEADER_BYTES:
+        f.seek(offset)
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt = f.read(min(chunk_size, 40))
+            if len(fmt) < 16:
+                raise WavHeaderError("truncated fmt chunk")
+            format_tag, channels, rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+            info = {'format_tag': format_tag, 'channels': channels, 'rate': rate, 'block_align': block_align,
+                    'bits': bits}
+            # WAVE_FORMAT_EXTENSIBLE: the real format tag is the first two bytes of the sub-format GUID
+            if format_tag == 0xFFFE and len(fmt) >= 26:
+                info['format_tag'] = struct.unpack('<H', fmt[24:26])[0]
+        elif chunk_id == b'data':
+            if info is None:
+                raise WavHeaderError("data chunk before fmt chunk")
+            data_offset = offset + 8
+            if chunk_size == 0xFFFFFFFF:
+                # Streaming writers leave the size unset; use the rest of the file
+                f.seek(0, 2)
+                chunk_size = max(f.tell() - data_offset, 0)
+            info['data_offset'] = data_offset
+            info['data_size'] = chunk_size
+            frame_bytes = info['block_align'] or (info['channels'] * info['bits'] // 8)
+            frames = chunk_size // frame_bytes if frame_bytes else 0
+            info['frames'] = frames
+            info['duration'] = frames / float(info['rate']) if info['rate'] else 0.0
+            return info
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise WavHeaderError("no data chunk found")
+
+
+def wav_duration(f):
+    return read_wav_header(f)['duration']
+
+
+# Vorbis comments of a FLAC VORBIS_COMMENT block as {lower-case name: value}
+def vorbis_comments(block):
+    tags = {}
+    vendor_size = struct.unpack_from('<I', block)[0]
+    offset = 4 + vendor_size
+    count = struct.unpack_from('<I', block, offset)[0]
+    offset += 4
+    for _ in range(count):
+        size = struct.unpack_from('<I', block, offset)[0]
+        name, _, value = block[offset + 4:offset + 4 + size].decode('utf-8', 'replace').partition('=')
+        tags[name.lower()] = value
+        offset += 4 + size
+    return tags
+
+
+# Parse the metadata blocks of a FLAC file object, as read_wav_header does for
+# WAV: rate, channels, bits, frames and duration from STREAMINFO (format_tag is
+# WAVE_FORMAT_PCM, as decode_flac returns integer samples), plus the Vorbis
+# comments as `tags`. No audio frames are read.
+def read_flac_header(f):
+    f.seek(0)
+    if f.read(4) != FLAC_MAGIC:
+        raise WavHeaderError("not a FLAC file")
+    info = None
+    tags = {}
+    offset = 4
+    last = False
+    while not last and offset < MAX_HEADER_BYTES:
+        f.seek(offset)
+        block = f.read(4)
+        if len(block) < 4:
+            break
+        last, block_type, size = bool(block[0] & 0x80), block[0] & 0x7F, int.from_bytes(block[1:], 'big')
+        if block_type == FLAC_STREAMINFO:
+            streaminfo = f.read(34)
+            if len(streaminfo) < 34:
+                raise WavHeaderError("truncated STREAMINFO block")
+            # 20 bits rate, 3 bits channels - 1, 5 bits bits per sample - 1, 36 bits total frames
+            packed = int.from_bytes(streaminfo[10:18], 'big')
+            rate, channels, bits = packed >> 44, (packed >> 41 & 0x7) + 1, (packed >> 36 & 0x1F) + 1
+            frames = packed & 0xFFFFFFFFF
+            info = {'format_tag': WAVE_FORMAT_PCM, 'channels': channels, 'rate': rate,
+                    'block_align': channels * ((bits + 7) // 8), 'bits': bits, 'frames': frames,
+                    'duration': frames / float(rate) if rate else 0.0}
+        elif block_type == FLAC_VORBIS_COMMENT:
+            try:
+                tags = vorbis_comments(f.read(size))
+            except struct.error:
+                raise WavHeaderError("truncated VORBIS_COMMENT block")
+        offset += 4 + size
+    if info is None:
+        raise WavHeaderError("no STREAMINFO block found")
+    info['tags'] = tags
+    return info
+
+
+# Header of a WAV or FLAC file object (read_wav_header or read_flac_header)
+def read_audio_header(f):
+    f.seek(0)
+    return read_flac_header(f) if f.read(4) == FLAC_MAGIC else read_wav_header(f)
+
+
+def is_flac(buffer):
+    return bytes(buffer[:4]) == FLAC_MAGIC
+
+
+# File extension of a take's audio buffer: 'flac' or 'wav'
+def audio_ext(buffer):
+    return 'flac' if is_flac(buffer) else 'wav'
+
+
+# SHA-256 digest that identifies a take's audio: that of its bytes, or for a
+# FLAC encoded by encode_flac, that of the WAV it was encoded from, so a take
+# keeps its identity (and the analysis keyed on it) once it is compressed
+def audio_digest(buffer):
+    if is_flac(buffer):
+        try:
+            tag = read_flac_header(BufferFile(buffer))['tags'].get(DIGEST_TAG, '')
+        except WavHeaderError:
+            tag = ''
+        if tag.startswith(DIGEST_PREFIX) and len(tag) == len(DIGEST_PREFIX) + 64:
+            try:
+                return bytes.fromhex(tag[len(DIGEST_PREFIX):])
+            except ValueError:
+                pass
+    return hashlib.sha256(buffer).digest()
+
+
+# Read-only file interface over a buffer (bytes, mmap, memoryview), so
+# read_wav_header can parse it in place without a BytesIO copy
+class BufferFile:
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def seek(self, offset, whence=0):
+        base = {0: 0, 1: self._pos, 2: len(self._view)}[whence]
+        self._pos = max(base + offset, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        end = len(self._view) if size < 0 else min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes()
+        self._pos = max(end, self._pos)
+        return data
+
+
+# The data chunk of a WAV buffer, cut to whole frames (truncated files are
+# common when a recording is interrupted). Returns (header, memoryview).
+def wav_data(buffer):
+    header = read_wav_header(BufferFile(buffer))
+    view = memoryview(buffer).cast('B')
+    frame_bytes = header['block_align'] or header['channels'] * header['bits'] // 8
+    start = header['data_offset']
+    available = max(min(header['data_size'], len(view) - start), 0)
+    frames = available // frame_bytes if frame_bytes else 0
+    header['frames'] = frames
+    header['duration'] = frames / float(header['rate']) if header['rate'] else 0.0
+    return header, view[start:start + frames * frame_bytes]
+
+
+# 24-bit little-endian samples as int32, left-justified (sample << 8). Every
+# sample but the last is read as an unaligned 4-byte word at a 3-byte stride,
+# whose top byte belongs to the next sample and is shifted out.
+def widen_int24(data):
+    import numpy as np
+
+    n = len(data) // 3
+    samples = np.empty(n, dtype='<i4')
+    if n > 1:
+        words = np.ndarray((n - 1,), dtype='<i4', buffer=data, strides=(3,))
+        np.left_shift(words, 8, out=samples[:-1])
+    if n:
+        samples[-1] = int.from_bytes(b'\0' + data[3 * n - 3:3 * n].tobytes(), 'little', signed=True)
+    return samples
+
+
+# Largest positive sample of `bits`-bit audio as decode_wav and decode_flac
+# hold it in `dtype`: integer samples are left-justified, so 24-bit PCM in
+# int32 tops out at 0x7FFFFF00 rather than np.iinfo(np.int32).max. 1.0 for float.
+def full_scale(dtype, bits):
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    if dtype.kind != 'i':
+        return 1.0
+    return (2 ** (bits - 1) - 1) << (8 * dtype.itemsize - bits)
+
+
+# Decode a WAV buffer once for every consumer: returns the header (as
+# read_wav_header, with frames/duration counted from the data actually
+# present, and the samples' full_scale) and a read-only (frames, channels)
+# sample array.
+#
+# 16/32-bit PCM and 32/64-bit float samples are a zero-copy np.frombuffer view
+# over the data chunk. 8-bit PCM (unsigned) is re-centred to int8 and 24-bit
+# PCM is left-justified into int32, which costs one copy but keeps every
+# integer format signed. Consumers scale by header['full_scale'] (see
+# full_scale()), not np.iinfo(dtype).max. Float samples are already in -1..1.
+def decode_wav(buffer):
+    import numpy as np  # Deferred: header-only callers (ingest, the CLI) do not need numpy
+
+    header, data = wav_data(buffer)
+    channels = header['channels']
+    if header['block_align'] and header['block_align'] != channels * header['bits'] // 8:
+        raise WavHeaderError(f"unsupported sample container ({header['bits']} bits in "
+                             f"{header['block_align']}-byte frames)")
+    fmt = (header['format_tag'], header['bits'])
+    if fmt in SAMPLE_DTYPES:
+        samples = np.frombuffer(data, dtype=SAMPLE_DTYPES[fmt])
+    elif fmt == (WAVE_FORMAT_PCM, 8):
+        samples = (np.frombuffer(data, dtype=np.uint8) ^ np.uint8(0x80)).view(np.int8)
+    elif fmt == (WAVE_FORMAT_PCM, 24):
+        samples = widen_int24(data)
+    else:
+        raise WavHeaderError(f"unsupported sample format (format tag {fmt[0]}, {fmt[1]} bits)")
+    samples = samples.reshape(-1, channels)
+    samples.flags.writeable = False
+    header['full_scale'] = full_scale(samples.dtype, header['bits'])
+    return header, samples
+
+
+# Decode a FLAC buffer into the same (header, samples) decode_wav returns for
+# the WAV it was encoded from: 8-bit as int8, 16-bit as int16 and 24-bit
+# left-justified in int32, read-only, so metrics are identical either way.
+# Unlike decode_wav this is a real decode (one copy of the samples).
+def decode_flac(buffer):
+    import numpy as np  # Deferred, as in decode_wav
+    import soundfile as sf  # Deferred: only FLAC takes need libsndfile
+
+    header = read_flac_header(BufferFile(buffer))
+    if header['bits'] not in FLAC_SUBTYPES:
+        raise WavHeaderError(f"unsupported FLAC bit depth ({header['bits']} bits)")
+    samples, _ = sf.read(io.BytesIO(buffer), dtype='int16' if header['bits'] <= 16 else 'int32', always_2d=True)
+    if header['bits'] == 8:
+        samples = (samples >> 8).astype(np.int8)
+    header['frames'] = len(samples)
+    header['duration'] = len(samples) / float(header['rate']) if header['rate'] else 0.0
+    header['full_scale'] = full_scale(samples.dtype, header['bits'])
+    samples.flags.writeable = False
+    return header, samples
+
+
+# decode_wav or decode_flac, by the buffer's format
+def decode_audio(buffer):
+    return decode_flac(buffer) if is_flac(buffer) else decode_wav(buffer)
+
+
+# FLAC bytes of integer samples as decode_audio returns them, at `bits` (8, 16
+# or 24), with an optional Vorbis comment. compression_level is soundfile's
+# 0 to 1 (FLAC levels 0 to 8); None keeps libFLAC's default (level 5).
+def write_flac(samples, rate, bits, comment=None, compression_level=None):
+    import numpy as np
+    import soundfile as sf
+
+    if samples.dtype == np.int8:
+        samples = samples.astype(np.int16) << 8  # soundfile has no int8 input; PCM_S8 keeps the top byte
+    out = io.BytesIO()
+    with sf.SoundFile(out, 'w', rate, samples.shape[1] if samples.ndim > 1 else 1, subtype=FLAC_SUBTYPES[bits],
+                      format='FLAC', compression_level=compression_level) as f:
+        if comment:
+            f.comment = comment
+        f.write(samples)
+    return out.getvalue()
+
+
+# Losslessly compress WAV bytes to FLAC, tagged with the WAV's digest (see
+# audio_digest). Returns None for sample formats FLAC cannot hold exactly
+# (float and 32-bit integer WAVs).
+def encode_flac(buffer, compression_level=None):
+    header, samples = decode_wav(buffer)
+    if header['format_tag'] != WAVE_FORMAT_PCM or header['bits'] not in FLAC_SUBTYPES:
+        return None
+    return write_flac(samples, header['rate'], header['bits'], DIGEST_PREFIX + hashlib.sha256(buffer).hexdigest(),
+                      compression_level)
@@ -0,0 +1,202 @@
+import math
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from voicerecorder.audio import decode_audio
+from voicerecorder.metrics import analyze_decoded
+from voicerecorder.project import REMOVED_FILES, parse_removed
+from voicerecorder.registry import FileRegistry, parse_project_filename
+from voicerecorder.sidecar import LEVEL_METRICS, read_sidecar, sidecar_name
+
+REPORT_COLUMNS = ['num', 'date', 'file', 'duration', 'rate', 'peak_db', 'rms_db', 'snr_db', 'clipping', 'error']
+# Metrics checked for outliers against the rest of the project, with the
+# smallest spread (median absolute deviation) assumed for each, so a very
+# uniform project does not flag takes over fractions of a dB
+OUTLIER_METRICS = {'peak_db': 1.0, 'rms_db': 1.0, 'snr_db': 1.0, 'duration': 0.25}
+# Modified z-score above which a take is an outlier (Iglewicz and Hoaglin)
+OUTLIER_Z = 3.5
+# Chunks handed to each worker over a run: enough to balance uneven take
+# lengths, few enough that per-task pickling stays negligible
+CHUNKS_PER_WORKER = 4
+MAX_CHUNK_SIZE = 64
+
+
+# Accepted takes of a project directory: the latest complete txt/audio pair of
+# every script number not listed in removed.txt (or scripts.removed).
+# Returns [(num, date, audio path)] in script number order.
+def project_wavs(directory):
+    names = os.listdir(directory)
+    removed = set()
+    for removed_name in REMOVED_FILES:
+        if removed_name in names:
+            with open(os.path.join(directory, removed_name)) as f:
+                removed.update(parse_removed(f))
+    registry = FileRegistry()
+    for name in names:
+        registry.add(name)
+    takes = []
+    for num in sorted(registry.nums()):
+        pair = None if num in removed else registry.latest_pair(num)
+        if pair:
+            date, _, audio_name = pair
+            takes.append((num, date, os.path.join(directory, audio_name)))
+    return takes
+
+
+# One report row for a WAV or FLAC take. A take's analysis sidecar (written with it on
+# accept) is used when there is one, so the audio is not decoded again. Errors
+# are recorded in the row rather than raised, so one bad file does not abort a
+# batch.
+def analyze_file(path, use_sidecar=True):
+    name = os.path.basename(path)
+    parsed = parse_project_filename(name)
+    row = dict.fromkeys(REPORT_COLUMNS)
+    row.update({'num': parsed[0] if parsed else None, 'date': parsed[1] if parsed else None, 'file': name})
+    try:
+        sidecar = None
+        if use_sidecar and parsed:
+            sidecar = read_sidecar(os.path.join(os.path.dirname(path), sidecar_name(parsed[0], parsed[1])))
+        if sidecar is not None and sidecar[2] is not None:
+            (metrics, rate, _), _, duration = sidecar
+        else:
+            with open(path, 'rb') as f:
+                header, samples = decode_audio(f.read())
+            metrics, rate, _ = analyze_decoded(header, samples)
+            duration = header['duration']
+        row.update({metric: metrics[metric] for metric in LEVEL_METRICS})
+        row['rate'] = rate
+        row['duration'] = duration
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def analyze_chunk(paths):
+    return [analyze_file(path) for path in paths]
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def chunk_size_for(total, workers):
+    return max(1, min(MAX_CHUNK_SIZE, math.ceil(total / (workers * CHUNKS_PER_WORKER))))
+
+
+# Analyse take files on a process pool. Paths are scheduled in chunks so each
+# task amortises its inter-process overhead over several files; workers read
+# the files themselves, so no audio crosses process boundaries. With
+# threads=True a thread pool is used instead (numpy releases the GIL for most
+# of the work), for callers that cannot start processes, such as the app.
+# progress(done, total) is called from the calling thread as chunks complete.
+# Returns a report DataFrame in the order of `paths`, with outliers flagged.
+def analyze_project(paths, workers=None, chunk_size=None, progress=None, threads=False):
+    import pandas as pd  # Deferred, as in flag_outliers: the CLI only needs pandas for reports
+
+    paths = list(paths)
+    total = len(paths)
+    workers = max(1, min(workers or default_workers(), total or 1))
+    chunk_size = chunk_size or chunk_size_for(total, workers)
+    rows = [None] * total
+    if workers == 1:
+        for done, path in enumerate(paths, 1):
+            rows[done - 1] = analyze_file(path)
+            if progress is not None:
+                progress(done, total)
+    elif total:
+        if threads:
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            # Never fork: a forked child of a multithreaded process can deadlock
+            # on a lock another thread held. Workers import analyze_chunk from
+            # this module. A spawned or forkserver worker also re-runs the
+            # caller's __main__ script, which is why the app uses threads.
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        with executor:
+            futures = {executor.submit(analyze_chunk, paths[start:start + chunk_size]): start
+                       for start in range(0, total, chunk_size)}
+            done = 0
+            for future in as_completed(futures):
+                start = futures[future]
+                chunk_rows = future.result()
+                rows[start:start + len(chunk_rows)] = chunk_rows
+                done += len(chunk_rows)
+                if progress is not None:
+                    progress(done, total)
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS).astype({'num': 'Int64', 'rate': 'Int64'})
+    return flag_outliers(report)
+
+
+# Add `outlier` and `reasons` columns. A take is flagged if it failed to
+# analyse, is silent or clips, or if any of OUTLIER_METRICS is far from the
+# project median by modified z-score (median absolute deviation, so a few bad
+# takes do not shift the baseline).
+def flag_outliers(report, z_threshold=OUTLIER_Z):
+    import pandas as pd
+
+    report = report.copy()
+    reasons = [[] for _ in range(len(report))]
+    for column, min_mad in OUTLIER_METRICS.items():
+        values = pd.to_numeric(report[column], errors='coerce').to_numpy(dtype=np.float64)
+        finite = np.isfinite(values)
+        if finite.sum() < 3:
+            continue
+        median = np.median(values[finite])
+        mad = max(np.median(np.abs(values[finite] - median)), min_mad)
+        z = 0.6745 * (values - median) / mad
+        for i in np.flatnonzero(finite & (np.abs(z) > z_threshold)):
+            reasons[i].append(f"{column} {'high' if z[i] > 0 else 'low'}")
+    for i, (peak_db, clipping, error) in enumerate(zip(report['peak_db'], report['clipping'], report['error'])):
+        if isinstance(error, str):
+            reasons[i].insert(0, "error")
+        elif peak_db == -np.inf:
+            reasons[i].insert(0, "silent")
+        elif clipping:
+            reasons[i].insert(0, "clipping")
+    report['reasons'] = [", ".join(r) for r in reasons]
+    report['outlier'] = report['reasons'] != ""
+    return report
+
+
+# Write a report as Parquet (.parquet) or CSV (anything else)
+def write_report(report, path):
+    if path.endswith('.parquet'):
+        report.to_parquet(path, index=False)
+    else:
+        report.to_csv(path, index=False)
+
+
+# `voicerecorder analyze`: write a quality report for a project directory.
+# Exits non-zero if any take failed to analyse.
+def run(args):
+    takes = project_wavs(args.project_dir)
+
+    def progress(done, total):
+        print(f"\rAnalysed {done}/{total} takes", end="", file=sys.stderr, flush=True)
+
+    report = analyze_project([path for _, _, path in takes], workers=args.workers, chunk_size=args.chunk_size,
+                             progress=progress)
+    print(file=sys.stderr)
+    write_report(report, args.output)
+    outliers = report[report['outlier']]
+    print(f"{len(report)} takes analysed, {len(outliers)} outliers; report written to {args.output}")
+    for row in outliers.itertuples():
+        print(f"  {row.file}: {row.reasons}")
+    return 1 if report['error'].notna().any() else 0
+
+
+# Same as `python -m voicerecorder analyze`
+def main(argv=None):
+    from voicerecorder.cli import main as cli_main
+
+    return cli_main(['analyze', *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from voicerecorder.audio import audio_digest
+
+# Rough per-entry overhead (dict, key, metrics) on top of the waveform buffer
+ENTRY_OVERHEAD = 1024
+
+
+# Content-addressed cache for (metrics, rate, waveform) results.
+#
+# Entries are keyed on a hash of the take's audio plus the script text, kept in a
+# memory LRU bounded by total size, and optionally mirrored to a directory so
+# they survive across sessions and restarts. Safe to share between sessions.
+class MetricsCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # context distinguishes otherwise identical requests (e.g. the recognition
+    # language). A FLAC take has the key of the WAV it was compressed from.
+    @staticmethod
+    def key(audio_bytes, script_text="", context=""):
+        h = hashlib.sha256()
+        h.update(audio_digest(audio_bytes))
+        h.update(script_text.encode())
+        if context:
+            h.update(b"\0" + context.encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, value)
+        return value
+
+    # persist=False keeps the entry in memory only (e.g. results carrying a
+    # transient Azure error, which should be retried in a later session)
+    def put(self, key, value, persist=True):
+        with self._lock:
+            self._insert(key, value)
+        if persist:
+            self._store(key, value)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'entries': len(self._entries), 'bytes': self._total}
+
+    def _insert(self, key, value):
+        if key in self._entries:
+            self._total -= self._sizes[key]
+        size = entry_size(value)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._total += size
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            old_key, _ = self._entries.popitem(last=False)
+            self._total -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + '.npz')
+
+    def _load(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                metrics = json.loads(str(npz['metrics']))
+                return metrics, int(npz['rate']), npz['waveform']
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _store(self, key, value):
+        if not self.disk_dir:
+            return
+        metrics, rate, waveform = value
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        bio = io.BytesIO()
+        np.savez(bio, metrics=json.dumps(metrics, default=float), rate=rate, waveform=waveform)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(bio.getvalue())
+        os.replace(tmp_path, path)
+
+
+def entry_size(value):
+    _, _, waveform = value
+    return getattr(waveform, 'nbytes', 0) + ENTRY_OVERHEAD
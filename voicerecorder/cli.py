@@ -0,0 +1,248 @@
+# Command line entry point: python -m voicerecorder <command> ...
+#
+# Each command imports what it needs when it runs, so `--help`, `status` and
+# `export` start without numpy, pandas, scipy, Streamlit or the Azure SDK.
+import argparse
+import json
+import os
+import shutil
+import sys
+
+
+def cmd_status(args):
+    from voicerecorder.project import ProjectDir
+
+    project = ProjectDir(args.project_dir)
+    index = project.scripts.index
+    recorded = sum(s.record_time for s in project.scripts if s.status == 'Completed')
+    print(f"{len(project.scripts)} scripts: {index.count('Completed')} completed, "
+          f"{index.count('Not started')} not started, {index.count('Removed')} removed")
+    print(f"Recorded: {recorded / 60:.1f} min, language {project.language}")
+    if project.stale:
+        print(f"{len(project.stale)} superseded or orphaned take files (left out of exports)")
+    for name, e in project.errors:
+        print(f"Error reading {name}: {e}", file=sys.stderr)
+    return 1 if project.errors else 0
+
+
+def cmd_metrics(args):
+    from voicerecorder.metrics import analyze_wav
+
+    for path in args.wav:
+        with open(path, 'rb') as f:
+            metrics, rate, data = analyze_wav(f.read())
+        row = {'file': path, 'rate': rate, 'duration': len(data) / rate if rate else 0.0}
+        row.update((name, float(value)) if name != 'clipping' else (name, value) for name, value in metrics.items())
+        # json.dumps writes non-finite levels as Infinity/NaN, which Python and pandas read back
+        print(json.dumps(row))
+    return 0
+
+
+def cmd_analyze(args):
+    from voicerecorder.batch import run
+
+    return run(args)
+
+
+def cmd_export(args):
+    from voicerecorder.export import ProjectArchive
+    from voicerecorder.project import ProjectDir
+
+    # The archive's manifest only lives for one process, so start from scratch
+    # rather than patching (and doubling) an archive from an earlier run
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    archive = ProjectArchive(args.output)
+    archive.update(ProjectDir(args.project_dir).entries())
+    print(f"{archive.last_written} entries written ({archive.last_bytes / 1e6:.1f} MB) to {args.output}")
+    return 0
+
+
+def cmd_process(args):
+    from voicerecorder.postprocess import TARGET_LEVEL_DB, TRIM_PADDING_SECONDS, process_take, savings
+    from voicerecorder.project import ProjectDir
+    from voicerecorder.sidecar import rewritten_sidecar, sidecar_name
+
+    project = ProjectDir(args.project_dir)
+    takes = {os.path.basename(path): (num, date) for num, date, path in project.takes()}
+    # Sidecars of processed takes are rewritten for the new audio, not copied
+    sidecars = {sidecar_name(num, date) for num, date in takes.values()}
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    infos = []
+    for name, source in project.entries().items():
+        output_path = os.path.join(args.output_dir, name) if args.output_dir else None
+        if name in takes:
+            with open(source, 'rb') as f:
+                original = f.read()
+            audio, info = process_take(
+                original, trim=not args.no_trim,
+                target_db=None if args.no_normalize else args.target_level or TARGET_LEVEL_DB,
+                padding_seconds=TRIM_PADDING_SECONDS if args.padding is None else args.padding)
+            infos.append(info)
+            if output_path:
+                with open(output_path, 'wb') as f:
+                    f.write(audio)
+                num, date = takes[name]
+                old_sidecar = project.path(sidecar_name(num, date))
+                text = project.scripts[project.scripts.position(num)].text
+                with open(os.path.join(args.output_dir, sidecar_name(num, date)), 'wb') as f:
+                    f.write(rewritten_sidecar(audio, original, text, project.language,
+                                              old_sidecar if os.path.exists(old_sidecar) else None))
+        elif name in sidecars:
+            continue
+        elif output_path and isinstance(source, str):
+            shutil.copyfile(source, output_path)
+        elif output_path:
+            with open(output_path, 'wb') as f:
+                f.write(source)
+    saved = savings(infos)
+    print(f"{saved['takes']} takes: {saved['before'] / 60:.1f} -> {saved['after'] / 60:.1f} min, "
+          f"saved {saved['saved'] / 60:.1f} min ({saved['saved_ratio']:.0%})"
+          + (f"; processed project written to {args.output_dir}" if args.output_dir else " (dry run)"))
+    return 0
+
+
+# `voicerecorder sidecars`: write the analysis sidecar of every accepted take
+# that lacks one (all with --force, keeping pronunciation scores that are still
+# valid), so the app can show a project's metrics without decoding its audio
+def cmd_sidecars(args):
+    from voicerecorder.project import ProjectDir
+    from voicerecorder.sidecar import read_sidecar, rewritten_sidecar, sidecar_name
+
+    project = ProjectDir(args.project_dir)
+    written = failed = 0
+    takes = project.takes()
+    for num, date, path in takes:
+        sidecar_path = project.path(sidecar_name(num, date))
+        old_sidecar = read_sidecar(sidecar_path)
+        if old_sidecar is not None and not args.force:
+            continue
+        text = project.scripts[project.scripts.position(num)].text
+        try:
+            with open(path, 'rb') as f:
+                audio = f.read()
+            data = rewritten_sidecar(audio, audio, text, project.language,
+                                     sidecar_path if old_sidecar is not None else None)
+        except Exception as e:
+            print(f"Error analysing {os.path.basename(path)}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        with open(sidecar_path, 'wb') as f:
+            f.write(data)
+        written += 1
+    print(f"{written} sidecars written, {len(takes) - written - failed} already present, {failed} failed")
+    return 1 if failed else 0
+
+
+# `voicerecorder compress`: replace the WAV of every accepted take with a
+# lossless FLAC in place, as the app's FLAC audio format does on accept, and
+# record the format in project.json. Analysis sidecars stay valid, as a FLAC
+# take keeps the key of the WAV it was encoded from.
+def cmd_compress(args):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from voicerecorder.audio import encode_flac
+    from voicerecorder.project import SETTINGS_FILE, ProjectDir, parse_settings
+    from voicerecorder.registry import script_filename
+
+    project = ProjectDir(args.project_dir)
+    wavs = [take for take in project.takes() if take[2].endswith('.wav')]
+
+    # (WAV bytes, FLAC bytes or None if kept as WAV)
+    def compress(take):
+        num, date, path = take
+        with open(path, 'rb') as f:
+            wav = f.read()
+        flac = encode_flac(wav, args.level)
+        if flac is None or len(flac) >= len(wav):
+            return len(wav), None
+        flac_path = project.path(script_filename(num, date, 'flac'))
+        with open(flac_path + ".tmp", 'wb') as f:
+            f.write(flac)
+        os.replace(flac_path + ".tmp", flac_path)
+        os.remove(path)
+        return len(wav), len(flac)
+
+    before = after = kept = failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers or os.cpu_count() or 1) as executor:
+        for take, future in [(take, executor.submit(compress, take)) for take in wavs]:
+            try:
+                wav_bytes, flac_bytes = future.result()
+            except Exception as e:
+                print(f"Error compressing {os.path.basename(take[2])}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            if flac_bytes is None:
+                kept += 1
+            else:
+                before += wav_bytes
+                after += flac_bytes
+    settings_path = project.path(SETTINGS_FILE)
+    settings = {}
+    if os.path.exists(settings_path):
+        with open(settings_path, 'rb') as f:
+            settings = parse_settings(f.read())
+    settings['audio_format'] = 'flac'
+    with open(settings_path, 'w') as f:
+        json.dump(settings, f)
+    compressed = len(wavs) - kept - failed
+    print(f"{compressed} takes compressed: {before / 1e6:.1f} -> {after / 1e6:.1f} MB "
+          f"({1 - after / before if before else 0.0:.0%} smaller), {kept} kept as WAV, {failed} failed")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="voicerecorder", description="Voice Script Recorder project tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    status = commands.add_parser('status', help="Summarise a project directory")
+    status.add_argument('project_dir')
+    status.set_defaults(handler=cmd_status)
+
+    metrics = commands.add_parser('metrics', help="Print peak/RMS/SNR/clipping of WAV or FLAC files as JSON lines")
+    metrics.add_argument('wav', nargs='+')
+    metrics.set_defaults(handler=cmd_metrics)
+
+    analyze = commands.add_parser('analyze', help="Analyse every accepted take of a project directory")
+    analyze.add_argument('project_dir')
+    analyze.add_argument('-o', '--output', default="quality_report.csv",
+                         help="Report path; .parquet writes Parquet, anything else CSV")
+    analyze.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    analyze.add_argument('--chunk-size', type=int, default=None, help="Files per task (default: automatic)")
+    analyze.set_defaults(handler=cmd_analyze)
+
+    process = commands.add_parser('process', help="Trim silence and normalize loudness of every accepted take")
+    process.add_argument('project_dir')
+    process.add_argument('--output-dir', help="Write the processed project here (default: only report savings)")
+    process.add_argument('--padding', type=float, help="Silence kept around the speech (seconds, default 0.25)")
+    process.add_argument('--target-level', type=float, help="Loudness target (dBFS RMS, default -20)")
+    process.add_argument('--no-trim', action='store_true')
+    process.add_argument('--no-normalize', action='store_true')
+    process.set_defaults(handler=cmd_process)
+
+    sidecars = commands.add_parser('sidecars', help="Write missing analysis sidecars for every accepted take")
+    sidecars.add_argument('project_dir')
+    sidecars.add_argument('--force', action='store_true', help="Rewrite existing sidecars as well")
+    sidecars.set_defaults(handler=cmd_sidecars)
+
+    compress = commands.add_parser('compress', help="Store every accepted take as lossless FLAC")
+    compress.add_argument('project_dir')
+    compress.add_argument('--level', type=float, help="Compression level, 0 (fastest) to 1 (smallest)")
+    compress.add_argument('--workers', type=int, default=None, help="Encoding threads (default: CPU count)")
+    compress.set_defaults(handler=cmd_compress)
+
+    export = commands.add_parser('export', help="Write the project ZIP the app would export")
+    export.add_argument('project_dir')
+    export.add_argument('-o', '--output', default="project.zip")
+    export.set_defaults(handler=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from voicerecorder.audio import encode_flac
+from voicerecorder.registry import parse_project_filename, script_filename
+
+# libsndfile releases the GIL while encoding, so a few threads keep up with
+# several sessions accepting takes without slowing their reruns
+ENCODE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+# Compresses stored WAV takes to FLAC on a background thread pool, shared by
+# every session. submit(store, name) queues a take; once encoded, its FLAC
+# replaces the WAV in the store (ProjectStore.convert), unless the take was
+# rewritten or removed in the meantime. A take stays a WAV if FLAC cannot hold
+# its sample format exactly or would not make it smaller.
+class TakeEncoder:
+    def __init__(self, max_workers=ENCODE_WORKERS, compression_level=None):
+        self.compression_level = compression_level
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flac")
+        # {(id(store), name): (version, future)}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.encoded = 0
+        self.skipped = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.seconds = 0.0
+
+    # Queue one stored WAV take. A take already queued at its current version
+    # is not queued again.
+    def submit(self, store, name):
+        key = (id(store), name)
+        version = store.version(name)
+        with self._lock:
+            queued = self._futures.get(key)
+            if queued is not None and queued[0] == version and not queued[1].done():
+                return queued[1]
+            future = self._executor.submit(self._encode, store, name, version)
+            self._futures[key] = (version, future)
+
+        def finish(f):
+            with self._lock:
+                if self._futures.get(key, (None, None))[1] is f:
+                    del self._futures[key]
+
+        future.add_done_callback(finish)
+        return future
+
+    # Takes of a store still queued or being encoded
+    def pending(self, store):
+        with self._lock:
+            return sum(1 for (store_id, _), (_, future) in self._futures.items()
+                       if store_id == id(store) and not future.done())
+
+    # Block until the store's queued takes are encoded (e.g. before an export)
+    def wait(self, store, timeout=None):
+        with self._lock:
+            futures = [future for (store_id, _), (_, future) in self._futures.items() if store_id == id(store)]
+        wait(futures, timeout)
+
+    def stats(self):
+        with self._lock:
+            return {'encoded': self.encoded, 'skipped': self.skipped, 'bytes_before': self.bytes_before,
+                    'bytes_after': self.bytes_after, 'seconds': self.seconds}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    # Returns whether the take was replaced by its FLAC
+    def _encode(self, store, name, version):
+        num, date, _ = parse_project_filename(name)
+        start = time.perf_counter()
+        try:
+            wav = store[name]
+            flac = encode_flac(wav, self.compression_level)
+        except Exception:
+            # Removed since it was queued, or not a WAV this can read: left as it is
+            flac = wav = None
+        elapsed = time.perf_counter() - start
+        replaced = (flac is not None and len(flac) < len(wav)
+                    and store.convert(name, script_filename(num, date, 'flac'), flac, version))
+        with self._lock:
+            self.seconds += elapsed
+            if replaced:
+                self.encoded += 1
+                self.bytes_before += len(wav)
+                self.bytes_after += len(flac)
+            else:
+                self.skipped += 1
+        return replaced
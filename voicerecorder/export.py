@@ -0,0 +1,82 @@
+import hashlib
+import os
+import zipfile
+
+# Rebuild the archive from scratch once superseded entries exceed this share of it
+COMPACT_RATIO = 0.5
+
+
+# Identity of an entry's content: (size, mtime) for files on disk, a digest for
+# in-memory payloads
+def entry_signature(source):
+    if isinstance(source, str):
+        st = os.stat(source)
+        return 'file', st.st_size, st.st_mtime_ns
+    return 'bytes', hashlib.sha1(source).hexdigest()
+
+
+def write_entry(zf, arcname, source):
+    if isinstance(source, str):
+        # WAVs are stored uncompressed and copied in chunks straight from disk
+        zf.write(source, arcname=arcname, compress_type=zipfile.ZIP_STORED)
+    else:
+        zf.writestr(arcname, source, compress_type=zipfile.ZIP_DEFLATED)
+
+
+# Incrementally maintained project ZIP on disk.
+#
+# update() takes the full set of entries ({arcname: path or bytes}) and only
+# touches what changed since the previous export: new and modified entries are
+# appended, and superseded or deleted ones are dropped from the central
+# directory. Their bytes stay in the file as dead space until it grows past
+# COMPACT_RATIO of the archive, at which point the archive is rebuilt.
+class ProjectArchive:
+    def __init__(self, path):
+        self.path = path
+        self._manifest = {}
+        self._dead_bytes = 0
+        self.last_written = 0
+        self.last_bytes = 0
+
+    def update(self, entries):
+        signatures = {name: entry_signature(source) for name, source in entries.items()}
+        changed = [name for name in entries if self._manifest.get(name) != signatures[name]]
+        dropped = set(self._manifest) - set(entries)
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if not size or self._dead_bytes > COMPACT_RATIO * size:
+            self._rebuild(entries)
+        elif changed or dropped:
+            self._patch(entries, changed, dropped | set(changed))
+        else:
+            self.last_written = 0
+            self.last_bytes = 0
+        self._manifest = signatures
+        return self.path
+
+    def _rebuild(self, entries):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with zipfile.ZipFile(tmp_path, 'w') as zf:
+            for name, source in entries.items():
+                write_entry(zf, name, source)
+        os.replace(tmp_path, self.path)
+        self._dead_bytes = 0
+        self.last_written = len(entries)
+        self.last_bytes = os.path.getsize(self.path)
+
+    def _patch(self, entries, changed, superseded):
+        with zipfile.ZipFile(self.path, 'a') as zf:
+            kept = []
+            for info in zf.filelist:
+                if info.filename in superseded:
+                    self._dead_bytes += info.compress_size + len(info.filename) + 30
+                    del zf.NameToInfo[info.filename]
+                else:
+                    kept.append(info)
+            zf.filelist = kept
+            written_from = zf.start_dir
+            for name in changed:
+                write_entry(zf, name, entries[name])
+            written_to = zf.fp.tell()
+        self.last_written = len(changed)
+        self.last_bytes = written_to - written_from
@@ -0,0 +1,70 @@
+from bisect import bisect_left, bisect_right, insort
+
+STATUSES = ('Not started', 'Completed', 'Removed')
+
+
+# Position of script index i within rows (a range or a sorted list of indices),
+# or None if it is not there
+def locate(rows, i):
+    if isinstance(rows, range):
+        return rows.index(i) if i in rows else None
+    pos = bisect_left(rows, i)
+    return pos if pos < len(rows) and rows[pos] == i else None
+
+
+# Precomputed lookups over a list of script records: position by script number
+# and the sorted positions of the scripts in each status. Built once per
+# project and then kept current one row at a time, so filtering, jumping and
+# status navigation never scan the whole list.
+class ScriptIndex:
+    def __init__(self, scripts=()):
+        self._positions = {}
+        self._statuses = []
+        self._by_status = {status: [] for status in STATUSES}
+        for s in scripts:
+            self.append(s.num, s.status)
+
+    def __len__(self):
+        return len(self._statuses)
+
+    def append(self, num, status):
+        i = len(self._statuses)
+        self._positions[num] = i
+        self._statuses.append(status)
+        self._by_status.setdefault(status, []).append(i)
+        return i
+
+    def position(self, num):
+        return self._positions.get(num)
+
+    def set_status(self, i, status):
+        old = self._statuses[i]
+        if old == status:
+            return
+        rows = self._by_status[old]
+        del rows[bisect_left(rows, i)]
+        insort(self._by_status.setdefault(status, []), i)
+        self._statuses[i] = status
+
+    # Script indices in a status (all scripts for None), in list order
+    def rows(self, status=None):
+        if status is None:
+            return range(len(self._statuses))
+        return self._by_status.get(status, [])
+
+    def count(self, status=None):
+        return len(self.rows(status))
+
+    # First script in a status after (or before) index i, wrapping around the
+    # list; None if there is no other script in that status
+    def next(self, i, status):
+        rows = self._by_status.get(status, [])
+        pos = bisect_right(rows, i)
+        target = rows[pos % len(rows)] if rows else None
+        return None if target == i else target
+
+    def prev(self, i, status):
+        rows = self._by_status.get(status, [])
+        pos = bisect_left(rows, i)
+        target = rows[pos - 1] if rows else None
+        return None if target == i else target
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from voicerecorder.audio import read_audio_header
+from voicerecorder.registry import AUDIO_EXTENSIONS, FileRegistry, parse_project_filename
+
+INGEST_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+
+# Decide from file names alone which project files survive a load: the files of
+# the latest complete txt/audio pair of every script that is not removed (its
+# analysis sidecar included, and only its FLAC if it has both), plus every file of
+# numbers that are not in the script list (they are carried through untouched).
+# `existing` names (already in the store) take part in the decision as well.
+def plan_ingest(names, script_nums, removed_nums, existing=()):
+    registry = FileRegistry()
+    for name in existing:
+        registry.add(name)
+    for name in names:
+        registry.add(name)
+    keep = set()
+    for num in registry.nums():
+        if num not in script_nums:
+            keep.update(registry.names(num))
+        elif num not in removed_nums:
+            pair = registry.latest_pair(num)
+            if pair:
+                keep.update(registry.take_names(num, pair[0]))
+    return keep
+
+
+# Copy one upload into the store. Returns the text of a .txt file or the duration
+# of a .wav or .flac file, read from its header only. Analysis sidecars are copied
+# unread (None); they are only opened when their take is shown.
+def ingest_file(store, upload):
+    _, _, ext = parse_project_filename(upload.name)
+    if ext == 'txt':
+        upload.seek(0)
+        data = upload.read()
+        store[upload.name] = data
+        return data.decode().strip()
+    if ext not in AUDIO_EXTENSIONS:
+        upload.seek(0)
+        store.write_stream(upload.name, upload)
+        return None
+    duration = read_audio_header(upload)['duration']
+    upload.seek(0)
+    store.write_stream(upload.name, upload)
+    return duration
+
+
+# Ingest uploads into the store on a thread pool. Returns ({name: text or
+# duration}, [(name, error)]). progress(done, total) is called from the calling
+# thread as files complete.
+def ingest_files(store, uploads, workers=INGEST_WORKERS, progress=None):
+    values = {}
+    errors = []
+    total = len(uploads)
+    if not total:
+        return values, errors
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as executor:
+        futures = {executor.submit(ingest_file, store, upload): upload.name for upload in uploads}
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            try:
+                values[name] = future.result()
+            except Exception as e:
+                errors.append((name, e))
+            if progress is not None:
+                progress(done, total)
+    return values, errors
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the span duration histogram buckets
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Per-session gauges not updated for this long are dropped from exports
+GAUGE_TTL_SECONDS = 600
+METRIC_PREFIX = "voicerecorder"
+
+
+# Timings of one rerun: (name, seconds, depth) per span in completion order,
+# the rerun's total time and the gauges sampled at its end
+class RunProfile:
+    def __init__(self):
+        self.started = time.time()
+        self.spans = []
+        self.total = None
+        self.gauges = {}
+        self._start = time.perf_counter()
+        self._depth = 0
+
+    # Spans merged by name: [(name, seconds, calls)] in first-seen order
+    def breakdown(self):
+        merged = {}
+        for name, seconds, _ in self.spans:
+            total, calls = merged.get(name, (0.0, 0))
+            merged[name] = (total + seconds, calls + 1)
+        return [(name, seconds, calls) for name, (seconds, calls) in merged.items()]
+
+    def to_dict(self):
+        return {'started': self.started, 'total_s': self.total, 'gauges': dict(self.gauges),
+                'spans': [{'name': name, 'seconds': seconds, 'depth': depth} for name, seconds, depth in self.spans]}
+
+
+# Process-wide instrumentation: timing spans and gauges.
+#
+# span(name) times a block. Every span feeds a per-name histogram shared by
+# all sessions; spans opened between begin_run() and end_run() on the same
+# thread (a Streamlit script run) are also listed in that run's RunProfile.
+# Work finished elsewhere (e.g. on a worker pool) is reported with observe().
+# Gauges are kept per session so exports show each live session's memory.
+# Everything is thread-safe; the data can be exported as JSON or in the
+# Prometheus text exposition format.
+class Profiler:
+    def __init__(self, buckets=SPAN_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}
+        self._gauges = {}
+
+    def begin_run(self):
+        run = RunProfile()
+        self._local.run = run
+        return run
+
+    # Close the current run, recording its total as the "rerun" span and the
+    # given gauges under `session`. Returns the run (None if none was begun).
+    def end_run(self, session=None, **gauges):
+        run = getattr(self._local, 'run', None)
+        if run is None:
+            return None
+        self._local.run = None
+        run.total = time.perf_counter() - run._start
+        run.gauges.update(gauges)
+        self.observe('rerun', run.total)
+        for name, value in gauges.items():
+            self.set_gauge(name, value, session)
+        return run
+
+    @contextmanager
+    def span(self, name):
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if run is not None:
+                run._depth -= 1
+                run.spans.append((name, seconds, run._depth))
+            self.observe(name, seconds)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(self.buckets)}
+            stats['count'] += 1
+            stats['sum'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats['buckets'][i] += 1
+
+    def set_gauge(self, name, value, session=None):
+        with self._lock:
+            self._gauges[(name, session)] = (value, time.time())
+
+    def stats(self):
+        with self._lock:
+            return {name: {'count': s['count'], 'sum': s['sum'], 'max': s['max'], 'buckets': list(s['buckets'])}
+                    for name, s in self._stats.items()}
+
+    # {(name, session): value} for gauges updated within GAUGE_TTL_SECONDS
+    def gauges(self):
+        cutoff = time.time() - GAUGE_TTL_SECONDS
+        with self._lock:
+            for key in [key for key, (_, updated) in self._gauges.items() if updated < cutoff]:
+                del self._gauges[key]
+            return {key: value for key, (value, _) in self._gauges.items()}
+
+    def to_json(self, run=None):
+        data = {'spans': self.stats(), 'buckets': list(self.buckets),
+                'gauges': [{'name': name, 'session': session, 'value': value}
+                           for (name, session), value in self.gauges().items()]}
+        if run is not None:
+            data['last_run'] = run.to_dict()
+        return json.dumps(data, indent=2)
+
+    def to_prometheus(self):
+        name = f"{METRIC_PREFIX}_span_seconds"
+        lines = [f"# HELP {name} Time spent in instrumented app sections", f"# TYPE {name} histogram"]
+        for span, s in sorted(self.stats().items()):
+            for bound, count in zip(self.buckets, s['buckets']):
+                lines.append(f'{name}_bucket{{span="{span}",le="{bound:g}"}} {count}')
+            lines.append(f'{name}_bucket{{span="{span}",le="+Inf"}} {s["count"]}')
+            lines.append(f'{name}_sum{{span="{span}"}} {s["sum"]:.6f}')
+            lines.append(f'{name}_count{{span="{span}"}} {s["count"]}')
+        gauges = {}
+        for (gauge, session), value in self.gauges().items():
+            gauges.setdefault(gauge, []).append((session, value))
+        for gauge, values in sorted(gauges.items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{gauge} gauge")
+            for session, value in sorted(values, key=lambda item: str(item[0])):
+                labels = f'{{session="{session}"}}' if session is not None else ""
+                lines.append(f"{METRIC_PREFIX}_{gauge}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+    # Write the Prometheus text atomically, e.g. for node_exporter's textfile collector
+    def write_prometheus(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
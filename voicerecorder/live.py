@@ -0,0 +1,42 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# Directory of the level meter component (declared with
+# streamlit.components.v1.declare_component(path=...))
+LEVEL_METER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "level_meter")
+# Frames per audio block metered in the browser (about 85 ms at 48 kHz)
+BLOCK_FRAMES = 4096
+# Minimum interval between running summaries streamed to the server
+STREAM_INTERVAL_MS = 500
+
+
+# A take finished in the level meter component: the WAV bytes plus the metrics
+# and waveform envelope computed in the browser, in the same shapes as
+# analyze_wav() and min_max_envelope() produce. The component sends it as one
+# binary value (uint32 header length, JSON header, WAV) so the audio is not
+# base64-encoded. JSON carries non-finite levels as strings ("-Infinity",
+# "NaN"), which float() parses back.
+def take_from_value(packed):
+    header_size = struct.unpack_from('<I', packed)[0]
+    value = json.loads(bytes(packed[4:4 + header_size]))
+    metrics = {name: float(value['metrics'][name]) for name in ('peak_db', 'rms_db', 'snr_db')}
+    metrics['clipping'] = bool(value['metrics']['clipping'])
+    envelope = np.asarray(value['envelope'], dtype=np.float32).reshape(2, -1)
+    return {
+        'take': value['take'],
+        'audio': bytes(packed[4 + header_size:]),
+        'rate': int(value['rate']),
+        'duration': float(value['duration']),
+        'metrics': metrics,
+        'envelope': envelope,
+    }
+
+
+# Running summary (JSON) streamed while a take is being recorded
+def levels_from_value(value):
+    levels = {name: float(value[name]) for name in ('elapsed', 'peak_db', 'rms_db', 'block_peak_db')}
+    levels['clipping'] = bool(value['clipping'])
+    return levels
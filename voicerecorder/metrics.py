@@ -0,0 +1,78 @@
+import numpy as np
+
+from voicerecorder.audio import decode_audio
+
+# Length of the windows used for the noise floor estimate
+WINDOW_SECONDS = 0.1
+
+
+# Convert raw WAV samples to a writable float32 mono buffer in the range -1 to 1.
+# This is the only full-length copy the engine makes; everything else reuses it.
+# Integer samples are signed and scaled by full_scale (header['full_scale'] from
+# decode_wav; their dtype's maximum if not given); float samples are already normalized.
+def normalize(data, full_scale=None):
+    if data.ndim > 1:
+        data = data[:, 0]  # Ensure mono
+    out = data.astype(np.float32)
+    if data.dtype.kind == 'i':
+        out /= np.float32(full_scale or np.iinfo(data.dtype).max)
+    return out
+
+
+# Per-window mean square of a squared signal. Full windows are reduced through a
+# reshape view; a trailing partial window (if any) is reduced separately.
+def window_mean_squares(squared, window_size):
+    n = len(squared)
+    full = n - n % window_size
+    means = squared[:full].reshape(-1, window_size).mean(axis=1, dtype=np.float64)
+    if full < n:
+        means = np.append(means, squared[full:].mean(dtype=np.float64))
+    return means
+
+
+# Analyse a normalized float32 buffer. The buffer is squared in place, so callers
+# must not reuse it afterwards (pass a copy if you need to keep the samples).
+def analyze_samples(samples, rate, window_seconds=WINDOW_SECONDS):
+    metrics = {}
+    if len(samples) == 0:
+        metrics['peak_db'] = -np.inf
+        metrics['rms_db'] = -np.inf
+        metrics['snr_db'] = np.nan
+        metrics['clipping'] = False
+        return metrics
+
+    # Peak from max/min avoids materializing np.abs(samples)
+    peak = max(float(samples.max()), -float(samples.min()))
+    metrics['clipping'] = bool(peak >= 1.0)
+
+    np.multiply(samples, samples, out=samples)
+    mean_sq = float(samples.mean(dtype=np.float64))
+    signal_rms = np.sqrt(mean_sq)
+
+    # Peak and RMS volume levels
+    metrics['peak_db'] = 20 * np.log10(peak) if peak > 0 else -np.inf
+    metrics['rms_db'] = 20 * np.log10(signal_rms) if mean_sq > 0 else -np.inf
+
+    # SNR estimation (rough: min RMS window as noise)
+    window_size = int(window_seconds * rate)
+    if window_size > 0:
+        noise_rms = np.sqrt(window_mean_squares(samples, window_size).min())
+        metrics['snr_db'] = 20 * np.log10(signal_rms / noise_rms) if noise_rms > 0 else np.inf
+    else:
+        metrics['snr_db'] = np.nan
+    return metrics
+
+
+# Compute peak/RMS/SNR/clipping of a decoded WAV (header and samples as returned
+# by decode_wav). Returns the metrics along with the sample rate and the raw
+# mono samples (a view, not a copy) for plotting.
+def analyze_decoded(header, samples, window_seconds=WINDOW_SECONDS):
+    mono = samples[:, 0]
+    metrics = analyze_samples(normalize(mono, header['full_scale']), header['rate'], window_seconds)
+    return metrics, header['rate'], mono
+
+
+# Decode WAV (or FLAC) bytes and compute peak/RMS/SNR/clipping, as analyze_decoded
+def analyze_wav(audio_bytes, window_seconds=WINDOW_SECONDS):
+    header, samples = decode_audio(audio_bytes)
+    return analyze_decoded(header, samples, window_seconds)
@@ -0,0 +1,118 @@
+import io
+
+import numpy as np
+
+from voicerecorder.audio import WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, decode_audio, is_flac, write_flac
+from voicerecorder.metrics import normalize, window_mean_squares
+
+# Length of the frames whose energy decides where sound starts and ends
+TRIM_FRAME_SECONDS = 0.02
+# A frame is sound if it is within TRIM_RANGE_DB of the loudest frame and above
+# TRIM_FLOOR_DB (dBFS), so quiet takes are trimmed relative to their own level
+TRIM_RANGE_DB = 40.0
+TRIM_FLOOR_DB = -60.0
+# Silence kept before the first and after the last sound frame
+TRIM_PADDING_SECONDS = 0.25
+# Loudness target: RMS level of the sound frames, in dBFS
+TARGET_LEVEL_DB = -20.0
+# Normalization never raises the peak above this level (dBFS)
+PEAK_CEILING_DB = -1.0
+# soundfile subtype that writes each decode_wav format back unchanged
+SUBTYPES = {
+    (WAVE_FORMAT_PCM, 8): 'PCM_U8',
+    (WAVE_FORMAT_PCM, 16): 'PCM_16',
+    (WAVE_FORMAT_PCM, 24): 'PCM_24',
+    (WAVE_FORMAT_PCM, 32): 'PCM_32',
+    (WAVE_FORMAT_IEEE_FLOAT, 32): 'FLOAT',
+    (WAVE_FORMAT_IEEE_FLOAT, 64): 'DOUBLE',
+}
+
+
+# Per-frame levels (dBFS) of a normalized mono buffer, plus the frame length
+def frame_levels(samples, rate, frame_seconds=TRIM_FRAME_SECONDS):
+    frame = max(int(frame_seconds * rate), 1)
+    mean_squares = window_mean_squares(np.square(samples), frame)
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(mean_squares), frame
+
+
+# Sample range [start, end) from the first to the last sound frame, widened by
+# the padding. A take with no sound frames (silence) is kept whole.
+def speech_bounds(levels, frame, total, rate, padding_seconds=TRIM_PADDING_SECONDS, range_db=TRIM_RANGE_DB,
+                  floor_db=TRIM_FLOOR_DB):
+    if len(levels) == 0:
+        return 0, total
+    sound = np.flatnonzero(levels >= max(levels.max() - range_db, floor_db))
+    if len(sound) == 0:
+        return 0, total
+    padding = int(padding_seconds * rate)
+    return max(int(sound[0]) * frame - padding, 0), min((int(sound[-1]) + 1) * frame + padding, total)
+
+
+# Gain (dB) that brings the sound frames to target_db RMS without pushing the
+# peak above PEAK_CEILING_DB. 0 for silence.
+def normalization_gain(samples, levels, target_db=TARGET_LEVEL_DB, range_db=TRIM_RANGE_DB, floor_db=TRIM_FLOOR_DB):
+    if len(levels) == 0 or not np.isfinite(levels.max()):
+        return 0.0
+    sound = levels[levels >= max(levels.max() - range_db, floor_db)]
+    level_db = 10 * np.log10(np.mean(10 ** (sound / 10)))
+    peak = max(float(samples.max()), -float(samples.min()))
+    return float(min(target_db - level_db, PEAK_CEILING_DB - 20 * np.log10(peak)))
+
+
+def encode_wav(samples, rate, fmt):
+    import soundfile as sf  # Deferred: only needed when a take is rewritten
+
+    if samples.dtype == np.int8:
+        samples = samples.astype(np.int16) << 8  # soundfile has no int8 input; PCM_U8 keeps the top byte
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, rate, subtype=SUBTYPES[fmt], format='WAV')
+    return buffer.getvalue()
+
+
+# Processed samples in the original take's container (FLAC keeps its bit depth)
+def encode_take(samples, rate, fmt, flac):
+    return write_flac(samples, rate, fmt[1]) if flac else encode_wav(samples, rate, fmt)
+
+
+# Trim leading/trailing silence (trim=True) and normalize loudness (target_db
+# not None) of a WAV or FLAC take. Samples outside the trimmed range are dropped
+# without being touched; gain is applied in float and written back in the
+# take's own file and sample format. Returns (audio bytes, info) where info holds
+# duration_before, duration_after (seconds) and gain_db. The input is returned
+# as is if there is nothing to change.
+def process_take(audio_bytes, trim=True, target_db=TARGET_LEVEL_DB, padding_seconds=TRIM_PADDING_SECONDS):
+    header, samples = decode_audio(audio_bytes)
+    rate = header['rate']
+    fmt = (header['format_tag'], header['bits'])
+    if fmt not in SUBTYPES:
+        raise ValueError(f"Unsupported WAV format {fmt}")
+    flac = is_flac(audio_bytes)
+    mono = normalize(samples, header['full_scale'])
+    levels, frame = frame_levels(mono, rate)
+    start, end = speech_bounds(levels, frame, len(mono), rate, padding_seconds) if trim else (0, len(mono))
+    gain_db = normalization_gain(mono[start:end], levels, target_db) if target_db is not None else 0.0
+    info = {'duration_before': header['duration'], 'duration_after': (end - start) / rate if rate else 0.0,
+            'gain_db': gain_db}
+    if abs(gain_db) < 0.01:
+        info['gain_db'] = 0.0
+        if (start, end) == (0, len(mono)):
+            return audio_bytes, info
+        return encode_take(samples[start:end], rate, fmt, flac), info
+    out = samples[start:end].astype(np.float32)
+    scale = 10 ** (gain_db / 20)
+    if samples.dtype.kind == 'i':
+        scale /= header['full_scale']
+    out *= np.float32(scale)
+    np.clip(out, -1.0, 1.0, out=out)
+    return encode_take(out, rate, fmt, flac), info
+
+
+# Before/after totals over processing infos: takes, seconds before and after,
+# seconds saved and the saved share of the original duration
+def savings(infos):
+    infos = list(infos)
+    before = sum(info['duration_before'] for info in infos)
+    after = sum(info['duration_after'] for info in infos)
+    return {'takes': len(infos), 'before': before, 'after': after, 'saved': before - after,
+            'saved_ratio': (before - after) / before if before else 0.0}
@@ -0,0 +1,131 @@
+import json
+import os
+
+from voicerecorder.audio import WavHeaderError, read_audio_header
+from voicerecorder.registry import FileRegistry, parse_project_filename
+from voicerecorder.scripts import ScriptCollection
+
+SCRIPTS_FILE = "scripts.txt"
+# removed.txt is written on export; scripts.removed is the older name
+REMOVED_FILES = ("removed.txt", "scripts.removed")
+SETTINGS_FILE = "project.json"
+# Format accepted takes are stored and exported in ('wav' or 'flac')
+AUDIO_FORMATS = ('wav', 'flac')
+DEFAULT_AUDIO_FORMAT = 'wav'
+PROJECT_FILES = (SCRIPTS_FILE, *REMOVED_FILES, SETTINGS_FILE)
+DEFAULT_LANGUAGE = "th-TH"
+
+
+def parse_removed(lines):
+    return [int(line.strip()) for line in lines if line.strip().isdigit()]
+
+
+def parse_settings(data):
+    return json.loads(data.decode()) if data else {}
+
+
+# Bring every script in line with its files: scripts in `removed` are marked
+# Removed, scripts with a complete take take its text, duration and date, and
+# the rest are Not started. text_of(name) and duration_of(name) read a take's
+# .txt and audio file. Records are updated in bulk and the collection is reindexed
+# once. Returns the names of the files that are no longer needed (every file
+# of removed or incomplete scripts and all but the latest take of the rest,
+# whose analysis sidecar is kept with it).
+def reconcile(scripts, registry, removed, text_of, duration_of):
+    removed = set(removed)
+    stale = []
+    for s in scripts:
+        num = s.num
+        pair = None if num in removed else registry.latest_pair(num)
+        s.latest_date = None
+        s.raw_time = None
+        if num in removed:
+            s.status = 'Removed'
+            s.record_time = 0.0
+        elif pair:
+            latest_date, txt_name, audio_name = pair
+            s.text = text_of(txt_name)
+            s.record_time = duration_of(audio_name)
+            s.status = 'Completed'
+            s.latest_date = latest_date
+        else:
+            s.status = 'Not started'
+            s.record_time = 0.0
+        keep = set(registry.take_names(num, pair[0])) if pair else ()
+        stale.extend(name for name in registry.names(num) if name not in keep)
+    scripts.reindex()
+    return stale
+
+
+# Entries of the project ZIP ({arcname: bytes or path}): scripts.txt,
+# removed.txt, project.json and the take files (text, audio and analysis
+# sidecar), given as {name: path}
+def project_entries(scripts, removed_nums, language, take_paths, audio_format=DEFAULT_AUDIO_FORMAT):
+    entries = {
+        SCRIPTS_FILE: scripts.to_text().encode(),
+        REMOVED_FILES[0]: "\n".join(str(num) for num in removed_nums).encode(),
+        SETTINGS_FILE: json.dumps({'language': language, 'audio_format': audio_format}).encode(),
+    }
+    for name, path in take_paths.items():
+        if parse_project_filename(name):
+            entries[name] = path
+    return entries
+
+
+# A project directory on disk (as exported by the app and unzipped), loaded
+# without Streamlit: the script collection reconciled with the take files,
+# the removed numbers and the project language. Files are only read, never
+# deleted; `stale` lists those the app would drop on load. Takes whose audio
+# header cannot be read count as zero-length and are listed in `errors` as
+# (name, error), as the app warns about them on upload.
+class ProjectDir:
+    def __init__(self, directory):
+        self.directory = directory
+        names = os.listdir(directory)
+        if SCRIPTS_FILE not in names:
+            raise FileNotFoundError(f"No {SCRIPTS_FILE} in {directory}")
+        with open(self.path(SCRIPTS_FILE), encoding='utf-8') as f:
+            self.scripts = ScriptCollection.from_lines(f.read().splitlines())
+        self.removed_nums = []
+        removed_name = next((name for name in REMOVED_FILES if name in names), None)
+        if removed_name:
+            with open(self.path(removed_name), encoding='utf-8') as f:
+                self.removed_nums = parse_removed(f)
+        settings = {}
+        if SETTINGS_FILE in names:
+            with open(self.path(SETTINGS_FILE), 'rb') as f:
+                settings = parse_settings(f.read())
+        self.language = settings.get('language', DEFAULT_LANGUAGE)
+        self.audio_format = settings.get('audio_format', DEFAULT_AUDIO_FORMAT)
+        self.errors = []
+        self.registry = FileRegistry()
+        for name in names:
+            self.registry.add(name)
+        self.stale = reconcile(self.scripts, self.registry, self.removed_nums, self._text, self._duration)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    # (num, date, audio path) of every accepted take, in script order
+    def takes(self):
+        return [(s.num, s.latest_date, self.path(self.registry.latest_pair(s.num)[2]))
+                for s in self.scripts if s.status == 'Completed']
+
+    # ZIP entries for the project as the app would export it (stale files left out)
+    def entries(self):
+        stale = set(self.stale)
+        take_paths = {name: self.path(name) for num in self.registry.nums() for name in self.registry.names(num)
+                      if name not in stale}
+        return project_entries(self.scripts, self.removed_nums, self.language, take_paths, self.audio_format)
+
+    def _text(self, name):
+        with open(self.path(name), 'rb') as f:
+            return f.read().decode().strip()
+
+    def _duration(self, name):
+        with open(self.path(name), 'rb') as f:
+            try:
+                return read_audio_header(f)['duration']
+            except WavHeaderError as e:
+                self.errors.append((name, e))
+                return 0.0
@@ -0,0 +1,381 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from voicerecorder.audio import WAVE_FORMAT_IEEE_FLOAT, decode_wav, wav_data
+
+# Frames pushed to the recognizer per write
+PUSH_CHUNK_FRAMES = 4096
+# Extra time allowed for continuous recognition beyond the take length
+CONTINUOUS_TIMEOUT_SECONDS = 60
+
+
+def empty_scores():
+    return {'pronunciation_score': None, 'fluency_score': None, 'prosody_score': None}
+
+
+# Whether metrics hold the outcome of an assessment: scores, an error, or no
+# scores at all (no speech recognized, or a language without assessment), which
+# is only told apart from "not assessed yet" by the ASSESSED flag
+ASSESSED = 'pronunciation_assessed'
+
+
+def assessed(metrics):
+    return (bool(metrics.get(ASSESSED)) or 'pronunciation_error' in metrics
+            or metrics.get('pronunciation_score') is not None)
+
+
+# Yield the PCM frames of a WAV file in fixed-size chunks, sliced from the data
+# chunk in place. The push stream only takes PCM, so float WAVs are converted
+# to 16-bit chunk by chunk (wav_format reports them as 16-bit).
+def iter_wav_frames(audio_bytes, chunk_frames=PUSH_CHUNK_FRAMES):
+    header, data = wav_data(audio_bytes)
+    if header['format_tag'] == WAVE_FORMAT_IEEE_FLOAT:
+        _, samples = decode_wav(audio_bytes)
+        for start in range(0, len(samples), chunk_frames):
+            chunk = np.clip(samples[start:start + chunk_frames], -1.0, 1.0) * 32767
+            yield np.round(chunk).astype('<i2').tobytes()
+        return
+    step = chunk_frames * (len(data) // header['frames']) if header['frames'] else len(data)
+    for start in range(0, len(data), step):
+        yield data[start:start + step].tobytes()
+
+
+# Stream the PCM frames of a WAV file into a write(bytes) sink in fixed-size chunks
+def push_wav_frames(audio_bytes, write, chunk_frames=PUSH_CHUNK_FRAMES):
+    for frames in iter_wav_frames(audio_bytes, chunk_frames):
+        write(frames)
+
+
+def mean(values, weights=None):
+    if weights is None:
+        weights = [1.0] * len(values)
+    pairs = [(v, w) for v, w in zip(values, weights) if v is not None]
+    total = sum(w for _, w in pairs)
+    if total > 0:
+        return sum(v * w for v, w in pairs) / total
+    return sum(v for v, _ in pairs) / len(pairs) if pairs else None
+
+
+# Combine per-segment results into take-level scores. Sentence-level accuracy and
+# fluency are weighted by segment duration; word and phoneme scores are averaged
+# over every word/phoneme in the take. Per-segment timing is kept for the report.
+def aggregate_segments(segments):
+    metrics = empty_scores()
+    if not segments:
+        return metrics
+    durations = [seg['duration_s'] for seg in segments]
+    metrics['pronunciation_score'] = mean([seg['accuracy'] for seg in segments], durations)
+    metrics['fluency_score'] = mean([seg['fluency'] for seg in segments], durations)
+    metrics['prosody_score'] = mean([seg['prosody'] for seg in segments])
+    metrics['completeness_score'] = mean([seg['completeness'] for seg in segments], durations)
+    metrics['word_score'] = mean([score for seg in segments for score in seg['word_scores']])
+    metrics['phoneme_score'] = mean([score for seg in segments for score in seg['phoneme_scores']])
+    metrics['pronunciation_segments'] = [
+        {key: seg[key] for key in ('offset_s', 'duration_s', 'latency_ms', 'accuracy', 'fluency', 'prosody', 'text')}
+        for seg in segments]
+    return metrics
+
+
+# Per-segment scores from a recognized Azure result. Offsets and durations are in
+# 100 ns ticks.
+def segment_from_result(speechsdk, result, latency_ms):
+    pronunciation_result = speechsdk.PronunciationAssessmentResult(result)
+    words = pronunciation_result.words or []
+    return {
+        'offset_s': result.offset / 1e7,
+        'duration_s': result.duration / 1e7,
+        'latency_ms': latency_ms,
+        'text': result.text,
+        'accuracy': pronunciation_result.accuracy_score,
+        'fluency': pronunciation_result.fluency_score,
+        'prosody': pronunciation_result.prosody_score,
+        'completeness': pronunciation_result.completeness_score,
+        'word_scores': [w.accuracy_score for w in words],
+        'phoneme_scores': [p.accuracy_score for w in words for p in (w.phonemes or [])],
+    }
+
+
+# (rate, bits, channels) of the PCM that iter_wav_frames yields
+def wav_format(audio_bytes):
+    header, _ = wav_data(audio_bytes)
+    bits = 16 if header['format_tag'] == WAVE_FORMAT_IEEE_FLOAT else header['bits']
+    return header['rate'], bits, header['channels']
+
+
+# Build a recognizer bound to a fresh push stream of the given (rate, bits, channels)
+# format. With preconnect the service connection is opened up front, so the
+# first recognition does not pay for connection and auth setup.
+def build_recognizer(speech_config, language, fmt, preconnect=False, continuous=False):
+    import azure.cognitiveservices.speech as speechsdk
+
+    rate, bits, channels = fmt
+    stream_format = speechsdk.audio.AudioStreamFormat(samples_per_second=rate, bits_per_sample=bits,
+                                                      channels=channels)
+    push_stream = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+    audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
+    speech_recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, language=language,
+                                                   audio_config=audio_config)
+    if preconnect:
+        speechsdk.Connection.from_recognizer(speech_recognizer).open(continuous)
+    return speech_recognizer, push_stream
+
+
+# Per-process pool of warmed-up recognizers for one subscription key, region and
+# language. The SpeechConfig is built once; recognizers are bound to a push stream
+# (so they are single-use) and pre-connected in the background, keyed by stream
+# format. Each take only attaches its PronunciationAssessmentConfig and audio.
+class RecognizerPool:
+    def __init__(self, speech_key, service_region, language="th-TH", size=2, continuous=False):
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
+        self.language = language
+        self.continuous = continuous
+        self.size = size
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recognizer-pool")
+        self.warm_hits = 0
+        self.cold_builds = 0
+        self.takes = 0
+        self.setup_ms_total = 0.0
+        self.recognition_ms_total = 0.0
+
+    def acquire(self, fmt):
+        with self._lock:
+            idle = self._idle.get(fmt)
+            entry = idle.pop() if idle else None
+            if entry is not None:
+                self.warm_hits += 1
+            else:
+                self.cold_builds += 1
+        if entry is None:
+            entry = build_recognizer(self.speech_config, self.language, fmt)
+        self._executor.submit(self._replenish, fmt)
+        return entry
+
+    # Start warming recognizers for a format before the first take arrives
+    def warm(self, fmt):
+        self._executor.submit(self._replenish, fmt)
+
+    def record(self, setup_ms, recognition_ms):
+        with self._lock:
+            self.takes += 1
+            self.setup_ms_total += setup_ms
+            self.recognition_ms_total += recognition_ms
+
+    def stats(self):
+        with self._lock:
+            takes = self.takes or 1
+            return {'takes': self.takes, 'warm_hits': self.warm_hits, 'cold_builds': self.cold_builds,
+                    'idle': sum(len(v) for v in self._idle.values()),
+                    'avg_setup_ms': self.setup_ms_total / takes,
+                    'avg_recognition_ms': self.recognition_ms_total / takes}
+
+    def _replenish(self, fmt):
+        while True:
+            with self._lock:
+                if len(self._idle.get(fmt, ())) >= self.size:
+                    return
+            try:
+                entry = build_recognizer(self.speech_config, self.language, fmt, preconnect=True,
+                                         continuous=self.continuous)
+            except Exception:
+                return
+            with self._lock:
+                self._idle.setdefault(fmt, []).append(entry)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# Pronunciation assessment through the Azure Speech SDK. Audio is fed through an
+# in-memory push stream; the SDK is imported lazily so the module can be used
+# (and tested with LocalRecognizer) without it installed. With a RecognizerPool
+# the config and connection setup is reused across takes.
+#
+# recognize_once() stops after the first utterance (roughly 15-30 s). In
+# continuous mode the whole take is streamed in chunks while recognition runs,
+# so segments are scored as they arrive and aggregated over the full take.
+class AzureRecognizer:
+    def __init__(self, speech_key, service_region, language="th-TH", pool=None, continuous=False):
+        self.speech_key = speech_key
+        self.service_region = service_region
+        self.language = pool.language if pool is not None else language
+        self.pool = pool
+        self.continuous = continuous
+
+    def assess(self, audio_bytes, script_text):
+        import azure.cognitiveservices.speech as speechsdk
+
+        metrics = empty_scores()
+        try:
+            fmt = wav_format(audio_bytes)
+            start = time.perf_counter()
+            if self.pool is not None:
+                speech_recognizer, push_stream = self.pool.acquire(fmt)
+            else:
+                speech_config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.service_region)
+                speech_recognizer, push_stream = build_recognizer(speech_config, self.language, fmt)
+
+            pronunciation_config = speechsdk.PronunciationAssessmentConfig(
+                reference_text=script_text,
+                grading_system=speechsdk.PronunciationAssessmentGradingSystem.HundredMark,
+                granularity=speechsdk.PronunciationAssessmentGranularity.Phoneme,
+                enable_miscue=False
+            )
+            pronunciation_config.enable_prosody_assessment()
+            pronunciation_config.apply_to(speech_recognizer)
+            setup_done = time.perf_counter()
+
+            if self.continuous:
+                segments = self._recognize_continuous(speechsdk, speech_recognizer, push_stream, audio_bytes)
+            else:
+                push_wav_frames(audio_bytes, push_stream.write)
+                push_stream.close()
+                result = speech_recognizer.recognize_once()
+                segments = [segment_from_result(speechsdk, result, (time.perf_counter() - setup_done) * 1000)]
+            recognition_done = time.perf_counter()
+            metrics['pronunciation_setup_ms'] = (setup_done - start) * 1000
+            metrics['pronunciation_recognition_ms'] = (recognition_done - setup_done) * 1000
+            if self.pool is not None:
+                self.pool.record(metrics['pronunciation_setup_ms'], metrics['pronunciation_recognition_ms'])
+
+            metrics.update(aggregate_segments(segments))
+        except Exception as e:
+            metrics['pronunciation_error'] = str(e)
+        return metrics
+
+    # Start continuous recognition, then push the audio while segments are being
+    # recognized. Waits for the session to stop once the stream is closed.
+    def _recognize_continuous(self, speechsdk, speech_recognizer, push_stream, audio_bytes):
+        segments = []
+        errors = []
+        stopped = threading.Event()
+        start = time.perf_counter()
+
+        def on_recognized(evt):
+            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
+                segments.append(segment_from_result(speechsdk, evt.result, (time.perf_counter() - start) * 1000))
+
+        def on_canceled(evt):
+            if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
+                errors.append(evt.cancellation_details.error_details)
+            stopped.set()
+
+        speech_recognizer.recognized.connect(on_recognized)
+        speech_recognizer.canceled.connect(on_canceled)
+        speech_recognizer.session_stopped.connect(lambda evt: stopped.set())
+        speech_recognizer.start_continuous_recognition_async().get()
+
+        rate, bits, channels = wav_format(audio_bytes)
+        push_wav_frames(audio_bytes, push_stream.write)
+        push_stream.close()
+        duration = (len(audio_bytes) * 8) / (rate * bits * channels)
+        stopped.wait(timeout=duration + CONTINUOUS_TIMEOUT_SECONDS)
+        speech_recognizer.stop_continuous_recognition_async().get()
+        if errors and not segments:
+            raise RuntimeError(errors[0])
+        return segments
+
+
+# Offline stand-in for AzureRecognizer. Consumes the audio the same way (chunked
+# PCM writes), waits `delay` seconds to mimic the network round trip and returns
+# deterministic scores derived from the audio and script text. In continuous
+# mode the take is cut into `segment_seconds` segments that go through the same
+# aggregation as Azure results.
+class LocalRecognizer:
+    def __init__(self, delay=1.0, error=None, continuous=False, segment_seconds=10.0):
+        self.delay = delay
+        self.error = error
+        self.continuous = continuous
+        self.segment_seconds = segment_seconds
+        self.calls = 0
+
+    def assess(self, audio_bytes, script_text):
+        metrics = empty_scores()
+        self.calls += 1
+        try:
+            start = time.perf_counter()
+            rate, bits, channels = wav_format(audio_bytes)
+            chunk_frames = int(self.segment_seconds * rate) if self.continuous else 2 ** 31 - 1
+            segments = []
+            offset = 0.0
+            for i, frames in enumerate(iter_wav_frames(audio_bytes, chunk_frames)):
+                digest = hashlib.sha256(frames + script_text.encode() + bytes([i % 256])).digest()
+                duration = len(frames) * 8 / (bits * channels) / rate
+                segments.append({
+                    'offset_s': offset, 'duration_s': duration,
+                    'latency_ms': (time.perf_counter() - start) * 1000, 'text': '',
+                    'accuracy': 50 + digest[0] % 51, 'fluency': 50 + digest[1] % 51,
+                    'prosody': 50 + digest[2] % 51, 'completeness': 50 + digest[3] % 51,
+                    'word_scores': [50 + b % 51 for b in digest[4:12]],
+                    'phoneme_scores': [50 + b % 51 for b in digest[12:32]],
+                })
+                offset += duration
+            time.sleep(self.delay)
+            metrics['pronunciation_setup_ms'] = 0.0
+            metrics['pronunciation_recognition_ms'] = (time.perf_counter() - start) * 1000
+            if self.error:
+                raise RuntimeError(self.error)
+            metrics.update(aggregate_segments(segments))
+        except Exception as e:
+            metrics['pronunciation_error'] = str(e)
+        return metrics
+
+
+# Runs pronunciation assessments on a background thread pool so the script run
+# never blocks on the recognizer. Submissions are de-duplicated by key: a key
+# that is already in flight returns the existing future.
+class PronunciationAssessor:
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pronunciation")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    # on_done(result) is called from the worker thread once the scores are in
+    def submit(self, key, recognizer, audio_bytes, script_text, on_done=None):
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(recognizer.assess, audio_bytes, script_text)
+            self._futures[key] = future
+
+        def finish(f):
+            try:
+                if on_done is not None:
+                    on_done(f.result())
+            finally:
+                with self._lock:
+                    if self._futures.get(key) is f:
+                        del self._futures[key]
+
+        future.add_done_callback(finish)
+        return future
+
+    def pending(self, key):
+        with self._lock:
+            return key in self._futures
+
+    # Also call fn(result) (from the worker thread, after on_done) once the
+    # assessment pending for key is done. Returns False if none is pending.
+    def when_done(self, key, fn):
+        with self._lock:
+            future = self._futures.get(key)
+        if future is None:
+            return False
+
+        def finish(f):
+            if f.exception() is None:
+                fn(f.result())
+
+        future.add_done_callback(finish)
+        return True
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
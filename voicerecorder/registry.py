@@ -0,0 +1,97 @@
+# Take audio formats, preferred first when a take has both (a WAV is replaced
+# by its FLAC once compressed, see voicerecorder.encoder)
+AUDIO_EXTENSIONS = ('flac', 'wav')
+# Take files: script text, audio and the analysis sidecar (voicerecorder.sidecar)
+EXTENSIONS = ('txt', *AUDIO_EXTENSIONS, 'analysis')
+
+
+def script_filename(num, date, ext):
+    return f"script{num:04d}_{date}.{ext}"
+
+
+# Parse a scriptNNNN_YYYYMMDD.{txt,wav,flac,analysis} project file name into (num, date, ext).
+# Numbers are zero-padded to at least four digits (script12345_... past 9999).
+# Returns None for anything else.
+def parse_project_filename(name):
+    ext = name.rsplit('.', 1)[-1]
+    if ext not in EXTENSIONS:
+        return None
+    parts = name.split('_')
+    if len(parts) == 2 and parts[0].startswith('script') and len(parts[0]) >= 10:
+        num_str = parts[0][6:]
+        date_part = parts[1].split('.')[0]
+        if num_str.isdigit() and date_part.isdigit() and len(date_part) == 8:
+            return int(num_str), date_part, ext
+    return None
+
+
+# Index of project files keyed by script number and date, holding the
+# txt/audio/sidecar names for each take. Replaces prefix scans over every file
+# name with O(1) lookups per script. A take's {ext: name} dict is replaced
+# rather than changed in place, so readers iterating it are not disturbed by a
+# background writer (see ProjectStore.convert).
+class FileRegistry:
+    def __init__(self):
+        self._scripts = {}
+
+    # Returns False (and ignores the name) if it is not a project file name
+    def add(self, name):
+        parsed = parse_project_filename(name)
+        if parsed is None:
+            return False
+        num, date, ext = parsed
+        dates = self._scripts.setdefault(num, {})
+        dates[date] = {**dates.get(date, {}), ext: name}
+        return True
+
+    def discard(self, name):
+        parsed = parse_project_filename(name)
+        if parsed is None:
+            return
+        num, date, ext = parsed
+        dates = self._scripts.get(num)
+        if not dates or date not in dates:
+            return
+        if dates[date].get(ext) == name:
+            dates[date] = {other: other_name for other, other_name in dates[date].items() if other != ext}
+        if not dates[date]:
+            del dates[date]
+        if not dates:
+            del self._scripts[num]
+
+    def __contains__(self, num):
+        return num in self._scripts
+
+    def nums(self):
+        return list(self._scripts)
+
+    # {date: {ext: name}} for one script
+    def dates(self, num):
+        return self._scripts.get(num, {})
+
+    def names(self, num):
+        return [name for entry in self._scripts.get(num, {}).values() for name in entry.values()]
+
+    # Audio file of one take (its FLAC, else its WAV), or None
+    def audio(self, num, date):
+        entry = self._scripts.get(num, {}).get(date, {})
+        return next((entry[ext] for ext in AUDIO_EXTENSIONS if ext in entry), None)
+
+    # Files of one take, with only the audio file audio() picks
+    def take_names(self, num, date):
+        audio = self.audio(num, date)
+        return [name for ext, name in self._scripts.get(num, {}).get(date, {}).items()
+                if ext not in AUDIO_EXTENSIONS or name == audio]
+
+    # Latest date that has both a txt and an audio file, or None
+    def latest_complete(self, num):
+        complete = [date for date, entry in self._scripts.get(num, {}).items()
+                    if 'txt' in entry and any(ext in entry for ext in AUDIO_EXTENSIONS)]
+        return max(complete) if complete else None
+
+    # (date, txt name, audio name) of the latest complete take, or None
+    def latest_pair(self, num):
+        date = self.latest_complete(num)
+        if date is None:
+            return None
+        return date, self._scripts[num][date]['txt'], self.audio(num, date)
@@ -0,0 +1,109 @@
+from collections import Counter
+
+from voicerecorder.index import ScriptIndex
+
+
+# Parse scripts.txt lines ("12. Some text") into (num, text) pairs, skipping
+# anything that is not a numbered line
+def parse_script_lines(lines):
+    parsed = []
+    for line in lines:
+        line = line.strip()
+        if line and line[0].isdigit() and '.' in line:
+            num_str, text = line.split('.', 1)
+            parsed.append((int(num_str), text.strip()))
+    return parsed
+
+
+# One script. raw_time is the take's duration as captured when it was
+# post-processed on accept (record_time is then the trimmed duration), else None.
+class Script:
+    __slots__ = ('num', 'text', 'status', 'record_time', 'latest_date', 'raw_time')
+
+    def __init__(self, num, text, status='Not started', record_time=0.0, latest_date=None, raw_time=None):
+        self.num = num
+        self.text = text
+        self.status = status
+        self.record_time = record_time
+        self.latest_date = latest_date
+        self.raw_time = raw_time
+
+
+# The project's scripts, in scripts.txt order.
+#
+# Records are compact __slots__ objects, and the collection keeps the lookups
+# the app needs up to date as scripts change: the ScriptIndex (position by
+# number, positions by status), a multiset of script texts for de-duplicating
+# added scripts, and the highest script number. The current script is a single
+# `selected` index (-1 for none) rather than a flag on every record.
+#
+# Status and text changes go through set_status() and set_text(). Bulk updates
+# (e.g. reconciling a whole project on load) may modify records directly and
+# then call reindex() once.
+class ScriptCollection:
+    def __init__(self, scripts=()):
+        self._scripts = list(scripts)
+        self.selected = -1
+        self.reindex()
+
+    @classmethod
+    def from_lines(cls, lines):
+        return cls(Script(num, text) for num, text in parse_script_lines(lines))
+
+    def reindex(self):
+        self.index = ScriptIndex(self._scripts)
+        self._texts = Counter(s.text.strip() for s in self._scripts)
+        self.max_num = max((s.num for s in self._scripts), default=0)
+
+    def __len__(self):
+        return len(self._scripts)
+
+    def __getitem__(self, i):
+        return self._scripts[i]
+
+    def __iter__(self):
+        return iter(self._scripts)
+
+    @property
+    def current(self):
+        return self._scripts[self.selected] if 0 <= self.selected < len(self._scripts) else None
+
+    def position(self, num):
+        return self.index.position(num)
+
+    # Next (step=1) or previous (step=-1) script from i, wrapping around; with a
+    # status, only scripts in that status are considered. None if there is none.
+    def neighbour(self, i, step=1, status=None):
+        if status is None:
+            return (i + step) % len(self._scripts) if self._scripts else None
+        return self.index.next(i, status) if step > 0 else self.index.prev(i, status)
+
+    def set_status(self, i, status):
+        self._scripts[i].status = status
+        self.index.set_status(i, status)
+
+    def set_text(self, i, text):
+        s = self._scripts[i]
+        self._texts[s.text.strip()] -= 1
+        if self._texts[s.text.strip()] <= 0:
+            del self._texts[s.text.strip()]
+        s.text = text
+        self._texts[text.strip()] += 1
+
+    def has_text(self, text):
+        return text.strip() in self._texts
+
+    # Append scripts for texts not already in the project, numbered after the
+    # highest existing number. Returns how many were added.
+    def add_texts(self, texts):
+        new_texts = [text for text in texts if not self.has_text(text)]
+        for text in new_texts:
+            self.max_num += 1
+            s = Script(self.max_num, text)
+            self._scripts.append(s)
+            self.index.append(s.num, s.status)
+            self._texts[text.strip()] += 1
+        return len(new_texts)
+
+    def to_text(self):
+        return "\n".join(f"{s.num}. {s.text}" for s in self._scripts)
@@ -0,0 +1,305 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from voicerecorder.audio import WavHeaderError, read_audio_header
+from voicerecorder.export import ProjectArchive
+from voicerecorder.project import (DEFAULT_AUDIO_FORMAT, DEFAULT_LANGUAGE, REMOVED_FILES, SCRIPTS_FILE, SETTINGS_FILE,
+                                  parse_removed, parse_settings, project_entries, reconcile)
+from voicerecorder.registry import script_filename
+from voicerecorder.scripts import Script, ScriptCollection
+from voicerecorder.storage import DEFAULT_MEMORY_BUDGET, ProjectStore
+
+# Seconds a script stays leased to a session after its last renew(). The app
+# renews while the page is open, so leases only run out for sessions that went away.
+LEASE_SECONDS = 120
+PENDING_STATUS = 'Not started'
+# Directory inside the project that holds the ZIP served by Download Project
+EXPORT_DIR = '.export'
+
+
+# Raised when a session writes a script it does not hold the lease on (its
+# lease ran out and the script went back to the queue or to another narrator)
+class LeaseError(RuntimeError):
+    pass
+
+
+# A project directory on the server that several sessions record into at once.
+#
+# The directory itself is the project store (a ProjectStore opened in place),
+# and the script collection, removed numbers and settings exist once per
+# process rather than once per session. Scripts are handed out from a work
+# queue: claim() leases the next script still to be recorded to a session,
+# and only the lease holder may accept or remove it, so no two sessions ever
+# write the same script's files. A session holds one lease at a time; it lasts
+# lease_seconds past the last renew(), after which the next claim() puts the
+# script back at the front of the queue. A session needs nothing but its
+# lease (a copy of the script) and the take it is recording.
+#
+# Leases, statuses and the queue change under one lock. Take files are
+# written outside it, since the lease already makes the script exclusive, but
+# never while an export reads them (other writers of the store, e.g. a late
+# sidecar update, go through writing() too). scripts.txt and removed.txt are only
+# rewritten when a text or the removed numbers change, so a plain accept does
+# not grow with the project.
+class SharedProject:
+    def __init__(self, directory, lease_seconds=LEASE_SECONDS, memory_budget=DEFAULT_MEMORY_BUDGET, encoder=None):
+        self.directory = directory
+        self.lease_seconds = lease_seconds
+        # TakeEncoder that compresses accepted takes when the project stores FLAC
+        self.encoder = encoder
+        self.store = ProjectStore(memory_budget=memory_budget, directory=directory)
+        store = self.store
+        if SCRIPTS_FILE not in store:
+            raise FileNotFoundError(f"No {SCRIPTS_FILE} in {directory}")
+        self.scripts = ScriptCollection.from_lines(self._read(SCRIPTS_FILE).splitlines())
+        removed_name = next((name for name in REMOVED_FILES if name in store), None)
+        self.removed_nums = parse_removed(self._read(removed_name).splitlines()) if removed_name else []
+        settings = parse_settings(bytes(store[SETTINGS_FILE])) if SETTINGS_FILE in store else {}
+        self.language = settings.get('language', DEFAULT_LANGUAGE)
+        self.audio_format = settings.get('audio_format', DEFAULT_AUDIO_FORMAT)
+        self.errors = []
+        # Superseded and incomplete takes stay on disk, as in ProjectDir, but are not exported
+        self.stale = set(reconcile(self.scripts, store.registry, self.removed_nums, self._text, self._duration))
+        # Quality report of the last Analyse Project, shown to every narrator
+        self.report = None
+        self.archive = ProjectArchive(os.path.join(directory, EXPORT_DIR, 'project.zip'))
+        self._lock = threading.RLock()
+        # {num: {'holder': session id, 'narrator': name, 'expires': time.monotonic() deadline}}
+        self._leases = {}
+        self._queue = deque(self.scripts[i].num for i in self.scripts.index.rows(PENDING_STATUS))
+        self._queued = set(self._queue)
+        self._files = threading.Condition()
+        self._writers = 0
+        self._exporting = False
+        # Held while the archive is written; hold it to read the archive too
+        self.export_lock = threading.RLock()
+        self.claims = 0
+        self.accepts = 0
+        self.removes = 0
+        self.expired = 0
+        self.conflicts = 0
+
+    # Lease the next script still to be recorded to session `holder` (or
+    # script `num`, e.g. to re-record a take, unless another session holds
+    # it), releasing the session's previous lease. Returns a copy of the
+    # script, or None if the queue is empty or `num` is taken (the previous
+    # lease is then kept).
+    def claim(self, holder, narrator, num=None):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if num is None:
+                num = self._next_pending()
+            elif self.scripts.position(num) is None or self._leases.get(num, {'holder': holder})['holder'] != holder:
+                num = None
+            if num is None:
+                return None
+            for held in [n for n, lease in self._leases.items() if lease['holder'] == holder and n != num]:
+                self._release(held)
+            self._leases[num] = {'holder': holder, 'narrator': narrator, 'expires': now + self.lease_seconds}
+            self.claims += 1
+            return self.script(num)
+
+    # Extend a session's lease. False if it no longer holds the script.
+    def renew(self, holder, num):
+        with self._lock:
+            if not self._holds(holder, num):
+                return False
+            self._leases[num]['expires'] = time.monotonic() + self.lease_seconds
+            return True
+
+    # Give up a session's lease (e.g. when it leaves the project). A skipped
+    # script goes to the back of the queue, anything else to the front.
+    def release(self, holder, skip=False):
+        with self._lock:
+            for num in [n for n, lease in self._leases.items() if lease['holder'] == holder]:
+                self._release(num, skip)
+
+    # Store a new take of a leased script. `s` is the session's copy of the
+    # script (from claim()) with text, record_time, raw_time and latest_date
+    # set for the take, whose files are given as {ext: data}. The lease is
+    # released; raises LeaseError if the session does not hold it, before the
+    # files are written or, if the lease was lost while they were, after
+    # (they are then left out of exports until the script is accepted again).
+    def accept(self, holder, s, payloads):
+        self._hold(holder, s.num)
+        with self.writing():
+            self.store.replace_script(s.num, s.latest_date, payloads)
+            # Queued inside the write so an export can wait for it (a compressed take replaces its WAV)
+            if 'wav' in payloads and self.audio_format == 'flac' and self.encoder is not None:
+                self.encoder.submit(self.store, script_filename(s.num, s.latest_date, 'wav'))
+        with self._lock:
+            if not self._holds(holder, s.num):
+                self.stale.update(script_filename(s.num, s.latest_date, ext) for ext in payloads)
+                self._conflict(s.num)
+            i = self.scripts.position(s.num)
+            record = self.scripts[i]
+            text_changed = record.text != s.text
+            if text_changed:
+                self.scripts.set_text(i, s.text)
+            record.record_time = s.record_time
+            record.raw_time = s.raw_time
+            record.latest_date = s.latest_date
+            self.scripts.set_status(i, 'Completed')
+            self.stale.difference_update(script_filename(s.num, s.latest_date, ext) for ext in payloads)
+            removed_changed = s.num in self.removed_nums
+            if removed_changed:
+                self.removed_nums.remove(s.num)
+            del self._leases[s.num]
+            self.accepts += 1
+            self._save(text_changed, removed_changed)
+
+    # Remove a leased script and delete its files. The lease is released;
+    # raises LeaseError if the session does not hold it (before the files are
+    # deleted, or after if the lease was lost meanwhile).
+    def remove(self, holder, num):
+        self._hold(holder, num)
+        with self.writing():
+            self.store.delete_script(num)
+        with self._lock:
+            if not self._holds(holder, num):
+                self._conflict(num)
+            i = self.scripts.position(num)
+            record = self.scripts[i]
+            record.record_time = 0.0
+            record.raw_time = None
+            record.latest_date = None
+            self.scripts.set_status(i, 'Removed')
+            removed_changed = num not in self.removed_nums
+            if removed_changed:
+                self.removed_nums.append(num)
+            del self._leases[num]
+            self.removes += 1
+            self._save(False, removed_changed)
+
+    # Copy of one script, for a session to edit until it accepts the take
+    def script(self, num):
+        with self._lock:
+            s = self.scripts[self.scripts.position(num)]
+            return Script(s.num, s.text, s.status, s.record_time, s.latest_date, s.raw_time)
+
+    # Script counts by status, plus the scripts leased and still queued
+    def counts(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            index = self.scripts.index
+            counts = {status: index.count(status) for status in ('Not started', 'Completed', 'Removed')}
+            counts.update(total=len(self.scripts), leased=len(self._leases), queued=len(self._queue))
+            return counts
+
+    # (narrator, script num, seconds left) of every lease, soonest to expire first
+    def narrators(self):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            return sorted(((lease['narrator'], num, lease['expires'] - now) for num, lease in self._leases.items()),
+                          key=lambda lease: lease[2])
+
+    def stats(self):
+        with self._lock:
+            return {'claims': self.claims, 'accepts': self.accepts, 'removes': self.removes,
+                    'expired': self.expired, 'conflicts': self.conflicts}
+
+    # (num, date, audio path) of every accepted take, in script order
+    def takes(self):
+        with self._lock:
+            completed = [(s.num, s.latest_date) for s in self.scripts if s.status == 'Completed' and s.latest_date]
+        registry = self.store.registry
+        return [(num, date, self.store.path(registry.audio(num, date))) for num, date in completed
+                if registry.audio(num, date)]
+
+    # Write the project ZIP (only entries changed since the last export) and
+    # return its path. Takes are not written or compressed meanwhile.
+    def export(self):
+        with self.export_lock:
+            with self._files:
+                self._exporting = True
+                while self._writers:
+                    self._files.wait()
+            try:
+                if self.encoder is not None:
+                    self.encoder.wait(self.store)
+                with self._lock:
+                    take_paths = {name: self.store.path(name) for name in self.store if name not in self.stale}
+                    entries = project_entries(self.scripts, self.removed_nums, self.language, take_paths,
+                                              self.audio_format)
+                return self.archive.update(entries)
+            finally:
+                with self._files:
+                    self._exporting = False
+                    self._files.notify_all()
+
+    # Take files are written by many sessions at once, but not during an export
+    @contextmanager
+    def writing(self):
+        with self._files:
+            while self._exporting:
+                self._files.wait()
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._files:
+                self._writers -= 1
+                self._files.notify_all()
+
+    # Raises LeaseError unless the session holds the script, and extends the
+    # lease so it cannot run out while the script's files are written
+    def _hold(self, holder, num):
+        if not self.renew(holder, num):
+            self._conflict(num)
+
+    # Whether the session still holds the script's lease (call with the lock held)
+    def _holds(self, holder, num):
+        lease = self._leases.get(num)
+        return lease is not None and lease['holder'] == holder
+
+    def _conflict(self, num):
+        with self._lock:
+            self.conflicts += 1
+        raise LeaseError(f"Script {num} is not leased to this session")
+
+    def _next_pending(self):
+        while self._queue:
+            num = self._queue.popleft()
+            self._queued.discard(num)
+            if self.scripts[self.scripts.position(num)].status == PENDING_STATUS and num not in self._leases:
+                return num
+        return None
+
+    def _release(self, num, skip=False):
+        del self._leases[num]
+        if self.scripts[self.scripts.position(num)].status == PENDING_STATUS and num not in self._queued:
+            self._queued.add(num)
+            if skip:
+                self._queue.append(num)
+            else:
+                self._queue.appendleft(num)
+
+    def _expire(self, now):
+        for num in [n for n, lease in self._leases.items() if lease['expires'] <= now]:
+            self._release(num)
+            self.expired += 1
+
+    def _save(self, scripts_changed, removed_changed):
+        if scripts_changed:
+            self.store[SCRIPTS_FILE] = self.scripts.to_text().encode()
+        if removed_changed:
+            self.store[REMOVED_FILES[0]] = "\n".join(str(num) for num in self.removed_nums).encode()
+
+    def _read(self, name):
+        return bytes(self.store[name]).decode()
+
+    def _text(self, name):
+        return self._read(name).strip()
+
+    def _duration(self, name):
+        with open(self.store.path(name), 'rb') as f:
+            try:
+                return read_audio_header(f)['duration']
+            except WavHeaderError as e:
+                self.errors.append((name, e))
+                return 0.0
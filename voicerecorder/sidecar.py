@@ -0,0 +1,108 @@
+import json
+import struct
+
+import numpy as np
+
+from voicerecorder.audio import decode_audio
+from voicerecorder.cache import MetricsCache
+from voicerecorder.metrics import analyze_decoded
+from voicerecorder.pronunciation import empty_scores
+from voicerecorder.registry import script_filename
+from voicerecorder.waveform import min_max_envelope
+
+# Extension of the analysis sidecar stored next to each take's .txt and .wav
+SIDECAR_EXT = 'analysis'
+# A sidecar is SIDECAR_MAGIC, the uint32 length of a JSON header (metrics, rate,
+# duration and the MetricsCache key the analysis was made for) and the
+# waveform envelope as float16 (min row, then max row): a few KB per take,
+# read with one json.loads and a frombuffer
+SIDECAR_MAGIC = b'VRA1'
+ENVELOPE_DTYPE = '<f2'
+# Metrics that depend on the audio alone; the rest are pronunciation scores,
+# which also depend on the script text and the recognition language
+LEVEL_METRICS = ('peak_db', 'rms_db', 'snr_db', 'clipping')
+
+
+def sidecar_name(num, date):
+    return script_filename(num, date, SIDECAR_EXT)
+
+
+# Analysis of a take as shown by the app: (metrics, rate, waveform envelope),
+# with the given pronunciation scores (empty if None). Returns the analysis
+# and the take's duration.
+def take_analysis(audio_bytes, scores=None):
+    header, samples = decode_audio(audio_bytes)
+    metrics, rate, data = analyze_decoded(header, samples)
+    metrics.update(empty_scores() if scores is None else scores)
+    return (metrics, rate, min_max_envelope(data, full_scale=header['full_scale'])), header['duration']
+
+
+# Pronunciation scores (and any assessment error) of a metrics dict
+def pronunciation_scores(metrics):
+    return {name: value for name, value in metrics.items() if name not in LEVEL_METRICS}
+
+
+# Numpy scalars in metrics (levels, clipping) as plain JSON values
+def json_value(value):
+    return value.item()
+
+
+def sidecar_bytes(analysis, key, duration):
+    metrics, rate, waveform = analysis
+    header = json.dumps({'metrics': metrics, 'rate': int(rate), 'duration': float(duration), 'key': key},
+                        default=json_value).encode()
+    return SIDECAR_MAGIC + struct.pack('<I', len(header)) + header + np.asarray(waveform, ENVELOPE_DTYPE).tobytes()
+
+
+# (analysis, key, duration) of sidecar bytes or a sidecar path, or None if it
+# cannot be read
+def read_sidecar(source):
+    try:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                source = f.read()
+        if bytes(source[:4]) != SIDECAR_MAGIC:
+            return None
+        size = struct.unpack_from('<I', source, 4)[0]
+        header = json.loads(bytes(source[8:8 + size]))
+        waveform = np.frombuffer(source, ENVELOPE_DTYPE, offset=8 + size).astype(np.float32).reshape(2, -1)
+        return (header['metrics'], header['rate'], waveform), header['key'], header['duration']
+    except (OSError, KeyError, ValueError, struct.error):
+        return None
+
+
+# Sidecar bytes with pronunciation scores filled in, or None if the sidecar
+# cannot be read, was written for another key or already has scores
+def add_scores(source, key, scores):
+    loaded = read_sidecar(source)
+    if loaded is None or loaded[1] != key or loaded[0][0].get('pronunciation_score') is not None:
+        return None
+    (metrics, rate, waveform), _, duration = loaded
+    metrics.update(scores)
+    return sidecar_bytes((metrics, rate, waveform), key, duration)
+
+
+# Sidecar for a take rewritten from `original` (e.g. post-processed): levels and
+# waveform of the new audio, keeping the pronunciation scores of the original's
+# sidecar if they were assessed for the same audio, text and language
+def rewritten_sidecar(audio_bytes, original, script_text, language, old_sidecar=None):
+    loaded = read_sidecar(old_sidecar) if old_sidecar is not None else None
+    scores = None
+    if loaded is not None and loaded[1] == MetricsCache.key(original, script_text, language):
+        scores = pronunciation_scores(loaded[0][0])
+    analysis, duration = take_analysis(audio_bytes, scores)
+    return sidecar_bytes(analysis, MetricsCache.key(audio_bytes, script_text, language), duration)
+
+
+# Analysis of a take from its sidecar for MetricsCache key `key`. A sidecar
+# written for another key (the script text or language changed since) only
+# contributes its levels and waveform, not its pronunciation scores.
+def sidecar_analysis(source, key):
+    loaded = read_sidecar(source)
+    if loaded is None:
+        return None
+    (metrics, rate, waveform), sidecar_key, _ = loaded
+    if sidecar_key != key:
+        metrics = {name: metrics[name] for name in LEVEL_METRICS if name in metrics}
+        metrics.update(empty_scores())
+    return metrics, rate, waveform
@@ -0,0 +1,194 @@
+import itertools
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from voicerecorder.registry import FileRegistry, script_filename
+
+# Default per-session budget for payloads held in memory
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+# Project file store that spills take payloads to a local directory.
+#
+# Behaves like the {filename: bytes} dict it replaces, but only a name -> size
+# index lives in memory. Payloads are written through to disk and read back as
+# read-only memory maps, so playback and analysis never copy a whole project
+# into the session. Recently written payloads are kept in a small in-memory tier
+# whose total size never exceeds memory_budget. The directory is removed when
+# the store is garbage collected (i.e. when the session goes away).
+#
+# Given a `directory` instead, the store opens it in place: the files already
+# there are indexed, and the directory is kept when the store goes away (a
+# shared project, see voicerecorder.shared).
+#
+# Project files (scriptNNNN_YYYYMMDD.{txt,wav,flac,analysis}) are indexed in `registry` by
+# script number and date as they are added and removed.
+class ProjectStore(MutableMapping):
+    def __init__(self, root=None, memory_budget=DEFAULT_MEMORY_BUDGET, directory=None):
+        if directory is None:
+            base = root or os.environ.get("VOICERECORDER_STORE_DIR")
+            if base:
+                os.makedirs(base, exist_ok=True)
+            self.root = tempfile.mkdtemp(prefix="project-", dir=base)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self.root = directory
+        self.memory_budget = memory_budget
+        self._sizes = {}
+        self._hot = OrderedDict()
+        self._hot_bytes = 0
+        self.registry = FileRegistry()
+        # Write count of each file when it was last written, see convert()
+        self._versions = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.RLock()
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.root, True) if directory is None else None
+        if directory is not None:
+            self._index_existing()
+
+    def path(self, name):
+        if not name or os.path.basename(name) != name or name in ('.', '..'):
+            raise ValueError(f"Invalid project file name: {name!r}")
+        return os.path.join(self.root, name)
+
+    def __setitem__(self, name, data):
+        self._write(name, lambda f: f.write(data), data if isinstance(data, bytes) else None)
+
+    # Copy a file-like object (e.g. a Streamlit UploadedFile) into the store
+    # without reading it into memory first
+    def write_stream(self, name, fileobj):
+        self._write(name, lambda f: shutil.copyfileobj(fileobj, f))
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._sizes:
+                raise KeyError(name)
+            if name in self._hot:
+                self._hot.move_to_end(name)
+                return self._hot[name]
+            size = self._sizes[name]
+        if size == 0:
+            return b""
+        with open(self.path(name), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __delitem__(self, name):
+        with self._lock:
+            if name not in self._sizes:
+                raise KeyError(name)
+            self._forget(name)
+            del self._sizes[name]
+            self._versions.pop(name, None)
+            self.registry.discard(name)
+        os.unlink(self.path(name))
+
+    def __iter__(self):
+        return iter(list(self._sizes))
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __contains__(self, name):
+        return name in self._sizes
+
+    # Replace every file of a script with a new take, given as {ext: data}. The
+    # new files are written before the old ones are removed, so the script never
+    # lacks a complete pair on disk.
+    def replace_script(self, num, date, payloads):
+        keep = set()
+        for ext, data in payloads.items():
+            name = script_filename(num, date, ext)
+            self[name] = data
+            keep.add(name)
+        self.delete_script(num, keep)
+
+    def delete_script(self, num, keep=()):
+        for name in self.registry.names(num):
+            if name not in keep:
+                del self[name]
+
+    # Version of a file: changes whenever it is rewritten; None once it is deleted
+    def version(self, name):
+        return self._versions.get(name)
+
+    # Replace file `name` with `new_name` holding `data` (e.g. a WAV take with
+    # its FLAC), unless `name` was rewritten or deleted since `version` was
+    # read. The new file is written before the old one is removed. Returns
+    # whether the file was replaced.
+    def convert(self, name, new_name, data, version):
+        with self._lock:
+            if self._versions.get(name) != version:
+                return False
+            self[new_name] = data
+            del self[name]
+        return True
+
+    def size(self, name):
+        return self._sizes[name]
+
+    def memory_bytes(self):
+        return self._hot_bytes
+
+    def disk_bytes(self):
+        return sum(self._sizes.values())
+
+    def close(self):
+        if self._finalizer is not None:
+            self._finalizer()
+
+    # Files of a directory opened in place (subdirectories and interrupted writes are left out)
+    def _index_existing(self):
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                self._sizes[entry.name] = entry.stat().st_size
+                self.registry.add(entry.name)
+
+    # Write a file through a temporary file of its own, filled by fill(f), so
+    # threads writing the same name (e.g. a late sidecar update and a
+    # re-accept) never share one. It is moved into place under the lock, so the
+    # file on disk and the index agree on which write came last. `hot` is kept
+    # in the in-memory tier.
+    def _write(self, name, fill, hot=None):
+        path = self.path(name)
+        self._bump(name)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                fill(f)
+                size = f.tell()
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            os.replace(tmp_path, path)
+            self._forget(name)
+            self._sizes[name] = size
+            self.registry.add(name)
+            if hot is not None:
+                self._remember(name, hot)
+
+    # New version of a file about to be rewritten: bumped before the file is
+    # replaced, so a convert() that runs meanwhile sees the rewrite and backs off
+    def _bump(self, name):
+        with self._lock:
+            self._versions[name] = next(self._counter)
+
+    def _remember(self, name, data):
+        if len(data) > self.memory_budget:
+            return
+        self._hot[name] = data
+        self._hot_bytes += len(data)
+        while self._hot_bytes > self.memory_budget:
+            _, old = self._hot.popitem(last=False)
+            self._hot_bytes -= len(old)
+
+    def _forget(self, name):
+        data = self._hot.pop(name, None)
+        if data is not None:
+            self._hot_bytes -= len(data)
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from voicerecorder.index import locate
+
+COLUMNS = ['Select', 'Num', 'Status', 'Preview']
+PREVIEW_CHARS = 50
+# Rows per page of the Scripts table
+PAGE_SIZE = 50
+ROW_COLORS = {'selected': 'background-color: #FFCCCC', 'Completed': 'background-color: lightgreen',
+              'Removed': 'background-color: lightgrey'}
+
+
+def preview(text):
+    return text[:PREVIEW_CHARS] + ('...' if len(text) > PREVIEW_CHARS else '')
+
+
+# Row colors for the whole frame at once (used with Styler.apply(axis=None))
+def style_frame(df):
+    colors = np.select([df['Select'].to_numpy(dtype=bool), (df['Status'] == 'Completed').to_numpy(),
+                        (df['Status'] == 'Removed').to_numpy()],
+                       [ROW_COLORS['selected'], ROW_COLORS['Completed'], ROW_COLORS['Removed']], '')
+    return pd.DataFrame(np.repeat(colors[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns)
+
+
+# Persistent model behind the Scripts table, showing one page of rows.
+#
+# The table holds a DataFrame for the current page of a ScriptCollection only
+# (`rows`, a list of script indices), so the work per rerun is bounded by page
+# size rather than project size. Callers mark() the scripts whose status, text
+# or selection they changed, and frame() rewrites the marked rows that are on
+# the page (plus the rows currently selected, so clearing a selection never
+# needs to be reported). The frame is rebuilt when the page changes, and
+# invalidate() forces a full rebuild after scripts are loaded or added.
+#
+# The editor is rendered under a stable `key`, so navigation only changes the
+# data behind a grid that stays mounted. The editor keeps the user's checkbox
+# clicks as an overlay on top of that data; track_edits() records it, and the
+# key is only rotated (dropping the overlay) when a later programmatic change
+# or a page change contradicts one of those clicks.
+class ScriptsTable:
+    def __init__(self, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self.df = None
+        self.rows = []
+        # (filter, current script) the page was last positioned for
+        self.anchor = None
+        self._row_of = {}
+        self._dirty = set()
+        self._overlay = {}
+        self.version = 0
+
+    @property
+    def key(self):
+        return f"scripts_table_{self.version}"
+
+    def invalidate(self):
+        self.df = None
+        self.rows = []
+        self.anchor = None
+        self._row_of = {}
+        self._dirty.clear()
+        self._reset_editor()
+
+    def mark(self, *indices):
+        self._dirty.update(i for i in indices if i is not None and i >= 0)
+
+    # Script indices on a (0-based) page of rows, and the page count
+    def page(self, rows, page):
+        pages = max(1, -(-len(rows) // self.page_size))
+        page = min(max(page, 0), pages - 1)
+        return list(rows[page * self.page_size:(page + 1) * self.page_size]), pages
+
+    # Page that holds script index i within rows, or None
+    def page_of(self, rows, i):
+        pos = locate(rows, i)
+        return None if pos is None else pos // self.page_size
+
+    # Row of script index i on the current page, or None
+    def row_of(self, i):
+        return self._row_of.get(i)
+
+    def frame(self, scripts, rows):
+        if self.df is None or rows != self.rows:
+            self._rebuild(scripts, rows)
+            return self.df
+        dirty = {self._row_of[i] for i in self._dirty if i in self._row_of}
+        self._dirty.clear()
+        for row in dirty | set(np.flatnonzero(self.df['Select'].to_numpy(dtype=bool)).tolist()):
+            i = self.rows[row]
+            s = scripts[i]
+            selected = i == scripts.selected
+            self._check_overlay(i, selected)
+            self.df.iloc[row] = [selected, s.num, s.status, preview(s.text)]
+        return self.df
+
+    def styled(self, scripts, rows):
+        return self.frame(scripts, rows).style.apply(style_frame, axis=None)
+
+    def set_selected(self, i, value):
+        row = self._row_of.get(i)
+        if row is not None:
+            self._check_overlay(i, value)
+            self.df.iat[row, 0] = value
+
+    # Script indices of the selected rows on the page
+    def selected_indices(self):
+        return [self.rows[row] for row in np.flatnonzero(self.df['Select'].to_numpy(dtype=bool))]
+
+    # Scripts whose Select value differs between the editor output and the
+    # model, as (script index, new value) pairs. The model is updated to match.
+    def selection_changes(self, edited_df):
+        new = edited_df['Select'].to_numpy(dtype=bool)
+        old = self.df['Select'].to_numpy(dtype=bool)
+        changed = np.flatnonzero(new != old)
+        if len(changed):
+            self.df.iloc[changed, 0] = new[changed]
+        return [(self.rows[row], bool(new[row])) for row in changed]
+
+    # Record the editor's pending edits ({'edited_rows': {row: {column: value}}})
+    def track_edits(self, editor_state):
+        edited_rows = (editor_state or {}).get('edited_rows', {})
+        self._overlay = {self.rows[int(row)]: bool(values['Select']) for row, values in edited_rows.items()
+                         if 'Select' in values and int(row) < len(self.rows)}
+
+    def _check_overlay(self, i, value):
+        if self._overlay.get(i, value) != value:
+            self._reset_editor()
+
+    def _reset_editor(self):
+        if self._overlay:
+            self.version += 1
+            self._overlay = {}
+
+    def _rebuild(self, scripts, rows):
+        # Editor edits are positional, so they cannot survive a change of page
+        self._reset_editor()
+        self._dirty.clear()
+        self.rows = list(rows)
+        self._row_of = {i: row for row, i in enumerate(self.rows)}
+        page = [scripts[i] for i in self.rows]
+        self.df = pd.DataFrame({
+            'Select': np.fromiter((i == scripts.selected for i in self.rows), dtype=bool, count=len(page)),
+            'Num': np.fromiter((s.num for s in page), dtype=np.int64, count=len(page)),
+            'Status': [s.status for s in page],
+            'Preview': [preview(s.text) for s in page],
+        }, columns=COLUMNS)
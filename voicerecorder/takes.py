@@ -0,0 +1,99 @@
+import datetime
+
+from voicerecorder.audio import audio_ext, read_audio_header
+from voicerecorder.cache import MetricsCache
+from voicerecorder.ingest import ingest_files, plan_ingest
+from voicerecorder.project import reconcile
+from voicerecorder.registry import parse_project_filename, script_filename
+from voicerecorder.sidecar import SIDECAR_EXT, sidecar_bytes, take_analysis
+
+# What the app does to a single-session project's scripts and take files on
+# Accept, Remove and upload, on a ScriptCollection and a ProjectStore. Kept out
+# of app.py so the benchmark suite times the same code.
+
+
+# Files of a take of script s as accept_take() stores them ({ext: data}): the
+# script text, the audio and its analysis sidecar. A new recording (`new`) is
+# first run through process(audio) if given (process_take with the session's
+# settings), which sets its record time and keeps the captured one as raw_time,
+# and is dated `date` (today by default); re-accepting a stored take keeps its
+# date. analyze(audio, key, raw_key) returns the take's analysis (computed with
+# take_analysis if not given). Sets s's record time, raw time and date. Returns
+# the files, the analysis and the take's MetricsCache keys after and before
+# processing.
+def take_files(s, audio, record_time, language, new=True, process=None, analyze=None, date=None):
+    s.record_time = record_time
+    raw_key = key = MetricsCache.key(audio, s.text, language)
+    if new:
+        s.raw_time = None
+        if process is not None:
+            processed, info = process(audio)
+            if processed is not audio:
+                key = MetricsCache.key(processed, s.text, language)
+            audio = processed
+            s.record_time = info['duration_after']
+            s.raw_time = info['duration_before']
+    analysis = analyze(audio, key, raw_key) if analyze is not None else take_analysis(audio)[0]
+    if new or s.latest_date is None:
+        s.latest_date = date or datetime.date.today().strftime('%Y%m%d')
+    payloads = {'txt': s.text.encode(), audio_ext(audio): audio,
+                SIDECAR_EXT: sidecar_bytes(analysis, key, s.record_time)}
+    return payloads, analysis, key, raw_key
+
+
+# Store the take of script i (files from take_files), replacing all existing
+# files of its number, and mark it Completed. With an encoder (a FLAC project)
+# the WAV is compressed in the background and replaced when done.
+def accept_take(scripts, i, store, payloads, removed_nums, encoder=None):
+    s = scripts[i]
+    scripts.set_status(i, 'Completed')
+    store.replace_script(s.num, s.latest_date, payloads)
+    if 'wav' in payloads and encoder is not None:
+        encoder.submit(store, script_filename(s.num, s.latest_date, 'wav'))
+    if s.num in removed_nums:
+        removed_nums.remove(s.num)
+
+
+# Mark script i Removed and delete all of its files
+def remove_script(scripts, i, store, removed_nums):
+    s = scripts[i]
+    scripts.set_status(i, 'Removed')
+    s.record_time = 0.0
+    s.raw_time = None
+    s.latest_date = None
+    if s.num not in removed_nums:
+        removed_nums.append(s.num)
+    store.delete_script(s.num)
+
+
+# Load uploaded project files into the store and bring the scripts in line with
+# them. The surviving files are worked out from names alone (plan_ingest),
+# stored files that do not survive are deleted, only the rest are read (in
+# parallel), and each script is reconciled with its latest complete pair before
+# every other file for it is dropped. Takes still being compressed by `encoder`
+# are waited for first, as they would race with the files replacing them.
+# progress(done, total) follows the reads. Returns the ingest errors as
+# [(name, error)].
+def load_takes(scripts, removed_nums, store, uploads, encoder=None, progress=None):
+    if encoder is not None:
+        encoder.wait(store)
+    removed = set(removed_nums)
+    uploads = {f.name: f for f in uploads if parse_project_filename(f.name)}
+    keep = plan_ingest(uploads, {s.num for s in scripts}, removed, existing=list(store))
+    for name in list(store):
+        if name not in keep:
+            del store[name]
+    values, errors = ingest_files(store, [f for name, f in uploads.items() if name in keep], progress=progress)
+
+    def text_of(name):
+        return values[name] if name in values else bytes(store[name]).decode().strip()
+
+    def duration_of(name):
+        if name in values:
+            return values[name]
+        with open(store.path(name), 'rb') as f:
+            return read_audio_header(f)['duration']
+
+    for name in reconcile(scripts, store.registry, removed, text_of, duration_of):
+        del store[name]
+    return errors
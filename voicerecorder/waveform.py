@@ -0,0 +1,41 @@
+import numpy as np
+
+# Number of min/max columns the waveform is reduced to (roughly one per pixel)
+ENVELOPE_WIDTH = 800
+
+
+# Reduce samples to per-column min/max envelopes, normalized to -1..1 (integer
+# samples by full_scale, as decode_wav reports it; np.iinfo(dtype).max if not
+# given). Returns a (2, columns) float32 array: row 0 holds the minima, row 1
+# the maxima.
+def min_max_envelope(samples, width=ENVELOPE_WIDTH, full_scale=None):
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    n = len(samples)
+    if n == 0:
+        return np.zeros((2, 0), dtype=np.float32)
+    columns = min(width, n)
+    edges = (np.arange(columns, dtype=np.int64) * n) // columns
+    envelope = np.empty((2, columns), dtype=np.float32)
+    envelope[0] = np.minimum.reduceat(samples, edges)
+    envelope[1] = np.maximum.reduceat(samples, edges)
+    if samples.dtype.kind in 'iu':
+        envelope /= np.float32(full_scale or np.iinfo(samples.dtype).max)
+    return envelope
+
+
+# Render an envelope as a filled SVG polygon that stretches to the container width
+def waveform_svg(envelope, height=80, color="#1f77b4"):
+    columns = envelope.shape[1]
+    if columns == 0:
+        return f"<svg width='100%' height='{height}'></svg>"
+    x = np.arange(columns, dtype=np.float32)
+    # y runs 0 (top, +1.0) to 100 (bottom, -1.0) in viewBox units
+    top = (1 - np.clip(envelope[1], -1, 1)) * 50
+    bottom = (1 - np.clip(envelope[0], -1, 1)) * 50
+    xs = np.concatenate([x, x[::-1]])
+    ys = np.concatenate([top, bottom[::-1]])
+    points = " ".join(f"{px:.0f},{py:.1f}" for px, py in zip(xs.tolist(), ys.tolist()))
+    return (f"<svg viewBox='0 0 {max(columns - 1, 1)} 100' preserveAspectRatio='none' width='100%' "
+            f"height='{height}'><polygon points='{points}' fill='{color}' stroke='{color}' "
+            f"stroke-width='1' vector-effect='non-scaling-stroke'/></svg>")